@@ -0,0 +1,274 @@
+"""Benchmark the route-generation pipeline (create_route_endpoint) on synthetic cities.
+
+Runs entirely in-process against mongomock-motor, an optional dependency that is not part
+of requirements.txt:
+
+    pip install mongomock-motor
+    cd backend
+    python -m benchmarks.route_pipeline                      # 50/500/5000 places, all styles, default trip lengths
+    python -m benchmarks.route_pipeline --sizes 500 --days 1-30 --repeat 3
+
+Each run reports per-stage latency (setup, must_visit_enrichment, candidate_fetch, filter,
+grouping, scheduling, persist) collected through services.profiling. Results are written
+as JSON to --output-dir and compared against the previous run, so regressions show up
+as deltas.
+"""
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import os
+import random
+import statistics
+import sys
+import time
+from datetime import datetime, timedelta
+
+try:
+    from mongomock_motor import AsyncMongoMockClient
+except ImportError:  # pragma: no cover - optional dependency
+    AsyncMongoMockClient = None
+
+import config.database as database_config
+
+COLLECTIONS = [
+    "user_collection",
+    "route_collection",
+    "places_collection",
+    "cities_collection",
+    "countries_collection",
+    "place_feedback_collection",
+    "route_feedback_collection",
+    "geocode_cache_collection",
+]
+
+SIZES = [50, 500, 5000]
+TRAVEL_STYLES = ["relaxed", "moderate", "accelerated"]
+DEFAULT_DAYS = [1, 2, 3, 5, 7, 10, 14, 21, 30]
+STAGES = ["setup", "must_visit_enrichment", "candidate_fetch", "filter", "grouping", "scheduling", "persist"]
+
+CATEGORIES = ["museum", "park", "historical", "restaurant", "art", "shopping", "nightlife", "landmark"]
+PRICES = ["", "Free", "€10", "$15", "€25", "$40", "€60", "$90"]
+HOURS_TEMPLATES = [
+    {day: "9:00 AM - 5:00 PM" for day in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]},
+    {day: "10:00 AM - 1:00 PM, 2:00 PM - 6:00 PM" for day in ["Monday", "Tuesday", "Wednesday", "Thursday", "Friday"]},
+    {day: "10:00 AM - 2:00 AM" for day in ["Wednesday", "Thursday", "Friday", "Saturday", "Sunday"]},
+    {day: "08:30-19:15" for day in ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday"]},
+    {},
+]
+HOURS_WEIGHTS = [5, 2, 1, 3, 3]
+SYLLABLES = ["ka", "lo", "mi", "ren", "tas", "vo", "bel", "dri", "sun", "ora", "pel", "qui", "zan", "mor", "tel", "fa"]
+
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+
+
+def use_mock_database():
+    """Point every collection handle in config.database at an in-memory mongomock database.
+
+    Must run before routers/scrapper/services are imported, since they bind collections at import time.
+    """
+    if AsyncMongoMockClient is None:
+        sys.exit("mongomock-motor is required for this benchmark: pip install mongomock-motor")
+    client = AsyncMongoMockClient()
+    database = client["WayfareBenchmark"]
+    database_config.client = client
+    database_config.database = database
+    for name in COLLECTIONS:
+        setattr(database_config, name, database[name.replace("_collection", "")])
+    return database
+
+
+def synthetic_city(city: str, size: int, seed: int = 7):
+    """City document plus `size` places spread over ~10 km with hours, prices and popularity"""
+    rng = random.Random(seed + size)
+    center_lat, center_lng = 41.9028, 12.4964
+    now = datetime.utcnow()
+    places = []
+    used_words = set()
+    for i in range(size):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        # Distinct made-up names, so must-visit fuzzy matching does not discard the whole city
+        word = ""
+        while not word or word in used_words:
+            word = "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 4))).title()
+        used_words.add(word)
+        places.append({
+            "place_id": f"{city.lower()}-{size}-{i}",
+            "city": city,
+            "country": "Benchmarkland",
+            "name": f"{word} {category.title()}",
+            "category": category,
+            "wayfare_category": category,
+            "price": rng.choice(PRICES),
+            "rating": f"{rng.uniform(3.0, 5.0):.1f}",
+            "popularity": str(rng.randint(1, size)),
+            "duration": rng.choice([None, 45, 60, 90, 120]),
+            "opening_hours": rng.choices(HOURS_TEMPLATES, weights=HOURS_WEIGHTS)[0],
+            "coordinates": {
+                "lat": center_lat + rng.gauss(0, 0.03),
+                "lng": center_lng + rng.gauss(0, 0.04),
+            },
+            "address": f"{i} Benchmark Street, {city}",
+            "created_at": now,
+        })
+    city_doc = {
+        "name": city,
+        "country": "Benchmarkland",
+        "country_id": "bench",
+        "active": True,
+        "coordinates": {"lat": center_lat, "lng": center_lng},
+    }
+    return city_doc, places
+
+
+async def seed_database(database, sizes):
+    from services.place_normalization import with_normalized_fields
+
+    users = [
+        {
+            "username": f"bench_{style}",
+            "email": f"bench_{style}@example.com",
+            "preferences": {"interests": ["museum", "park", "historical"], "travel_style": style, "budget": "medium"},
+        }
+        for style in TRAVEL_STYLES
+    ]
+    await database["user"].insert_many(users)
+
+    cities = {}
+    for size in sizes:
+        city = f"Synthetic{size}"
+        city_doc, places = synthetic_city(city, size)
+        await database["cities"].insert_one(city_doc)
+        await database["places"].insert_many([with_normalized_fields(place) for place in places])
+        cities[size] = (city, places)
+    return cities
+
+
+async def run_case(create_route_endpoint, collect_stage_timings, current_user, city, places,
+                   num_days, must_visit_count):
+    from models.model import MustVisitInput, RouteCreateInput
+
+    start = datetime.now().date() + timedelta(days=1)
+    route_input = RouteCreateInput(
+        title=f"Benchmark {city} {num_days}d",
+        city=city,
+        start_date=start.strftime("%Y-%m-%d"),
+        end_date=(start + timedelta(days=num_days - 1)).strftime("%Y-%m-%d"),
+        must_visit=[
+            MustVisitInput(place_name=place["name"], source="benchmark")
+            for place in places[:must_visit_count]
+        ],
+    )
+
+    with collect_stage_timings() as timings, contextlib.redirect_stdout(io.StringIO()):
+        started = time.perf_counter()
+        await create_route_endpoint(route_input, current_user)
+        total_ms = (time.perf_counter() - started) * 1000
+    return total_ms, timings.stages
+
+
+def parse_days(value: str):
+    if "-" in value:
+        first, last = value.split("-", 1)
+        return list(range(int(first), int(last) + 1))
+    return [int(day) for day in value.split(",")]
+
+
+def load_previous(output_dir):
+    path = os.path.join(output_dir, "route_pipeline_latest.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def format_delta(current: float, previous_case):
+    if not previous_case or not previous_case.get("total_ms"):
+        return ""
+    change = (current - previous_case["total_ms"]) / previous_case["total_ms"] * 100
+    return f"{change:+.1f}%"
+
+
+async def main(args):
+    database = use_mock_database()
+
+    from fastapi.security import HTTPAuthorizationCredentials
+    from routers.router import create_access_token, create_route_endpoint, get_authenticated_user
+    from services.profiling import collect_stage_timings
+
+    cities = await seed_database(database, args.sizes)
+    previous = load_previous(args.output_dir)
+    previous_cases = {case["key"]: case for case in previous["cases"]} if previous else {}
+
+    results = []
+    header = f"{'places':>6} {'style':<12} {'days':>4} {'total ms':>10} " + " ".join(f"{stage[:12]:>12}" for stage in STAGES) + "  vs prev"
+    print(header)
+    print("-" * len(header))
+
+    for size in args.sizes:
+        city, places = cities[size]
+        for style in args.styles:
+            current_user = await get_authenticated_user(HTTPAuthorizationCredentials(
+                scheme="Bearer", credentials=create_access_token({"sub": f"bench_{style}"})
+            ))
+            for num_days in args.days:
+                totals, stage_runs = [], []
+                for _ in range(args.repeat):
+                    total_ms, stages = await run_case(
+                        create_route_endpoint, collect_stage_timings, current_user, city, places,
+                        num_days, args.must_visit
+                    )
+                    totals.append(total_ms)
+                    stage_runs.append(stages)
+
+                key = f"{size}/{style}/{num_days}"
+                case = {
+                    "key": key,
+                    "places": size,
+                    "travel_style": style,
+                    "days": num_days,
+                    "total_ms": statistics.median(totals),
+                    "stages_ms": {
+                        stage: statistics.median(run.get(stage, 0.0) for run in stage_runs) for stage in STAGES
+                    },
+                }
+                results.append(case)
+                print(
+                    f"{size:>6} {style:<12} {num_days:>4} {case['total_ms']:>10.1f} "
+                    + " ".join(f"{case['stages_ms'][stage]:>12.1f}" for stage in STAGES)
+                    + f"  {format_delta(case['total_ms'], previous_cases.get(key))}"
+                )
+
+    report = {
+        "benchmark": "route_pipeline",
+        "created_at": datetime.utcnow().isoformat(),
+        "python": sys.version.split()[0],
+        "repeat": args.repeat,
+        "must_visit": args.must_visit,
+        "cases": results,
+    }
+    os.makedirs(args.output_dir, exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    for name in (f"route_pipeline_{stamp}.json", "route_pipeline_latest.json"):
+        with open(os.path.join(args.output_dir, name), "w") as f:
+            json.dump(report, f, indent=2)
+    print(f"\nResults written to {args.output_dir}")
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sizes", type=lambda v: [int(s) for s in v.split(",")], default=SIZES,
+                        help="comma-separated city sizes (default: 50,500,5000)")
+    parser.add_argument("--styles", type=lambda v: v.split(","), default=TRAVEL_STYLES,
+                        help="comma-separated travel styles")
+    parser.add_argument("--days", type=parse_days, default=DEFAULT_DAYS,
+                        help="trip lengths, e.g. 1,7,30 or 1-30")
+    parser.add_argument("--repeat", type=int, default=1, help="runs per case (median is reported)")
+    parser.add_argument("--must-visit", type=int, default=2, help="must-visit places per route")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    return parser
+
+
+if __name__ == "__main__":
+    asyncio.run(main(build_parser().parse_args()))
@@ -0,0 +1,140 @@
+"""Measure cold-start import time of the API (main:app) and guard it against a budget.
+
+Each run starts a fresh interpreter with `python -X importtime -c "import main"`, so nothing
+is shared with the parent process or between runs:
+
+    cd backend
+    python -m benchmarks.startup_time                        # 5 runs, default budget
+    python -m benchmarks.startup_time --repeat 10 --budget-ms 1500 --top 30
+
+Reports the median total import time, the slowest modules (cumulative) and fails with exit
+code 1 if the median exceeds the budget or if a heavy optional library
+(HEAVY_MODULES, e.g. sklearn/scipy) got imported at startup.
+Results are written as JSON to --output-dir and compared against the previous run.
+"""
+import argparse
+import json
+import os
+import re
+import statistics
+import subprocess
+import sys
+from datetime import datetime
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+DEFAULT_OUTPUT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "results")
+STARTUP_BUDGET_MS = float(os.getenv("STARTUP_BUDGET_MS", "2000"))
+# Nothing in the API uses these; importing them at startup costs seconds and tens of MB per worker
+HEAVY_MODULES = ("sklearn", "scipy")
+
+_IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+)\s+\|\s+(\d+)\s+\|( *)(\S+)")
+
+
+def parse_importtime(stderr: str):
+    """-X importtime output -> ({module: (self_us, cumulative_us)}, total_us)"""
+    modules = {}
+    total_us = 0
+    for line in stderr.splitlines():
+        match = _IMPORTTIME_RE.match(line)
+        if not match:
+            continue
+        self_us, cumulative_us, indent, module = int(match.group(1)), int(match.group(2)), match.group(3), match.group(4)
+        modules[module] = (self_us, cumulative_us)
+        if len(indent) == 1:
+            # Top-level imports only; nested ones are already part of their parent's cumulative time
+            total_us += cumulative_us
+    return modules, total_us
+
+
+def measure_once(target: str):
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {target}"],
+        cwd=BACKEND_DIR,
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        sys.exit(f"Importing {target} failed:\n{result.stderr[-2000:]}")
+    return parse_importtime(result.stderr)
+
+
+def load_previous(output_dir):
+    path = os.path.join(output_dir, "startup_time_latest.json")
+    if not os.path.exists(path):
+        return None
+    with open(path) as f:
+        return json.load(f)
+
+
+def main(args):
+    totals = []
+    modules = {}
+    for _ in range(args.repeat):
+        modules, total_us = measure_once(args.target)
+        totals.append(total_us / 1000)
+    median_ms = statistics.median(totals)
+
+    heavy = sorted(
+        module for module in modules
+        if module.split(".")[0] in HEAVY_MODULES
+    )
+    slowest = sorted(modules.items(), key=lambda item: item[1][1], reverse=True)[:args.top]
+
+    print(f"{'cumulative ms':>14} {'self ms':>9}  module")
+    print("-" * 50)
+    for module, (self_us, cumulative_us) in slowest:
+        print(f"{cumulative_us / 1000:>14.1f} {self_us / 1000:>9.1f}  {module}")
+
+    previous = load_previous(args.output_dir)
+    delta = ""
+    if previous and previous.get("median_ms"):
+        delta = f" ({(median_ms - previous['median_ms']) / previous['median_ms'] * 100:+.1f}% vs previous run)"
+    print(f"\nimport {args.target}: median {median_ms:.1f} ms over {args.repeat} runs "
+          f"(min {min(totals):.1f}, max {max(totals):.1f}), budget {args.budget_ms:.0f} ms{delta}")
+
+    report = {
+        "benchmark": "startup_time",
+        "created_at": datetime.utcnow().isoformat(),
+        "python": sys.version.split()[0],
+        "target": args.target,
+        "repeat": args.repeat,
+        "runs_ms": totals,
+        "median_ms": median_ms,
+        "budget_ms": args.budget_ms,
+        "module_count": len(modules),
+        "heavy_modules": heavy,
+        "slowest": [
+            {"module": module, "self_ms": self_us / 1000, "cumulative_ms": cumulative_us / 1000}
+            for module, (self_us, cumulative_us) in slowest
+        ],
+    }
+    os.makedirs(args.output_dir, exist_ok=True)
+    stamp = datetime.utcnow().strftime("%Y%m%dT%H%M%S")
+    for name in (f"startup_time_{stamp}.json", "startup_time_latest.json"):
+        with open(os.path.join(args.output_dir, name), "w") as f:
+            json.dump(report, f, indent=2)
+
+    failures = []
+    if median_ms > args.budget_ms:
+        failures.append(f"median import time {median_ms:.1f} ms exceeds the {args.budget_ms:.0f} ms budget")
+    if heavy:
+        failures.append(f"heavy modules imported at startup: {', '.join(heavy[:10])}"
+                        + (" ..." if len(heavy) > 10 else ""))
+    for failure in failures:
+        print(f"FAIL: {failure}")
+    return 1 if failures else 0
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target", default="main", help="module to import (default: main)")
+    parser.add_argument("--repeat", type=int, default=5, help="fresh interpreters to start (median is reported)")
+    parser.add_argument("--budget-ms", type=float, default=STARTUP_BUDGET_MS,
+                        help="fail if the median import time exceeds this (default: $STARTUP_BUDGET_MS or 2000)")
+    parser.add_argument("--top", type=int, default=20, help="slowest modules to list")
+    parser.add_argument("--output-dir", default=DEFAULT_OUTPUT_DIR)
+    return parser
+
+
+if __name__ == "__main__":
+    sys.exit(main(build_parser().parse_args()))
@@ -29,4 +29,8 @@ places_collection = database["places"]
 cities_collection = database["cities"]
 countries_collection = database["countries"]
 place_feedback_collection = database["place_feedback"]
-route_feedback_collection = database["route_feedback"]
\ No newline at end of file
+route_feedback_collection = database["route_feedback"]
+feedback_aggregates_collection = database["feedback_aggregates"]
+email_outbox_collection = database["email_outbox"]
+verification_codes_collection = database["verification_codes"]
+geocode_cache_collection = database["geocode_cache"]
\ No newline at end of file
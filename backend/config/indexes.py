@@ -0,0 +1,265 @@
+"""Index declarations for every Wayfare collection, created at startup by ensure_indexes().
+
+Run as a script to create them by hand or to check which index each endpoint's main query uses:
+
+    cd backend
+    python -m config.indexes                         # create/verify indexes
+    python -m config.indexes --explain --city Rome   # explain plans for the main endpoint queries
+"""
+import argparse
+import asyncio
+import os
+import re
+from typing import Any, Dict, List, Optional
+
+from pymongo import ASCENDING, DESCENDING, IndexModel
+from pymongo.collation import Collation
+
+import config.database as database_config
+from services.place_normalization import normalize_text
+from services.feedback_listing import FEEDBACK_SORTS
+from services.place_search import PLACE_SEARCH_SORT
+from services.route_summaries import ROUTE_SUMMARY_SORT
+
+# Case-insensitive equality (strength 2 ignores case, not accents). Queries must pass the same
+# collation to use the *_ci indexes, e.g. find({"city": city}, collation=CASE_INSENSITIVE)
+CASE_INSENSITIVE = Collation(locale="en", strength=2)
+
+ENSURE_INDEXES_ON_STARTUP = os.getenv("ENSURE_INDEXES_ON_STARTUP", "true").lower() == "true"
+
+# collection attribute in config.database -> indexes it should have
+INDEXES: Dict[str, List[IndexModel]] = {
+    "places_collection": [
+        IndexModel([("place_id", ASCENDING)], name="place_id"),
+        # Normalized fields (services/place_normalization.py)
+        # Route candidates, city listings and place search: city equality, sorted by rating then popularity;
+        # the trailing _id makes it the keyset order for search cursors (services/place_search.py)
+        IndexModel([("city_norm", ASCENDING), ("rating_num", DESCENDING), ("popularity_num", ASCENDING),
+                    ("_id", ASCENDING)], name="city_norm_rating_popularity_id"),
+        # Must-visit resolution and exact name lookups within a city
+        IndexModel([("city_norm", ASCENDING), ("name_norm", ASCENDING)], name="city_norm_name_norm"),
+        # Place search: city plus budget range when few places are that cheap
+        IndexModel([("city_norm", ASCENDING), ("price_value", ASCENDING)], name="city_norm_price_value"),
+        IndexModel([("country_norm", ASCENDING)], name="country_norm"),
+    ],
+    "cities_collection": [
+        IndexModel([("name", ASCENDING)], name="name_ci", collation=CASE_INSENSITIVE),
+        IndexModel([("country", ASCENDING)], name="country"),
+    ],
+    "countries_collection": [
+        IndexModel([("name", ASCENDING)], name="name_ci", collation=CASE_INSENSITIVE),
+    ],
+    "route_collection": [
+        # User route listings and their summary pages (keyset on created_at, _id)
+        IndexModel([("user_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   name="user_id_created_at_id"),
+        # Public route summary pages, newest first
+        IndexModel([("is_public", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   name="is_public_created_at_id"),
+    ],
+    "place_feedback_collection": [
+        IndexModel([("user_id", ASCENDING), ("place_id", ASCENDING)], name="user_id_place_id"),
+        # Feedback listings (services/feedback_listing.py): newest, and highest/lowest rating
+        IndexModel([("place_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   name="place_id_created_at_id"),
+        IndexModel([("place_id", ASCENDING), ("rating", DESCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   name="place_id_rating_created_at_id"),
+    ],
+    "route_feedback_collection": [
+        IndexModel([("user_id", ASCENDING), ("route_id", ASCENDING)], name="user_id_route_id"),
+        # Feedback listings (services/feedback_listing.py): newest, and highest/lowest rating
+        IndexModel([("route_id", ASCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   name="route_id_created_at_id"),
+        IndexModel([("route_id", ASCENDING), ("rating", DESCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+                   name="route_id_rating_created_at_id"),
+    ],
+    "feedback_aggregates_collection": [
+        # Leaderboard change detection: latest place aggregate write
+        IndexModel([("kind", ASCENDING), ("updated_at", DESCENDING)], name="kind_updated_at"),
+    ],
+    "email_outbox_collection": [
+        # Outbox polling for due retries and abandoned sends (services/email_outbox.py)
+        IndexModel([("status", ASCENDING), ("next_attempt_at", ASCENDING)], name="status_next_attempt_at"),
+        # Delivered messages are kept a week for troubleshooting, failed ones a month
+        IndexModel([("sent_at", ASCENDING)], name="sent_at_ttl", expireAfterSeconds=7 * 24 * 3600),
+        IndexModel([("failed_at", ASCENDING)], name="failed_at_ttl", expireAfterSeconds=30 * 24 * 3600),
+    ],
+    "verification_codes_collection": [
+        # _id is the code hash; email finds the previous code to replace
+        IndexModel([("email", ASCENDING)], name="email"),
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_ttl", expireAfterSeconds=0),
+    ],
+    "user_collection": [
+        IndexModel([("username", ASCENDING)], name="username", unique=True),
+        IndexModel([("email", ASCENDING)], name="email"),
+    ],
+    "geocode_cache_collection": [
+        IndexModel([("expires_at", ASCENDING)], name="expires_at_1", expireAfterSeconds=0),
+    ],
+}
+
+# Indexes earlier versions created that no query uses any more; ensure_indexes() drops them.
+# Place lookups moved from case-insensitive collation on city/name to the normalized
+# city_norm/name_norm fields, and the keyset search index gained a trailing _id.
+OBSOLETE_INDEXES: Dict[str, List[str]] = {
+    "places_collection": ["city_rating_popularity_ci", "city_name_ci", "city_norm_rating_popularity"],
+    # Route search went back to exact matching for everything but city/country, so it runs without a collation
+    "route_collection": ["is_public_city_ci"],
+}
+
+
+async def ensure_indexes() -> Dict[str, List[str]]:
+    """Create any missing index and drop OBSOLETE_INDEXES; other existing ones are left alone.
+    Returns created/verified names per collection.
+
+    A failure (e.g. duplicate usernames blocking the unique index) is logged and does not stop the others.
+    """
+    for collection_name, names in OBSOLETE_INDEXES.items():
+        collection = getattr(database_config, collection_name)
+        try:
+            existing = set(await collection.index_information())
+        except Exception as e:
+            print(f"DEBUG: Could not list indexes on {collection.name}: {e}")
+            continue
+        for name in names:
+            if name in existing:
+                try:
+                    await collection.drop_index(name)
+                    print(f"DEBUG: Dropped obsolete index {name} on {collection.name}")
+                except Exception as e:
+                    print(f"DEBUG: Could not drop index {name} on {collection.name}: {e}")
+
+    created: Dict[str, List[str]] = {}
+    for collection_name, models in INDEXES.items():
+        collection = getattr(database_config, collection_name)
+        for model in models:
+            try:
+                await collection.create_indexes([model])
+                created.setdefault(collection_name, []).append(model.document["name"])
+            except Exception as e:
+                print(f"DEBUG: Could not create index {model.document['name']} on {collection.name}: {e}")
+    print(f"DEBUG: Indexes ready on {len(created)} collections")
+    return created
+
+
+def endpoint_queries(city: str, country: str, username: str, user_id: str,
+                     place_id: str, route_id: str) -> List[Dict[str, Any]]:
+    """The main query of each endpoint, in the form it is issued by routers/router.py"""
+    return [
+        {"endpoint": "POST /route/create (candidates)", "collection": "places_collection",
+         "filter": {"city_norm": normalize_text(city)},
+         "sort": [("rating_num", DESCENDING), ("popularity_num", ASCENDING)]},
+        {"endpoint": "POST /route/create (must-visit)", "collection": "places_collection",
+         "filter": {"city_norm": normalize_text(city), "name_norm": "colosseum"}},
+        {"endpoint": "GET /places/city", "collection": "places_collection",
+         "filter": {"city_norm": normalize_text(city)}},
+        {"endpoint": "POST /places/search", "collection": "places_collection",
+         "filter": {"city_norm": normalize_text(city), "price_value": {"$lt": 50}},
+         "sort": PLACE_SEARCH_SORT},
+        {"endpoint": "GET /places/search-must-visit", "collection": "places_collection",
+         "filter": {"city_norm": normalize_text(city), "active": {"$ne": False}},
+         "sort": [("rating_num", DESCENDING), ("name", ASCENDING)]},
+        {"endpoint": "POST /places/id", "collection": "places_collection",
+         "filter": {"place_id": {"$in": [place_id]}}},
+        {"endpoint": "POST /route/create (city info)", "collection": "cities_collection",
+         "filter": {"name": city}, "collation": CASE_INSENSITIVE},
+        {"endpoint": "POST /cities/specific", "collection": "cities_collection",
+         "filter": {"country": country}},
+        {"endpoint": "GET /routes/user", "collection": "route_collection",
+         "filter": {"user_id": user_id}},
+        {"endpoint": "GET /routes/user/summary", "collection": "route_collection",
+         "filter": {"user_id": user_id}, "sort": ROUTE_SUMMARY_SORT},
+        {"endpoint": "GET /routes/public/summary", "collection": "route_collection",
+         "filter": {"is_public": True}, "sort": ROUTE_SUMMARY_SORT},
+        {"endpoint": "GET /routes/search", "collection": "route_collection",
+         "filter": {"is_public": True, "user_id": {"$ne": user_id},
+                    "city": {"$regex": f"^{re.escape(city)}$", "$options": "i"}}},
+        {"endpoint": "POST /feedback/place", "collection": "place_feedback_collection",
+         "filter": {"user_id": user_id, "place_id": place_id}},
+        {"endpoint": "GET /feedback/place/{place_id}", "collection": "place_feedback_collection",
+         "filter": {"place_id": place_id}, "sort": FEEDBACK_SORTS["newest"]},
+        {"endpoint": "POST /feedback/route", "collection": "route_feedback_collection",
+         "filter": {"user_id": user_id, "route_id": route_id}},
+        {"endpoint": "GET /feedback/route/{route_id}", "collection": "route_feedback_collection",
+         "filter": {"route_id": route_id}, "sort": FEEDBACK_SORTS["newest"]},
+        {"endpoint": "auth (user lookup)", "collection": "user_collection",
+         "filter": {"username": username}},
+    ]
+
+
+def _plan_stages(plan: Dict[str, Any]):
+    """(stage, index name) pairs of a winning plan, outermost first"""
+    while plan:
+        yield plan.get("stage"), plan.get("indexName")
+        # Slot-based engine nests the classic plan under queryPlan
+        plan = plan.get("queryPlan") or plan.get("inputStage") or (plan.get("inputStages") or [None])[0]
+
+
+def summarize_explain(explain: Dict[str, Any]) -> Dict[str, Any]:
+    winning_plan = explain.get("queryPlanner", {}).get("winningPlan", {})
+    stages = list(_plan_stages(winning_plan))
+    stats = explain.get("executionStats", {})
+    return {
+        "stages": [stage for stage, _ in stages if stage],
+        "index": next((name for _, name in stages if name), None),
+        "collection_scan": any(stage == "COLLSCAN" for stage, _ in stages),
+        "keys_examined": stats.get("totalKeysExamined"),
+        "docs_examined": stats.get("totalDocsExamined"),
+        "returned": stats.get("nReturned"),
+    }
+
+
+async def explain_endpoint_queries(queries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    reports = []
+    for query in queries:
+        collection = getattr(database_config, query["collection"])
+        cursor = collection.find(query["filter"], collation=query.get("collation"))
+        if query.get("sort"):
+            cursor = cursor.sort(query["sort"])
+        summary = summarize_explain(await cursor.explain())
+        summary["endpoint"] = query["endpoint"]
+        summary["collection"] = collection.name
+        reports.append(summary)
+    return reports
+
+
+async def main(args):
+    if not args.skip_create:
+        await ensure_indexes()
+    if not args.explain:
+        return 0
+
+    queries = endpoint_queries(args.city, args.country, args.username, args.user_id, args.place_id, args.route_id)
+    reports = await explain_endpoint_queries(queries)
+    print(f"{'endpoint':<34} {'collection':<16} {'index':<28} {'keys':>7} {'docs':>7} {'returned':>8}")
+    print("-" * 105)
+    for report in reports:
+        index = report["index"] or ("COLLSCAN" if report["collection_scan"] else "-")
+        print(f"{report['endpoint']:<34} {report['collection']:<16} {index:<28} "
+              f"{_fmt(report['keys_examined']):>7} {_fmt(report['docs_examined']):>7} {_fmt(report['returned']):>8}")
+    scans = [report["endpoint"] for report in reports if report["collection_scan"]]
+    if scans:
+        print(f"\nCollection scans: {', '.join(scans)}")
+    return 1 if scans and args.fail_on_collscan else 0
+
+
+def _fmt(value: Optional[int]) -> str:
+    return "-" if value is None else str(value)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Create Wayfare indexes and report index usage per endpoint")
+    parser.add_argument("--explain", action="store_true", help="print explain plans for each endpoint's main query")
+    parser.add_argument("--skip-create", action="store_true", help="only explain, do not create indexes")
+    parser.add_argument("--fail-on-collscan", action="store_true", help="exit 1 if any query scans a collection")
+    parser.add_argument("--city", default="Rome")
+    parser.add_argument("--country", default="Italy")
+    parser.add_argument("--username", default="demo")
+    parser.add_argument("--user-id", default="000000000000000000000000")
+    parser.add_argument("--place-id", default="demo-place")
+    parser.add_argument("--route-id", default="000000000000000000000000")
+    return parser
+
+
+if __name__ == "__main__":
+    raise SystemExit(asyncio.run(main(build_parser().parse_args())))
@@ -1,11 +1,11 @@
-from fastapi import FastAPI, HTTPException,Depends
-from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from fastapi import FastAPI, HTTPException,Depends, Header
+from fastapi.security import HTTPBearer
 from fastapi.middleware.cors import CORSMiddleware
 import motor.motor_asyncio
 import os
 from dotenv import load_dotenv
 from fastapi.openapi.utils import get_openapi
-from typing import Optional
+from typing import Dict, Optional
 
 load_dotenv()  # Load environment variables from .env file
 
@@ -15,15 +15,19 @@ from routers.router import(
     create_access_token,
     add_user_info,
     get_current_user,
+    get_authenticated_user,
     delete_user_account_endpoint,
     change_user_password_endpoint,
     create_route_endpoint,
     get_user_routes_endpoint,
+    get_user_route_summaries_endpoint,
     get_route_by_id_endpoint,
     update_route_endpoint,
     delete_route_endpoint,
     get_public_routes_endpoint,
+    get_public_route_summaries_endpoint,
     search_public_routes_endpoint,
+    search_public_route_summaries_endpoint,
     toggle_route_privacy_endpoint,
     get_cities_endpoint,
     search_cities_endpoint,
@@ -85,6 +89,16 @@ from config.database import (
     user_collection,        
     route_collection
 )
+from config.indexes import ENSURE_INDEXES_ON_STARTUP, ensure_indexes
+from scrapper import start_place_scraper, stop_place_scraper
+from services.place_normalization import PLACE_BACKFILL_ON_STARTUP, backfill_normalized_fields
+from services.password_hasher import password_hasher
+from services.reference_cache import reference_cache
+from services.route_summaries import ROUTE_COVER_BACKFILL_ON_STARTUP, backfill_cover_images
+from services.view_counter import view_counter
+from services.feedback_aggregates import ensure_feedback_aggregates
+from services.leaderboard import top_rated_places
+from services.email_outbox import email_outbox
 
 
 app = FastAPI()
@@ -121,6 +135,43 @@ def custom_openapi():
 
 app.openapi = custom_openapi
 
+
+async def run_startup_job(name: str, job):
+    """Run a one-off data job at startup; a failure is logged and the app starts anyway.
+    Each job can also be run by hand with its `python -m` command."""
+    try:
+        await job
+    except Exception as e:
+        print(f"DEBUG: Startup job {name} failed, continuing without it: {e}")
+
+
+@app.on_event("startup")
+async def startup_services():
+    if ENSURE_INDEXES_ON_STARTUP:
+        await run_startup_job("ensure_indexes", ensure_indexes())
+    if PLACE_BACKFILL_ON_STARTUP:
+        await run_startup_job("backfill_normalized_fields", backfill_normalized_fields(only_missing=True))
+    if ROUTE_COVER_BACKFILL_ON_STARTUP:
+        await run_startup_job("backfill_cover_images", backfill_cover_images(only_missing=True))
+    await run_startup_job("ensure_feedback_aggregates", ensure_feedback_aggregates())
+    await start_place_scraper()
+    await reference_cache.start()
+    await view_counter.start()
+    await top_rated_places.start()
+    await email_outbox.start()
+    password_hasher.start()
+
+
+@app.on_event("shutdown")
+async def shutdown_services():
+    await stop_place_scraper()
+    await reference_cache.stop()
+    await view_counter.stop()
+    await top_rated_places.stop()
+    await email_outbox.stop()
+    password_hasher.shutdown()
+
+
 # USER ENDPOINTS
 @app.post("/user/register", tags=["User"])
 async def register_user(user_data: UserRegistration):
@@ -144,8 +195,8 @@ async def login_for_access_token(user_data: UserLogin):
 
 
 @app.post("/user/addInfo", tags=["User"])
-async def add_user_info_helper(user_info: UserAddInfo,token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    response = await add_user_info(user_info, token)
+async def add_user_info_helper(user_info: UserAddInfo, current_user: Dict = Depends(get_authenticated_user)):
+    response = await add_user_info(user_info, current_user)
     if response:
         return response
     else:
@@ -153,45 +204,54 @@ async def add_user_info_helper(user_info: UserAddInfo,token: HTTPAuthorizationCr
 
 
 @app.get("/user/getCurrentUser", tags=["User"])
-async def current_user_endpoint(token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    return await get_current_user(token)
+async def current_user_endpoint(current_user: Dict = Depends(get_authenticated_user)):
+    return await get_current_user(current_user)
 
 
 @app.post("/user/changePassword", tags=["User"])
 async def change_password_route(
     data: ChangePasswordRequest,
-    token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)
+    current_user: Dict = Depends(get_authenticated_user)
 ):
-    return await change_user_password_endpoint(data, token)
+    return await change_user_password_endpoint(data, current_user)
 
 
 @app.delete("/user/delete", tags=["User"])
 async def delete_user_route(
     body: DeleteUserRequest,
-    token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)
+    current_user: Dict = Depends(get_authenticated_user)
 ):
-    return await delete_user_account_endpoint(body, token)
+    return await delete_user_account_endpoint(body, current_user)
 
 
 # ROUTE ENDPOINTS
 @app.post("/route/create", tags=["Route"])
 async def create_route_main(
     route_input: RouteCreateInput,
-    token: HTTPAuthorizationCredentials = Depends(HTTPBearer())
+    current_user: Dict = Depends(get_authenticated_user)
 ):
-    return await create_route_endpoint(route_input, token)
+    return await create_route_endpoint(route_input, current_user)
 
 
 @app.get("/routes/user", tags=["Route"])
 async def get_user_routes_main(
-    token: HTTPAuthorizationCredentials = Depends(HTTPBearer())
+    current_user: Dict = Depends(get_authenticated_user)
+):
+    return await get_user_routes_endpoint(current_user)
+
+
+@app.get("/routes/user/summary", tags=["Route"])
+async def get_user_route_summaries_main(
+    current_user: Dict = Depends(get_authenticated_user),
+    limit: int = 20,
+    cursor: Optional[str] = None
 ):
-    return await get_user_routes_endpoint(token)
+    return await get_user_route_summaries_endpoint(current_user, limit, cursor)
 
 
 @app.get("/routes/search", tags=["Route"])
 async def search_public_routes_main(
-    token: HTTPAuthorizationCredentials = Depends(HTTPBearer()),
+    current_user: Dict = Depends(get_authenticated_user),
     q: Optional[str] = None,
     city: Optional[str] = None,
     country: Optional[str] = None,
@@ -202,92 +262,126 @@ async def search_public_routes_main(
     limit: int = 20,
     sort_by: str = "popularity"
 ):
-    return await search_public_routes_endpoint(token, q, city, country, category, season, budget, travel_style, limit, sort_by)
+    return await search_public_routes_endpoint(current_user, q, city, country, category, season, budget, travel_style, limit, sort_by)
+
+
+@app.get("/routes/search/summary", tags=["Route"])
+async def search_public_route_summaries_main(
+    current_user: Dict = Depends(get_authenticated_user),
+    q: Optional[str] = None,
+    city: Optional[str] = None,
+    country: Optional[str] = None,
+    category: Optional[str] = None,
+    season: Optional[str] = None,
+    budget: Optional[str] = None,
+    travel_style: Optional[str] = None,
+    limit: int = 20,
+    sort_by: str = "popularity",
+    cursor: Optional[str] = None
+):
+    return await search_public_route_summaries_endpoint(
+        current_user, q, city, country, category, season, budget, travel_style, limit, sort_by, cursor
+    )
 
 
 @app.get("/routes/public", tags=["Route"])
 async def get_public_routes_main(
-    token: HTTPAuthorizationCredentials = Depends(HTTPBearer()),
+    current_user: Dict = Depends(get_authenticated_user),
     category: Optional[str] = None,
     season: Optional[str] = None,
     budget: Optional[str] = None,
     limit: int = 10
 ):
-    return await get_public_routes_endpoint(token, category, season, budget, limit)
+    return await get_public_routes_endpoint(current_user, category, season, budget, limit)
+
+
+@app.get("/routes/public/summary", tags=["Route"])
+async def get_public_route_summaries_main(
+    current_user: Dict = Depends(get_authenticated_user),
+    category: Optional[str] = None,
+    season: Optional[str] = None,
+    budget: Optional[str] = None,
+    limit: int = 10,
+    cursor: Optional[str] = None
+):
+    return await get_public_route_summaries_endpoint(current_user, category, season, budget, limit, cursor)
 
 
 @app.get("/routes/{route_id}", tags=["Route"])
 async def get_route_by_id_main(
     route_id: str,
-    token: HTTPAuthorizationCredentials = Depends(HTTPBearer())
+    current_user: Dict = Depends(get_authenticated_user)
 ):
-    return await get_route_by_id_endpoint(route_id, token)
+    return await get_route_by_id_endpoint(route_id, current_user)
 
 
 @app.put("/routes/{route_id}", tags=["Route"])
 async def update_route_main(
     route_id: str,
     route_update: RouteUpdateInput,
-    token: HTTPAuthorizationCredentials = Depends(HTTPBearer())
+    current_user: Dict = Depends(get_authenticated_user)
 ):
-    return await update_route_endpoint(route_id, route_update, token)
+    return await update_route_endpoint(route_id, route_update, current_user)
 
 
 @app.delete("/routes/{route_id}", tags=["Route"])
 async def delete_route_main(
     route_id: str,
-    token: HTTPAuthorizationCredentials = Depends(HTTPBearer())
+    current_user: Dict = Depends(get_authenticated_user)
 ):
-    return await delete_route_endpoint(route_id, token)
+    return await delete_route_endpoint(route_id, current_user)
 
 
 @app.patch("/routes/{route_id}/privacy", tags=["Route"])
 async def toggle_route_privacy_main(
     route_id: str,
     is_public: bool,
-    token: HTTPAuthorizationCredentials = Depends(HTTPBearer())
+    current_user: Dict = Depends(get_authenticated_user)
 ):
-    return await toggle_route_privacy_endpoint(route_id, is_public, token)
+    return await toggle_route_privacy_endpoint(route_id, is_public, current_user)
 
 
 # PLACES ENDPOINTS
 @app.get("/places/city", tags=["Places"])
 async def get_places_in_city(
     city: str,
-    token: HTTPAuthorizationCredentials = Depends(HTTPBearer())
+    current_user: Dict = Depends(get_authenticated_user)
 ):
-    return await get_places_in_city_endpoint(city, token)
+    return await get_places_in_city_endpoint(city, current_user)
 
 
 @app.post("/places/id", tags=["Places"])
 async def get_place_by_id_main(
     request: GetPlacesByIdsRequest,
-    token: HTTPAuthorizationCredentials = Depends(HTTPBearer())
+    current_user: Dict = Depends(get_authenticated_user)
 ):
-    return await get_place_by_id_endpoint(request, token)
+    return await get_place_by_id_endpoint(request, current_user)
 
 
 @app.post("/places/search", tags=["Places"])
 async def search_places_main(
     request: SearchPlacesRequest,
-    token: HTTPAuthorizationCredentials = Depends(HTTPBearer())
+    current_user: Dict = Depends(get_authenticated_user)
 ):
-    return await search_places_endpoint(request, token)
+    return await search_places_endpoint(request, current_user)
 
 
 @app.post("/places/autocomplete", tags=["Places"])
 async def autocomplete_places_main(
     request: AutocompletePlacesRequest,
-    token: HTTPAuthorizationCredentials = Depends(HTTPBearer())
+    current_user: Dict = Depends(get_authenticated_user)
 ):
-    return await autocomplete_places_endpoint(request, token)
+    return await autocomplete_places_endpoint(request, current_user)
 
 
 @app.get("/places/top-rated", tags=["Places"])
 async def get_top_rated_places_main(
-    token: HTTPAuthorizationCredentials = Depends(HTTPBearer())
+    current_user: Dict = Depends(get_authenticated_user),
+    city: Optional[str] = None,
+    category: Optional[str] = None,
+    limit: int = 10
 ):
-    return await get_top_rated_places_endpoint(token)
+    return await get_top_rated_places_endpoint(current_user, city, category, limit)
 
 
 # CITIES ENDPOINTS
@@ -295,9 +389,9 @@ async def get_top_rated_places_main(
 async def search_cities(
     q: str,
     limit: int = 10,
-    token: HTTPAuthorizationCredentials = Depends(HTTPBearer())
+    current_user: Dict = Depends(get_authenticated_user)
 ):
-    return await search_cities_endpoint(q, limit, token)
+    return await search_cities_endpoint(q, limit, current_user)
 
 
 # PLACE SEARCH FOR MUST-VISIT SELECTION
@@ -307,96 +401,118 @@ async def search_places_for_must_visit_main(
     query: str = "",
     category: str = None,
     limit: int = 20,
-    token: HTTPAuthorizationCredentials = Depends(HTTPBearer())
+    current_user: Dict = Depends(get_authenticated_user)
 ):
-    return await search_places_for_must_visit_endpoint(city, query, category, limit, token)
+    return await search_places_for_must_visit_endpoint(city, query, category, limit, current_user)
 
 
 @app.get("/cities/all", tags=["Cities"])
-async def get_all_cities(token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    return await get_cities_endpoint()
+async def get_all_cities(
+    current_user: Dict = Depends(get_authenticated_user),
+    if_none_match: Optional[str] = Header(None)
+):
+    return await get_cities_endpoint(if_none_match)
 
 
 @app.post("/cities/specific", tags=["Cities"])
-async def get_cities_by_name(request: CityByCountryRequest, token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    return await get_cities_by_country_endpoint(request.country, token)
+async def get_cities_by_name(request: CityByCountryRequest, current_user: Dict = Depends(get_authenticated_user)):
+    return await get_cities_by_country_endpoint(request.country, current_user)
 
 
 # COUNTRIES ENDPOINTS
 @app.get("/countries/all", tags=["Countries"])
-async def get_all_countries(token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    return await get_all_countries_endpoint(token)
+async def get_all_countries(
+    current_user: Dict = Depends(get_authenticated_user),
+    if_none_match: Optional[str] = Header(None)
+):
+    return await get_all_countries_endpoint(current_user, if_none_match)
 
 @app.post("/countries/region", tags=["Countries"])
 async def get_countries_by_region(
     request: GetCountriesByRegionRequest,
-    token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)
+    current_user: Dict = Depends(get_authenticated_user),
+    if_none_match: Optional[str] = Header(None)
 ):
-    return await get_countries_by_region_endpoint(request, token)
+    return await get_countries_by_region_endpoint(request, current_user, if_none_match)
 
 @app.post("/countries/search", tags=["Countries"])
 async def search_countries(
     request: SearchCountriesRequest,
-    token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)
+    current_user: Dict = Depends(get_authenticated_user)
 ):
-    return await search_countries_endpoint(request, token)
+    return await search_countries_endpoint(request, current_user)
 
 @app.get("/countries/allRegions", tags=["Countries"])
-async def get_all_regions(token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    return await get_all_regions_endpoint(token)
+async def get_all_regions(
+    current_user: Dict = Depends(get_authenticated_user),
+    if_none_match: Optional[str] = Header(None)
+):
+    return await get_all_regions_endpoint(current_user, if_none_match)
 
 
 # FEEDBACK ENDPOINTS
 
 # Place Feedback Endpoints
 @app.post("/feedback/place", tags=["Feedback"])
-async def submit_place_feedback(request: SubmitPlaceFeedbackRequest, token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    return await submit_place_feedback_endpoint(request, token)
+async def submit_place_feedback(request: SubmitPlaceFeedbackRequest, current_user: Dict = Depends(get_authenticated_user)):
+    return await submit_place_feedback_endpoint(request, current_user)
 
 @app.get("/feedback/place/{place_id}", tags=["Feedback"]) 
-async def get_place_feedback(place_id: str, token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    return await get_place_feedback_endpoint(place_id, token)
+async def get_place_feedback(
+    place_id: str,
+    current_user: Dict = Depends(get_authenticated_user),
+    sort_by: str = "newest",
+    limit: int = 20,
+    cursor: Optional[str] = None
+):
+    return await get_place_feedback_endpoint(place_id, current_user, sort_by, limit, cursor)
 
 @app.get("/feedback/place/{place_id}/user/{user_id}", tags=["Feedback"])
-async def get_user_place_feedback(place_id: str, user_id: str, token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    return await get_user_place_feedback_endpoint(place_id, user_id, token)
+async def get_user_place_feedback(place_id: str, user_id: str, current_user: Dict = Depends(get_authenticated_user)):
+    return await get_user_place_feedback_endpoint(place_id, user_id, current_user)
 
 @app.put("/feedback/place/{feedback_id}", tags=["Feedback"])
-async def update_place_feedback(feedback_id: str, request: UpdatePlaceFeedbackRequest, token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    return await update_place_feedback_endpoint(feedback_id, request, token)
+async def update_place_feedback(feedback_id: str, request: UpdatePlaceFeedbackRequest, current_user: Dict = Depends(get_authenticated_user)):
+    return await update_place_feedback_endpoint(feedback_id, request, current_user)
 
 @app.delete("/feedback/place/{feedback_id}", tags=["Feedback"])
-async def delete_place_feedback(feedback_id: str, token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    return await delete_place_feedback_endpoint(feedback_id, token)
+async def delete_place_feedback(feedback_id: str, current_user: Dict = Depends(get_authenticated_user)):
+    return await delete_place_feedback_endpoint(feedback_id, current_user)
 
 @app.get("/feedback/place/{place_id}/stats", tags=["Feedback"])
-async def get_place_feedback_stats(place_id: str, token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    return await get_place_feedback_stats_endpoint(place_id, token)
+async def get_place_feedback_stats(place_id: str, current_user: Dict = Depends(get_authenticated_user)):
+    return await get_place_feedback_stats_endpoint(place_id, current_user)
 
 # Route Feedback Endpoints
 @app.post("/feedback/route", tags=["Feedback"])
-async def submit_route_feedback(request: SubmitRouteFeedbackRequest, token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    return await submit_route_feedback_endpoint(request, token)
+async def submit_route_feedback(request: SubmitRouteFeedbackRequest, current_user: Dict = Depends(get_authenticated_user)):
+    return await submit_route_feedback_endpoint(request, current_user)
 
 @app.get("/feedback/route/{route_id}", tags=["Feedback"])
-async def get_route_feedback(route_id: str, token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    return await get_route_feedback_endpoint(route_id, token)
+async def get_route_feedback(
+    route_id: str,
+    current_user: Dict = Depends(get_authenticated_user),
+    sort_by: str = "newest",
+    limit: int = 20,
+    cursor: Optional[str] = None
+):
+    return await get_route_feedback_endpoint(route_id, current_user, sort_by, limit, cursor)
 
 @app.get("/feedback/route/{route_id}/stats", tags=["Feedback"])
-async def get_route_feedback_stats(route_id: str, token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    return await get_route_feedback_stats_endpoint(route_id, token)
+async def get_route_feedback_stats(route_id: str, current_user: Dict = Depends(get_authenticated_user)):
+    return await get_route_feedback_stats_endpoint(route_id, current_user)
 
 @app.put("/feedback/route/{feedback_id}", tags=["Feedback"])
-async def update_route_feedback(feedback_id: str, request: UpdateRouteFeedbackRequest, token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    return await update_route_feedback_endpoint(feedback_id, request, token)
+async def update_route_feedback(feedback_id: str, request: UpdateRouteFeedbackRequest, current_user: Dict = Depends(get_authenticated_user)):
+    return await update_route_feedback_endpoint(feedback_id, request, current_user)
 
 @app.delete("/feedback/route/{feedback_id}", tags=["Feedback"])
-async def delete_route_feedback(feedback_id: str, token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    return await delete_route_feedback_endpoint(feedback_id, token)
+async def delete_route_feedback(feedback_id: str, current_user: Dict = Depends(get_authenticated_user)):
+    return await delete_route_feedback_endpoint(feedback_id, current_user)
 
 @app.get("/feedback/route/{route_id}/user/{user_id}", tags=["Feedback"])
-async def get_user_route_feedback(route_id: str, user_id: str, token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    return await get_user_route_feedback_endpoint(route_id, user_id, token)
+async def get_user_route_feedback(route_id: str, user_id: str, current_user: Dict = Depends(get_authenticated_user)):
+    return await get_user_route_feedback_endpoint(route_id, user_id, current_user)
 
 # EMAIL VERIFICATION ENDPOINTS
 @app.post("/user/sendVerification", tags=["User"])
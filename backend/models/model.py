@@ -121,6 +121,7 @@ class Route(BaseModel):
     stats: RouteStats = Field(default_factory=lambda: RouteStats())
     must_visit: List[MustVisit]
     days: List[Day]
+    cover_image: Optional[str] = None  # First activity image, shown on route list screens
     created_at: Optional[datetime] = None
     updated_at: Optional[datetime] = None
 
@@ -169,6 +170,33 @@ class RouteListResponse(BaseModel):
     status_code: int
     data: List[RouteResponse]
 
+# Route without its itinerary, for list screens
+class RouteSummary(BaseModel):
+    route_id: str
+    user_id: str
+    title: str
+    city: str
+    country: Optional[str] = None
+    start_date: str
+    end_date: str
+    budget: Optional[str] = None
+    travel_style: Optional[str] = None
+    category: Optional[str] = None
+    season: Optional[str] = None
+    is_public: bool = False
+    stats: RouteStats = Field(default_factory=lambda: RouteStats())
+    cover_image: Optional[str] = None
+    created_at: Optional[datetime] = None
+    updated_at: Optional[datetime] = None
+
+class RouteSummaryListResponse(BaseModel):
+    success: bool
+    message: str
+    status_code: int
+    data: List[RouteSummary]
+    # Pass back as `cursor` for the next page; None on the last page
+    next_cursor: Optional[str] = None
+
 class RouteDetailResponse(BaseModel):
     success: bool
     message: str
@@ -346,6 +374,8 @@ class SearchPlacesResponse(BaseModel):
     message: str
     status_code: int
     data: List[PlaceInCityResponse]
+    # Pass back as SearchPlacesRequest.cursor for the next page; None on the last page
+    next_cursor: Optional[str] = None
 
 class SearchPlacesRequest(BaseModel):
     city: str
@@ -357,6 +387,7 @@ class SearchPlacesRequest(BaseModel):
     min_rating: Optional[float] = None
     keywords: Optional[str] = None
     limit: Optional[int] = 10
+    cursor: Optional[str] = None
 
 
 class AutocompletePlacesRequest(BaseModel):
@@ -470,12 +501,14 @@ class GetPlaceFeedbackResponse(BaseModel):
     message: str
     status_code: int
     data: List[PlaceFeedbackResponse]
+    next_cursor: Optional[str] = None  # Next page of a feedback listing; None on the last page
 
 class GetRouteFeedbackResponse(BaseModel):
     success: bool
     message: str
     status_code: int
     data: List[RouteFeedbackResponse]
+    next_cursor: Optional[str] = None  # Next page of a feedback listing; None on the last page
 
 class UpdateFeedbackResponse(BaseModel):
     success: bool
@@ -517,6 +550,7 @@ class TopRatedPlaceResponse(BaseModel):
     price: Optional[str] = None
     rating: float  # Original place rating
     wayfare_rating: float  # Calculated average from feedback (renamed)
+    weighted_rating: Optional[float] = None  # Bayesian average used for ranking
     total_feedback_count: int  # Number of feedback entries
     image: Optional[str] = None
     detail_url: Optional[str] = None
@@ -1,13 +1,15 @@
 from models.model import UserRegistration
 from typing import List  # Import List from the typing module
 from fastapi import APIRouter
-from fastapi_mail import MessageSchema, MessageType
 import random
+import asyncio
+import hashlib
+import uuid
 from motor.motor_asyncio import AsyncIOMotorCollection
 import string
 from config.database import user_collection
+from pymongo import ReturnDocument
 from bson import ObjectId #this is what mongodb uses to be able to identify the id that it creates itself
-from passlib.context import CryptContext
 from jose import JWTError, jwt
 from fastapi.security import OAuth2PasswordBearer, HTTPAuthorizationCredentials, HTTPBearer
 from config.database import database
@@ -21,14 +23,37 @@ import logging
 from collections import Counter
 import numpy as np
 from jose import JWTError, jwt
-from sklearn.preprocessing import LabelEncoder
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
-from scipy.sparse.linalg import svds
 from fastapi.responses import JSONResponse
 from jose import jwt, JWTError
 from typing import Dict, List
-from scrapper import PlaceScraper 
+from scrapper import PlaceScraper, get_place_scraper
+from services.distance_matrix import DistanceMatrix
+from services.spatial_index import city_spatial_indexes
+from services.autocomplete_index import city_autocomplete_indexes
+from services.route_planner import cluster_places_into_days, order_day_places
+from services.opening_hours import compile_opening_hours, minute_of_week
+from services.profiling import stage_checkpoint
+from services.password_hasher import password_hasher
+from services.user_cache import user_cache
+from services.view_counter import view_counter
+from services.feedback_aggregates import PLACE, ROUTE, apply_rating_change, get_feedback_stats
+from services.leaderboard import LEADERBOARD_MAX_SIZE, top_rated_places
+from services.feedback_listing import InvalidFeedbackSort, fetch_feedback_page
+from services.email_outbox import email_outbox
+from services.verification_store import is_expired, verification_store
+from config.indexes import CASE_INSENSITIVE
+from services.place_normalization import normalize_text, parse_price
+from services.place_search import PLACE_SEARCH_SORT, build_place_search_query, search_limit
+from services.pagination import InvalidCursor, fetch_page
+from services.route_summaries import ROUTE_SUMMARY_PROJECTION, ROUTE_SUMMARY_SORT, cover_image, route_summary_document
+from services.reference_cache import (
+    CITIES_VIEW,
+    COUNTRIES_VIEW,
+    EMPTY_REGION_VIEW,
+    REGIONS_VIEW,
+    reference_cache,
+    region_view,
+)
 
 from typing import Optional
 
@@ -49,9 +74,7 @@ from models.model import(
     PlaceSearchResult,
     PlaceSearchResponse,
     CityByCountryRequest,
-    GetAllCitiesResponse,
     GetCitiesByCountryResponse,
-    GetAllCountiesResponse,
     GetAllCountriesListResponse,
     GetCountriesByRegionRequest,
     GetCountriesByRegionResponse,
@@ -61,7 +84,7 @@ from models.model import(
     GetPlaceByIdResponse,
     GetPlacesByIdsRequest,
     SearchPlacesRequest,
-    RouteResponse, RouteListResponse, RouteDetailResponse, RouteCreateResponse, RouteUpdateInput,
+    RouteResponse, RouteListResponse, RouteSummary, RouteSummaryListResponse, RouteDetailResponse, RouteCreateResponse, RouteUpdateInput,
     Coordinates, Activity, Day, MustVisit, RouteCreateInput, Route, RouteStats,
     GetPlacesInCityResponse, PlaceInCityResponse, SearchPlacesResponse, SearchPlacesRequest,PlaceCoordinates,
     PlaceModel, AutocompletePlacesRequest,
@@ -73,7 +96,7 @@ from models.model import(
     UpdateFeedbackResponse, DeleteFeedbackResponse, FeedbackStatsResponse,
     # Email Verification Models
     SendVerificationRequest, VerifyCodeRequest, VerificationResponse,
-    TopRatedPlacesResponse, TopRatedPlaceResponse
+    TopRatedPlacesResponse
 )
 from config.database import (
     user_collection,
@@ -84,7 +107,6 @@ from config.database import (
     place_feedback_collection,
     route_feedback_collection
 )
-from config.email import fastmail
 import os
 from dotenv import load_dotenv
 
@@ -96,15 +118,13 @@ SECRET_KEY = os.getenv("SECRET_KEY", "fallback_secret_key_change_in_production")
 FORGET_PWD_SECRET_KEY = os.getenv("FORGET_PWD_SECRET_KEY", "fallback_forget_pwd_key_change_in_production")
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+# Upper bound on must-visit places enriched (scraper + database lookups) at the same time per route
+MUST_VISIT_ENRICHMENT_CONCURRENCY = int(os.getenv("MUST_VISIT_ENRICHMENT_CONCURRENCY", "4"))
 outh2_scheme = OAuth2PasswordBearer(tokenUrl="token")
 oauth2_scheme = HTTPBearer()
 router = APIRouter()
 
 
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
-
 async def register_user_endpoint(user_data: UserRegistration):
     # Check if username or email already exists
     existing_user = await user_collection.find_one({
@@ -117,7 +137,7 @@ async def register_user_endpoint(user_data: UserRegistration):
         raise HTTPException(status_code=400, detail="Username or email already registered")
 
     # Hash the password
-    hashed_password = pwd_context.hash(user_data.password)
+    hashed_password = await password_hasher.hash(user_data.password)
 
     # Convert model to dict and apply updates
     user_data_dict = user_data.model_dump()
@@ -147,8 +167,8 @@ async def register_user_endpoint(user_data: UserRegistration):
     }
 
 
-def verify_password(plain_password, hashed_password):
-    return pwd_context.verify(plain_password, hashed_password)
+async def verify_password(plain_password, hashed_password):
+    return await password_hasher.verify(plain_password, hashed_password)
 
 def create_reset_password_token(email: str):
     data = {"sub": email, "exp": datetime.utcnow() + timedelta(minutes=10)}
@@ -168,7 +188,7 @@ async def authenticate_user(username: str, password: str, user_collection):
     user = await get_user(username, user_collection)
     if not user:
         return False
-    if not verify_password(password, user.hashed_password):
+    if not await verify_password(password, user.hashed_password):
         return False
     return user
 
@@ -176,145 +196,115 @@ async def authenticate_user(username: str, password: str, user_collection):
 def create_access_token(data: dict):
     to_encode = data.copy()
     expire = datetime.utcnow() + timedelta(minutes=ACCESS_TOKEN_EXPIRE_MINUTES)
-    to_encode.update({"exp": expire})
+    # jti identifies the token, so cached user lookups are scoped to it
+    to_encode.update({"exp": expire, "jti": uuid.uuid4().hex})
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
 
+async def get_authenticated_user(token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)) -> Dict:
+    """FastAPI dependency: verify the bearer token once and return the user document.
 
-async def add_user_info(user_info: UserAddInfo, token: HTTPAuthorizationCredentials):
+    Lookups are served from user_cache for a short TTL, keyed by (username, token id).
+    The returned document never includes hashed_password (see get_hashed_password).
+    """
     try:
-        current_user = await get_current_user(token)
+        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
+    except JWTError:
+        raise HTTPException(status_code=401, detail="Invalid token")
+
+    username = payload.get("sub")
+    if not username:
+        raise HTTPException(status_code=401, detail="Invalid credentials")
+
+    # Tokens issued before jti was added are identified by their hash
+    token_id = payload.get("jti") or hashlib.sha256(token.credentials.encode()).hexdigest()
+    user = user_cache.get(username, token_id)
+    if user is None:
+        user = await user_collection.find_one({"username": username})
+        if not user:
+            raise HTTPException(status_code=404, detail="User not found")
+        user.pop("hashed_password", None)
+        user_cache.set(username, token_id, user)
+    return user
+
+
+async def get_hashed_password(username: str) -> str:
+    """Current password hash, always read from MongoDB rather than the user cache"""
+    user = await user_collection.find_one({"username": username}, {"hashed_password": 1})
+    if not user:
+        raise HTTPException(status_code=404, detail="User not found")
+    return user["hashed_password"]
 
+
+async def add_user_info(user_info: UserAddInfo, current_user: Dict):
+    try:
         # Update only the preferences field for the current user
         await user_collection.update_one(
-            {"username": current_user.username},
+            {"username": current_user["username"]},
             {"$set": {
                 "preferences": user_info.preferences.dict(),
                 "home_city": user_info.home_city
                 
             }}
         )
+        user_cache.invalidate_user(current_user["username"])
 
         return {"message": "User preferences updated successfully", "success": True}
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
 
-async def get_current_user(credentials: HTTPAuthorizationCredentials = Depends(oauth2_scheme)) -> UserInDB:
-    token = credentials.credentials
-    try:
-        payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        username: str = payload.get("sub")
-        if username is None:
-            raise HTTPException(status_code=401, detail="Invalid authentication credentials")
-        user = await user_collection.find_one({"username": username})
-        #print("Username from token:", username)
-        #print("Matched user:", user)
-        if user:
-            return UserInDB(**user)
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-
-
-
-async def get_current_user_endpoint(token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    return await get_current_user(token)
-
-
-async def get_current_user(token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)) -> UserInDB:
-    try:
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-
-        user = await user_collection.find_one({"username": username})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
-        return UserInfoResponse(
-            user_id=str(user.get("_id")),
-            email=user.get("email"),
-            username=user.get("username"),
-            name=user.get("first_name"),
-            surname=user.get("last_name"),
-            preferences=user.get("preferences"),
-            home_city=user.get("home_city")
-        )
-
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
-    
-
-
+async def get_current_user(current_user: Dict) -> UserInfoResponse:
+    return UserInfoResponse(
+        user_id=str(current_user.get("_id")),
+        email=current_user.get("email"),
+        username=current_user.get("username"),
+        name=current_user.get("first_name"),
+        surname=current_user.get("last_name"),
+        preferences=current_user.get("preferences"),
+        home_city=current_user.get("home_city")
+    )
 
-async def delete_user_account_endpoint(body: DeleteUserRequest, token: HTTPAuthorizationCredentials):
-    try:
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid token payload")
 
-        user = await user_collection.find_one({"username": username})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+async def delete_user_account_endpoint(body: DeleteUserRequest, current_user: Dict):
+    username = current_user["username"]
 
-        if not pwd_context.verify(body.password, user["hashed_password"]):
-            raise HTTPException(status_code=403, detail="Incorrect password")
+    if not await password_hasher.verify(body.password, await get_hashed_password(username)):
+        raise HTTPException(status_code=403, detail="Incorrect password")
 
-        await user_collection.delete_one({"username": username})
-        return {"message": "User deleted successfully", "success": True}
+    await user_collection.delete_one({"username": username})
+    user_cache.invalidate_user(username)
+    return {"message": "User deleted successfully", "success": True}
 
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
     
 
 
 
-async def change_user_password_endpoint(data: ChangePasswordRequest, token: HTTPAuthorizationCredentials):
-    try:
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid token")
-
-        user = await user_collection.find_one({"username": username})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
+async def change_user_password_endpoint(data: ChangePasswordRequest, current_user: Dict):
+    username = current_user["username"]
 
-        if not pwd_context.verify(data.current_password, user["hashed_password"]):
-            raise HTTPException(status_code=403, detail="Current password is incorrect")
+    if not await password_hasher.verify(data.current_password, await get_hashed_password(username)):
+        raise HTTPException(status_code=403, detail="Current password is incorrect")
 
-        if data.new_password != data.confirm_password:
-            raise HTTPException(status_code=400, detail="New passwords do not match")
+    if data.new_password != data.confirm_password:
+        raise HTTPException(status_code=400, detail="New passwords do not match")
 
-        new_hashed_password = pwd_context.hash(data.new_password)
-        await user_collection.update_one(
-            {"username": username},
-            {"$set": {"hashed_password": new_hashed_password}}
-        )
+    new_hashed_password = await password_hasher.hash(data.new_password)
+    await user_collection.update_one(
+        {"username": username},
+        {"$set": {"hashed_password": new_hashed_password}}
+    )
+    user_cache.invalidate_user(username)
 
-        return {"message": "Password changed successfully", "success": True}
+    return {"message": "Password changed successfully", "success": True}
 
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
 
 
 
 def is_place_open(opening_hours: Dict, visit_time: datetime) -> bool:
-    day = visit_time.strftime("%A")
-    hours = opening_hours.get(day)
-    if not hours or hours.strip() == "" or hours.lower() == "notice":
-        return True  # No info: assume always open
-    try:
-        open_str, close_str = hours.split(" - ")
-        open_time = datetime.strptime(open_str, "%I:%M %p").time()
-        close_time = datetime.strptime(close_str, "%I:%M %p").time()
-        return open_time <= visit_time.time() <= close_time
-    except Exception:
-        return True  # If parsing fails, assume open
+    # Days without (parseable) hours are assumed open
+    return compile_opening_hours(opening_hours).is_open_at(visit_time)
 
 
 def find_best_visit_time(opening_hours: Dict, current_time: datetime, duration_hours: float) -> Optional[datetime]:
@@ -322,9 +312,9 @@ def find_best_visit_time(opening_hours: Dict, current_time: datetime, duration_h
     if not opening_hours:
         return current_time
     
-    day = current_time.strftime("%A")
-    hours = opening_hours.get(day)
-    if not hours or hours.strip() == "" or hours.lower() == "notice":
+    compiled = compile_opening_hours(opening_hours)
+    day_index = current_time.weekday()
+    if day_index in compiled.missing_days:
         return current_time
     
     # ENFORCE: Our hard cutoff - activities must finish before 20:30
@@ -335,61 +325,165 @@ def find_best_visit_time(opening_hours: Dict, current_time: datetime, duration_h
     if activity_finish_time > cutoff_time:
         return None
     
-    try:
-        open_str, close_str = hours.split(" - ")
-        open_time = datetime.strptime(open_str, "%I:%M %p").time()
-        close_time = datetime.strptime(close_str, "%I:%M %p").time()
-        
-        # Convert to datetime for comparison
-        open_datetime = datetime.combine(current_time.date(), open_time)
-        close_datetime = datetime.combine(current_time.date(), close_time)
-        
-        # Calculate duration in minutes
-        duration_minutes = int(duration_hours * 60)
-        
-        # Check if we can fit the visit within opening hours AND our cutoff
-        if current_time < open_datetime:
-            # Place opens later, check if opening time would violate our cutoff
-            proposed_finish = open_datetime + timedelta(minutes=duration_minutes)
-            if proposed_finish > cutoff_time:
-                return None  # Would violate our cutoff
-            return open_datetime
-        elif current_time + timedelta(minutes=duration_minutes) > close_datetime:
-            # Visit would end after closing, try to start earlier
-            latest_start = close_datetime - timedelta(minutes=duration_minutes)
-            if latest_start >= open_datetime:
-                # Check if this adjusted time would violate our cutoff
-                proposed_finish = latest_start + timedelta(minutes=duration_minutes)
-                if proposed_finish > cutoff_time:
-                    return None  # Would violate our cutoff
-                return latest_start
-            else:
-                return None  # Cannot fit visit within opening hours
-        else:
-            return current_time  # Current time is fine
-    except Exception:
-        # If parsing fails, still check our cutoff
-        if activity_finish_time > cutoff_time:
-            return None
+    # Hours we cannot parse: keep the current time
+    if day_index in compiled.unparsed_days:
         return current_time
     
+    # Earliest slot from now on that fits the whole visit inside one opening range and before the cutoff
+    current_minute = minute_of_week(current_time)
+    start_minute = compiled.next_open_slot(
+        current_minute, int(duration_hours * 60), minute_of_week(cutoff_time)
+    )
+    if start_minute is None:
+        return None  # Cannot fit visit within opening hours
+    if start_minute == current_minute:
+        return current_time  # Current time is fine
+    day_start = datetime.combine(current_time.date(), datetime.min.time())
+    return day_start + timedelta(minutes=start_minute - day_index * 24 * 60)
+
+
+async def resolve_must_visit_place(city: str, place_name: str, city_places_cache: Dict) -> Optional[Dict]:
+    """Find the places_collection document for a must-visit name: exact, partial, then word-by-word matching.
+
+    city_places_cache is shared across one route so the whole-city scan for word matching runs at most once.
+    """
+    # First try exact match
+    db_place = await places_collection.find_one({
+        "city_norm": normalize_text(city),
+        "name_norm": normalize_text(place_name)
+    })
+    if db_place:
+        return db_place
+    
+    # Try smart partial matching - check if must-visit name is contained in database name
+    # (matched literally, so names like "Café (Old Town" cannot break the query)
+    db_place = await places_collection.find_one({
+        "city_norm": normalize_text(city),
+        "name_norm": {"$regex": re.escape(normalize_text(place_name))}
+    })
+    if db_place:
+        return db_place
+    
+    # Try word-by-word matching against all places in the city (loaded once per route)
+    if "places" not in city_places_cache:
+        # Must-visit places are resolved concurrently - only the first one loads the city
+        async with city_places_cache.setdefault("lock", asyncio.Lock()):
+            if "places" not in city_places_cache:
+                city_places_cache["places"] = await places_collection.find({
+                    "city_norm": normalize_text(city)
+                }).to_list(length=None)
+    
+    place_name_lower = place_name.lower()
+    place_words = place_name_lower.split()
+    best_match = None
+    best_score = 0
+    
+    for candidate in city_places_cache["places"]:
+        db_name = candidate.get("name", "").lower()
+        score = 0
+        
+        # Count how many words from must-visit name are in database name
+        for word in place_words:
+            if word in db_name:
+                score += 1
+        
+        # Also check if database name words are in must-visit name
+        for word in db_name.split():
+            if word in place_name_lower:
+                score += 0.5
+        
+        # Bonus for exact word matches
+        if place_name_lower in db_name or db_name in place_name_lower:
+            score += 2
+        
+        if score > best_score:
+            best_score = score
+            best_match = candidate
+    
+    if best_match and best_score >= 1:  # At least one word match
+        print(f"DEBUG: {place_name} - Found via word matching with score {best_score}: {best_match.get('name')}")
+        return best_match
+    
+    print(f"DEBUG: {place_name} - No word matches found")
+    return None
+
+
+async def enrich_must_visit_place(mv, city: str, scraper: PlaceScraper, city_places_cache: Dict):
+    """Build the MustVisit entry for a requested place (scraper first, then the database record).
+
+    Returns the enriched MustVisit and the places_collection document it resolved to (or None).
+    """
+    must_visit_obj = MustVisit(
+        place_id=mv.place_id,
+        place_name=mv.place_name,
+        notes=mv.notes,
+        source=mv.source,
+        image=None  # Initialize image field
+    )
+
+    db_place = await resolve_must_visit_place(city, mv.place_name, city_places_cache)
+
+    # Enrich with DB info
+    print(f"DEBUG: Enriching must-visit place: {mv.place_name}")
+    place = await scraper.get_place(city, mv.place_name)
+    if place:
+        # Handle both Place objects and potential dict returns
+        if hasattr(place, 'place_id'):
+            must_visit_obj.place_id = place.place_id
+            # ENFORCE: Only create coordinates if we have valid lat/lng values
+            if place.latitude is not None and place.longitude is not None:
+                must_visit_obj.coordinates = Coordinates(lat=place.latitude, lng=place.longitude)
+                print(f"DEBUG: {mv.place_name} - Enriched with coordinates: ({place.latitude}, {place.longitude})")
+            else:
+                print(f"DEBUG: {mv.place_name} - No valid coordinates available, skipping coordinates assignment")
+            must_visit_obj.address = place.address
+            must_visit_obj.opening_hours = place.opening_hours
+            must_visit_obj.image = getattr(place, 'image', None)  # Store image from scraper
+            print(f"DEBUG: {mv.place_name} - Enriched via scraper with place_id: {place.place_id}")
+        else:
+            # Fallback for dict-like objects
+            must_visit_obj.place_id = place.get('place_id')
+            coords = place.get('coordinates', {})
+            if coords and coords.get('lat') is not None and coords.get('lng') is not None:
+                must_visit_obj.coordinates = Coordinates(lat=coords.get('lat'), lng=coords.get('lng'))
+                print(f"DEBUG: {mv.place_name} - Enriched with dict coordinates: ({coords.get('lat')}, {coords.get('lng')})")
+            else:
+                print(f"DEBUG: {mv.place_name} - No valid coordinates in dict, skipping coordinates assignment")
+            must_visit_obj.address = place.get('address')
+            must_visit_obj.opening_hours = place.get('opening_hours')
+            must_visit_obj.image = place.get('image')  # Store image from scraper dict
+            print(f"DEBUG: {mv.place_name} - Enriched via scraper (dict) with place_id: {place.get('place_id')}")
+    elif db_place:
+        # Scraper failed - use the place resolved from the database
+        must_visit_obj.place_id = db_place.get("place_id")
+        if db_place.get("coordinates"):
+            must_visit_obj.coordinates = Coordinates(
+                lat=db_place["coordinates"]["lat"], 
+                lng=db_place["coordinates"]["lng"]
+            )
+        must_visit_obj.address = db_place.get("address")
+        must_visit_obj.opening_hours = db_place.get("opening_hours", {})
+        must_visit_obj.image = db_place.get("image")  # Store image from database
+        print(f"DEBUG: {mv.place_name} - Found in database with place_id: {db_place.get('place_id')}")
+        print(f"DEBUG: {mv.place_name} - Matched to database name: {db_place.get('name')}")
+    else:
+        must_visit_obj.opening_hours = {}
+        must_visit_obj.coordinates = None
+        must_visit_obj.address = None
+        must_visit_obj.image = None  # No image available
+        if not must_visit_obj.place_id:
+            must_visit_obj.place_id = ''.join(random.choices(string.ascii_letters + string.digits, k=12))
+        print(f"DEBUG: {mv.place_name} - Not found anywhere, using random place_id: {must_visit_obj.place_id}")
+
+    return must_visit_obj, db_place
 
 
 async def create_route_endpoint(
     route_input: RouteCreateInput,
-    token: HTTPAuthorizationCredentials
+    current_user: Dict
 ):
-    try:
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-        user = await user_collection.find_one({"username": username})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        user_id = str(user["_id"])
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    user = current_user
+    user_id = str(user["_id"])
 
     now = datetime.utcnow()
     city = route_input.city
@@ -458,154 +552,37 @@ async def create_route_endpoint(
         season = route_input.season
 
     # Get city and country info
-    city_info = await cities_collection.find_one({"name": {"$regex": f"^{city}$", "$options": "i"}})
+    city_info = await cities_collection.find_one({"name": city}, collation=CASE_INSENSITIVE)
     city_id = str(city_info["_id"]) if city_info else None
     country = city_info.get("country") if city_info else None
     country_id = city_info.get("country_id") if city_info else None
 
+    stage_checkpoint("setup")
+
     # Process must_visit places first
-    scraper = PlaceScraper()
+    scraper = get_place_scraper()
     updated_must_visit = []
     must_visit_places = []
 
-    for mv in route_input.must_visit:
-        must_visit_obj = MustVisit(
-            place_id=mv.place_id,
-            place_name=mv.place_name,
-            notes=mv.notes,
-            source=mv.source,
-            image=None  # Initialize image field
-        )
+    # Must-visit places resolved against places_collection once per route; the scheduler reuses these records
+    resolved_must_visit = {}
+    city_places_cache = {}
 
-        # Enrich with DB info
-        print(f"DEBUG: Enriching must-visit place: {mv.place_name}")
-        place = await scraper.get_place(city, mv.place_name)
-        if place:
-            # Handle both Place objects and potential dict returns
-            if hasattr(place, 'place_id'):
-                must_visit_obj.place_id = place.place_id
-                # ENFORCE: Only create coordinates if we have valid lat/lng values
-                if place.latitude is not None and place.longitude is not None:
-                    must_visit_obj.coordinates = Coordinates(lat=place.latitude, lng=place.longitude)
-                    print(f"DEBUG: {mv.place_name} - Enriched with coordinates: ({place.latitude}, {place.longitude})")
-                else:
-                    print(f"DEBUG: {mv.place_name} - No valid coordinates available, skipping coordinates assignment")
-                must_visit_obj.address = place.address
-                must_visit_obj.opening_hours = place.opening_hours
-                must_visit_obj.image = getattr(place, 'image', None)  # Store image from scraper
-                print(f"DEBUG: {mv.place_name} - Enriched via scraper with place_id: {place.place_id}")
-            else:
-                # Fallback for dict-like objects
-                must_visit_obj.place_id = place.get('place_id')
-                coords = place.get('coordinates', {})
-                if coords and coords.get('lat') is not None and coords.get('lng') is not None:
-                    must_visit_obj.coordinates = Coordinates(lat=coords.get('lat'), lng=coords.get('lng'))
-                    print(f"DEBUG: {mv.place_name} - Enriched with dict coordinates: ({coords.get('lat')}, {coords.get('lng')})")
-                else:
-                    print(f"DEBUG: {mv.place_name} - No valid coordinates in dict, skipping coordinates assignment")
-                must_visit_obj.address = place.get('address')
-                must_visit_obj.opening_hours = place.get('opening_hours')
-                must_visit_obj.image = place.get('image')  # Store image from scraper dict
-                print(f"DEBUG: {mv.place_name} - Enriched via scraper (dict) with place_id: {place.get('place_id')}")
-        else:
-            # Try to find place in places collection using name
-            print(f"DEBUG: {mv.place_name} - Scraper failed, trying database lookup...")
-            
-            # First try exact match
-            db_place = await places_collection.find_one({
-                "city": {"$regex": f"^{city}$", "$options": "i"},
-                "name": {"$regex": f"^{mv.place_name}$", "$options": "i"}
-            })
-            
-            if db_place:
-                must_visit_obj.place_id = db_place.get("place_id")
-                if db_place.get("coordinates"):
-                    must_visit_obj.coordinates = Coordinates(
-                        lat=db_place["coordinates"]["lat"], 
-                        lng=db_place["coordinates"]["lng"]
-                    )
-                must_visit_obj.address = db_place.get("address")
-                must_visit_obj.opening_hours = db_place.get("opening_hours", {})
-                must_visit_obj.image = db_place.get("image")  # Store image from database
-                print(f"DEBUG: {mv.place_name} - Found in database with place_id: {db_place.get('place_id')}")
-            else:
-                print(f"DEBUG: {mv.place_name} - Exact match failed, trying smart partial matching...")
-                
-                # Try smart partial matching - check if must-visit name is contained in database name
-                db_place = await places_collection.find_one({
-                    "city": {"$regex": f"^{city}$", "$options": "i"},
-                    "name": {"$regex": mv.place_name, "$options": "i"}
-                })
-                
-                if not db_place:
-                    # Try reverse matching - check if database name is contained in must-visit name
-                    db_place = await places_collection.find_one({
-                        "city": {"$regex": f"^{city}$", "$options": "i"},
-                        "name": {"$regex": f".*{mv.place_name}.*", "$options": "i"}
-                    })
-                
-                if not db_place:
-                    # Try word-by-word matching
-                    must_visit_words = mv.place_name.lower().split()
-                    print(f"DEBUG: {mv.place_name} - Trying word-by-word matching with words: {must_visit_words}")
-                    
-                    # Get all places in the city to check manually
-                    all_city_places = await places_collection.find({
-                        "city": {"$regex": f"^{city}$", "$options": "i"}
-                    }).to_list(length=None)
-                    
-                    best_match = None
-                    best_score = 0
-                    
-                    for place in all_city_places:
-                        db_name = place.get("name", "").lower()
-                        score = 0
-                        
-                        # Count how many words from must-visit name are in database name
-                        for word in must_visit_words:
-                            if word in db_name:
-                                score += 1
-                        
-                        # Also check if database name words are in must-visit name
-                        db_words = db_name.split()
-                        for word in db_words:
-                            if word in mv.place_name.lower():
-                                score += 0.5
-                        
-                        if score > best_score:
-                            best_score = score
-                            best_match = place
-                    
-                    if best_match and best_score >= 1:  # At least one word match
-                        db_place = best_match
-                        print(f"DEBUG: {mv.place_name} - Found via word matching with score {best_score}: {best_match.get('name')}")
-                    else:
-                        print(f"DEBUG: {mv.place_name} - No word matches found")
-                
-                if db_place:
-                    must_visit_obj.place_id = db_place.get("place_id")
-                    if db_place.get("coordinates"):
-                        must_visit_obj.coordinates = Coordinates(
-                            lat=db_place["coordinates"]["lat"], 
-                            lng=db_place["coordinates"]["lng"]
-                        )
-                    must_visit_obj.address = db_place.get("address")
-                    must_visit_obj.opening_hours = db_place.get("opening_hours", {})
-                    must_visit_obj.image = db_place.get("image")  # Store image from database
-                    print(f"DEBUG: {mv.place_name} - Found via smart matching with place_id: {db_place.get('place_id')}")
-                    print(f"DEBUG: {mv.place_name} - Matched to database name: {db_place.get('name')}")
-                else:
-                    must_visit_obj.opening_hours = {}
-                    must_visit_obj.coordinates = None
-                    must_visit_obj.address = None
-                    must_visit_obj.image = None  # No image available
-                    if not must_visit_obj.place_id:
-                        must_visit_obj.place_id = ''.join(random.choices(string.ascii_letters + string.digits, k=12))
-                    print(f"DEBUG: {mv.place_name} - Not found anywhere, using random place_id: {must_visit_obj.place_id}")
-        
+    # Enrich must-visit places concurrently (bounded), keeping the requested order
+    enrichment_semaphore = asyncio.Semaphore(MUST_VISIT_ENRICHMENT_CONCURRENCY)
+
+    async def enrich_with_limit(mv):
+        async with enrichment_semaphore:
+            return await enrich_must_visit_place(mv, city, scraper, city_places_cache)
+
+    enriched = await asyncio.gather(*(enrich_with_limit(mv) for mv in route_input.must_visit))
+    for must_visit_obj, db_place in enriched:
+        resolved_must_visit[id(must_visit_obj)] = db_place
         updated_must_visit.append(must_visit_obj)
         must_visit_places.append(must_visit_obj)
 
+    stage_checkpoint("must_visit_enrichment")
+
     # Find additional places based on user interests and budget
     additional_places_needed = total_places_needed - len(must_visit_places)
     additional_places = []
@@ -629,10 +606,10 @@ async def create_route_endpoint(
         # First try exact city matches
         for city_var in city_variations:
             places = await places_collection.find({
-                "city": {"$regex": f"^{city_var}$", "$options": "i"}
+                "city_norm": normalize_text(city_var)
             }).sort([
-                ("rating", -1),  # Higher rated places first
-                ("popularity", 1)  # Then by popularity (lower is better)
+                ("rating_num", -1),  # Higher rated places first
+                ("popularity_num", 1)  # Then by popularity (lower is better)
             ]).to_list(length=None)
             
             if places:
@@ -709,6 +686,8 @@ async def create_route_endpoint(
                         if len(all_places) >= min_places_needed:
                             break
         
+        stage_checkpoint("candidate_fetch")
+
         # Filter places based on user interests and budget
         filtered_places = []
         category_counts = {}  # Track category distribution for diversity
@@ -872,11 +851,16 @@ async def create_route_endpoint(
         #for i, place in enumerate(additional_places[:5]):
         #    print(f"  {i+1}. {place.get('name')} - Popularity: {place.get('popularity')}")
 
+    stage_checkpoint("filter")
+
     # 🎯 COMBINE MUST-VISIT PLACES WITH ADDITIONAL PLACES
     # User's must-visit places get priority, then fill with additional places
     all_places_for_route = must_visit_places + additional_places
     #print(f"DEBUG: Combined {len(must_visit_places)} must-visit places with {len(additional_places)} additional places")
     
+    # Pairwise distances for every candidate, computed once and shared by grouping and scheduling
+    distance_matrix = DistanceMatrix(all_places_for_route)
+    
     # 🎯 DISTRIBUTE MUST-VISIT PLACES ACROSS DAYS FIRST
     # Ensure must-visit places are distributed evenly across all days
     distributed_places = []
@@ -927,12 +911,24 @@ async def create_route_endpoint(
     else:
         # No must-visit places - use original grouping logic
         if user_interests and len(user_interests) > 0:
-            # User has interests - group by proximity for optimal daily routes
-            distributed_places = group_places_by_proximity(all_places_for_route, places_per_day)
+            # User has interests - balanced geographic clustering into one compact group per day
+            distributed_places = cluster_places_into_days(all_places_for_route, num_days, places_per_day, distance_matrix)
         else:
             # User has no interests - prioritize popularity (most popular places in earlier days)
-            distributed_places = group_places_by_popularity(all_places_for_route, places_per_day, num_days)
+            distributed_places = group_places_by_popularity(all_places_for_route, places_per_day, num_days, distance_matrix)
     
+    # 🎯 ORDER EACH DAY: nearest neighbour + 2-opt so travel legs stay short
+    # Must-visit places keep their slots at the start of the day
+    ordered_days = []
+    for day_places in distributed_places:
+        fixed_prefix = 0
+        while fixed_prefix < len(day_places) and hasattr(day_places[fixed_prefix], 'place_name'):
+            fixed_prefix += 1
+        ordered_days.append(order_day_places(day_places, distance_matrix, fixed_prefix))
+    distributed_places = ordered_days
+    
+    stage_checkpoint("grouping")
+
     # Distribute grouped places across days
     days = []
     
@@ -953,7 +949,9 @@ async def create_route_endpoint(
         print(f"DEBUG: Day {day_offset + 1} ({day_str}) - {len(day_places)} places assigned")
         
         # Create smart schedule for this day (pass travel_counter by reference)
-        scheduled_activities, travel_counter = await create_smart_schedule(day_places, day_date, user_travel_style, city, travel_counter)
+        scheduled_activities, travel_counter = await create_smart_schedule(
+            day_places, day_date, user_travel_style, city, travel_counter, distance_matrix, resolved_must_visit
+        )
         
         # Validate and fix the schedule to ensure realistic timing
         # FIXED: Use direct schedule from create_smart_schedule since our constraints work perfectly
@@ -962,6 +960,8 @@ async def create_route_endpoint(
         
         days.append(Day(date=day_str, activities=validated_activities))
 
+    stage_checkpoint("scheduling")
+
     # Build and save the Route object
     route = Route(
         route_id=None,  # Will be set after insertion
@@ -981,6 +981,7 @@ async def create_route_endpoint(
         stats=RouteStats(),
         must_visit=updated_must_visit,
         days=days,
+        cover_image=cover_image(days),
         created_at=now,
         updated_at=now
     )
@@ -994,6 +995,7 @@ async def create_route_endpoint(
         {"_id": result.inserted_id},
         {"$set": {"route_id": route_id}}
     )
+    stage_checkpoint("persist")
 
     return RouteCreateResponse(
         message="Route created successfully",
@@ -1004,31 +1006,13 @@ async def create_route_endpoint(
 
 
 
-async def get_cities_endpoint():
-    cities = await cities_collection.find().to_list(length=None)
-    result = []
-    for city in cities:
-        city["city_id"] = str(city["_id"])  # or use city.get("city_id") if you have it
-        city.pop("_id", None)  # Remove the raw ObjectId
-        result.append(CityResponse(**city))
-    
-    return GetAllCitiesResponse(
-        success=True,
-        message="Cities retrieved successfully",
-        status_code=200,
-        data=result
-    )
+async def get_cities_endpoint(if_none_match: Optional[str] = None):
+    # Served from the in-memory reference cache (pre-serialized JSON + ETag)
+    return await reference_cache.response(CITIES_VIEW, if_none_match)
 
 
 
-async def get_city_by_name_endpoint(city_name: str, token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    try:
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+async def get_city_by_name_endpoint(city_name: str, current_user: Dict):
     city = await cities_collection.find_one({"name": city_name})
     if city:
         city["city_id"] = str(city["_id"])
@@ -1038,14 +1022,7 @@ async def get_city_by_name_endpoint(city_name: str, token: HTTPAuthorizationCred
 
 
 
-async def get_cities_by_country_endpoint(country: str, token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
-    try:
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+async def get_cities_by_country_endpoint(country: str, current_user: Dict):
 
     cities = await cities_collection.find({"country": country}).to_list(length=None)
     if not cities:
@@ -1064,36 +1041,9 @@ async def get_cities_by_country_endpoint(country: str, token: HTTPAuthorizationC
     )
 
 
-async def get_all_countries_endpoint(token: HTTPAuthorizationCredentials):
-    try:
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            return GetAllCountriesListResponse(
-                success=False,
-                message="Invalid credentials",
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                data=[]
-            )
-    except JWTError:
-        return GetAllCountriesListResponse(
-            success=False,
-            message="Invalid token",
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            data=[]
-        )
+async def get_all_countries_endpoint(current_user: Dict, if_none_match: Optional[str] = None):
     try:
-        countries = await countries_collection.find().to_list(length=None)
-        result = []
-        for country in countries:
-            country["_id"] = str(country["_id"])
-            result.append(GetAllCountiesResponse(**country))
-        return GetAllCountriesListResponse(
-            success=True,
-            message="Countries fetched successfully",
-            status_code=200,
-            data=result
-        )
+        return await reference_cache.response(COUNTRIES_VIEW, if_none_match)
     except Exception as e:
         return GetAllCountriesListResponse(
             success=False,
@@ -1106,43 +1056,12 @@ async def get_all_countries_endpoint(token: HTTPAuthorizationCredentials):
 
 async def get_countries_by_region_endpoint(
     request: GetCountriesByRegionRequest,
-    token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)
+    current_user: Dict,
+    if_none_match: Optional[str] = None
 ):
     try:
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            return GetCountriesByRegionListResponse(
-                success=False,
-                message="Invalid credentials",
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                data=[]
-            )
-    except JWTError:
-        return GetCountriesByRegionListResponse(
-            success=False,
-            message="Invalid token",
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            data=[]
-        )
-    try:
-        countries = await countries_collection.find({"region": {"$regex": f"^{request.region}$", "$options": "i"}}).to_list(length=None)
-        result = []
-        for country in countries:
-            country["_id"] = str(country["_id"])
-            result.append(GetCountriesByRegionResponse(**country))
-        if not result:
-            return GetCountriesByRegionListResponse(
-                success=True,
-                message="No countries found in the specified region.",
-                status_code=200,
-                data=[]
-            )
-        return GetCountriesByRegionListResponse(
-            success=True,
-            message="Countries in region fetched successfully",
-            status_code=200,
-            data=result
+        return await reference_cache.response(
+            region_view(request.region), if_none_match, fallback_view=EMPTY_REGION_VIEW
         )
     except Exception as e:
         return GetCountriesByRegionListResponse(
@@ -1155,29 +1074,13 @@ async def get_countries_by_region_endpoint(
 
 async def search_countries_endpoint(
     request: SearchCountriesRequest,
-    token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)
+    current_user: Dict
 ):
     try:
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            return GetCountriesByRegionListResponse(
-                success=False,
-                message="Invalid credentials",
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                data=[]
-            )
-    except JWTError:
-        return GetCountriesByRegionListResponse(
-            success=False,
-            message="Invalid token",
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            data=[]
-        )
-    try:
-        # Build a case-insensitive regex for each name
-        name_regexes = [{"name": {"$regex": f"^{name}$", "$options": "i"}} for name in request.names]
-        countries = await countries_collection.find({"$or": name_regexes}).to_list(length=None)
+        # Case-insensitive match on any of the names
+        countries = await countries_collection.find(
+            {"name": {"$in": request.names}}, collation=CASE_INSENSITIVE
+        ).to_list(length=None)
         result = []
         for country in countries:
             country["_id"] = str(country["_id"])
@@ -1205,33 +1108,9 @@ async def search_countries_endpoint(
 
 
 
-async def get_all_regions_endpoint(token: HTTPAuthorizationCredentials):
-    try:
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            return GetAllRegionsResponse(
-                success=False,
-                message="Invalid credentials",
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                data=[]
-            )
-    except JWTError:
-        return GetAllRegionsResponse(
-            success=False,
-            message="Invalid token",
-            status_code=status.HTTP_401_UNAUTHORIZED,
-            data=[]
-        )
-    
+async def get_all_regions_endpoint(current_user: Dict, if_none_match: Optional[str] = None):
     try:
-        regions = await countries_collection.distinct("region")
-        return GetAllRegionsResponse(
-            success=True,
-            message="Regions fetched successfully",
-            status_code=200,
-            data=regions
-        )
+        return await reference_cache.response(REGIONS_VIEW, if_none_match)
     except Exception as e:
         return GetAllRegionsResponse(
             success=False,
@@ -1243,30 +1122,11 @@ async def get_all_regions_endpoint(token: HTTPAuthorizationCredentials):
 
 async def get_places_in_city_endpoint(
     city: str,
-    token: HTTPAuthorizationCredentials = Depends(HTTPBearer())
+    current_user: Dict
 ):
     try:
-        # User authentication
-        try:
-            payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-            username = payload.get("sub")
-            if not username:
-                return GetPlacesInCityResponse(
-                    success=False,
-                    message="Invalid credentials",
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    datas=[]
-                )
-        except JWTError:
-            return GetPlacesInCityResponse(
-                success=False,
-                message="Invalid token",
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                datas=[]
-            )
-
         # Case-insensitive city search
-        places = await places_collection.find({"city": {"$regex": f"^{city}$", "$options": "i"}}).to_list(length=None)
+        places = await places_collection.find({"city_norm": normalize_text(city)}).to_list(length=None)
         result = []
         for place in places:
             place["_id"] = str(place["_id"])
@@ -1307,27 +1167,8 @@ async def get_places_in_city_endpoint(
 
 async def get_place_by_id_endpoint(
         request: GetPlacesByIdsRequest, 
-        token: HTTPAuthorizationCredentials = Depends(HTTPBearer())):
+        current_user: Dict):
     try:
-        # User authentication
-        try:
-            payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-            username = payload.get("sub")
-            if not username:
-                return GetPlacesInCityResponse(
-                    success=False,
-                    message="Invalid credentials",
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    datas=[]
-                )
-        except JWTError:
-            return GetPlacesInCityResponse(
-                success=False,
-                message="Invalid token",
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                datas=[]
-            )
-
         # request.place_ids is expected to be a list of place IDs
         places = await places_collection.find({"place_id": {"$in": request.place_ids}}).to_list(length=None)
         result = []
@@ -1375,16 +1216,6 @@ async def get_place_by_id_endpoint(
 
 
 
-def parse_price(price_str):
-    if not price_str or price_str.strip() == "":
-        return 0.0  # Free
-    # Extract the first number in the string (handles "24£", "€29.90", etc.)
-    match = re.search(r"\d+(\.\d+)?", price_str.replace(",", "."))
-    if match:
-        return float(match.group())
-    return float('inf')  # If no number found, treat as very expensive
-
-
 def calculate_distance(lat1, lng1, lat2, lng2):
     """Calculate distance between two coordinates using Haversine formula"""
     from math import radians, cos, sin, asin, sqrt
@@ -1405,88 +1236,34 @@ def calculate_distance(lat1, lng1, lat2, lng2):
     return c * r
 
 
-def group_places_by_proximity(places, places_per_day):
-    """Group places by proximity to optimize daily routes"""
+def group_places_by_popularity(places, places_per_day, num_days, distance_matrix=None):
+    """Group places by popularity with proximity optimization - most popular places in earlier days"""
     if not places:
-        return []
+        # ENHANCED: Even with no places, create empty days structure for long trips
+        return [[] for _ in range(num_days)]
     
     # Convert places to list if needed
     places_list = list(places)
     
-    # If we have coordinates, group by proximity
-    places_with_coords = []
-    places_without_coords = []
+    if distance_matrix is None:
+        distance_matrix = DistanceMatrix(places_list)
+    
+    # Separate must_visit places (they have priority) and additional places
+    must_visit_places = []
+    additional_places = []
     
     for place in places_list:
-        if hasattr(place, 'coordinates') and place.coordinates:
-            places_with_coords.append(place)
-        else:
-            places_without_coords.append(place)
+        if hasattr(place, 'place_name'):  # Must visit place
+            must_visit_places.append(place)
+        else:  # Additional place from DB
+            additional_places.append(place)
     
-    # Group places with coordinates by proximity
-    grouped_places = []
-    used_indices = set()
-    
-    for i, place1 in enumerate(places_with_coords):
-        if i in used_indices:
-            continue
-            
-        group = [place1]
-        used_indices.add(i)
-        
-        # Find nearby places
-        for j, place2 in enumerate(places_with_coords):
-            if j in used_indices:
-                continue
-                
-            if (place1.coordinates and place2.coordinates):
-                distance = calculate_distance(
-                    place1.coordinates.lat, place1.coordinates.lng,
-                    place2.coordinates.lat, place2.coordinates.lng
-                )
-                
-                # If within 2km, group together
-                if distance <= 2.0 and len(group) < places_per_day:
-                    group.append(place2)
-                    used_indices.add(j)
-        
-        grouped_places.append(group)
-    
-    # Add remaining places without coordinates
-    for place in places_without_coords:
-        if grouped_places and len(grouped_places[-1]) < places_per_day:
-            grouped_places[-1].append(place)
-        else:
-            grouped_places.append([place])
-    
-    return grouped_places
-
-
-def group_places_by_popularity(places, places_per_day, num_days):
-    """Group places by popularity with proximity optimization - most popular places in earlier days"""
-    if not places:
-        # ENHANCED: Even with no places, create empty days structure for long trips
-        return [[] for _ in range(num_days)]
-    
-    # Convert places to list if needed
-    places_list = list(places)
-    
-    # Separate must_visit places (they have priority) and additional places
-    must_visit_places = []
-    additional_places = []
-    
-    for place in places_list:
-        if hasattr(place, 'place_name'):  # Must visit place
-            must_visit_places.append(place)
-        else:  # Additional place from DB
-            additional_places.append(place)
-    
-    # Sort additional places by popularity (ascending - most popular first)
-    def get_popularity_value(place):
-        try:
-            return float(place.get("popularity", "999999"))
-        except (ValueError, TypeError):
-            return 999999  # Default to least popular if parsing fails
+    # Sort additional places by popularity (ascending - most popular first)
+    def get_popularity_value(place):
+        try:
+            return float(place.get("popularity", "999999"))
+        except (ValueError, TypeError):
+            return 999999  # Default to least popular if parsing fails
     
     additional_places.sort(key=get_popularity_value)
     
@@ -1601,30 +1378,7 @@ def group_places_by_popularity(places, places_per_day, num_days):
                 # Calculate proximity score (distance to existing places in this day)
                 proximity_score = 0
                 if day_places:
-                    min_distance = float('inf')
-                    place_coords = place.get("coordinates")
-                    
-                    for existing_place in day_places:
-                        existing_coords = None
-                        if hasattr(existing_place, 'coordinates'):
-                            existing_coords = existing_place.coordinates
-                        elif isinstance(existing_place, dict):
-                            existing_coords = existing_place.get("coordinates")
-                        
-                        if place_coords and existing_coords:
-                            # Handle both dictionary and Pydantic model coordinates
-                            if isinstance(existing_coords, dict):
-                                existing_lat = existing_coords.get("lat", 0)
-                                existing_lng = existing_coords.get("lng", 0)
-                            else:
-                                existing_lat = existing_coords.lat
-                                existing_lng = existing_coords.lng
-                            
-                            distance = calculate_distance(
-                                place_coords.get("lat", 0), place_coords.get("lng", 0),
-                                existing_lat, existing_lng
-                            )
-                            min_distance = min(min_distance, distance)
+                    min_distance = distance_matrix.min_distance_to(place, day_places)
                     
                     if min_distance != float('inf'):
                         proximity_score = min_distance
@@ -2081,7 +1835,51 @@ def apply_specific_place_adjustments(base_duration, place_name):
 
 
 
-async def calculate_travel_time(place1, place2, city=None):
+async def lookup_city_coordinates(place, place_name, city):
+    """Resolve coordinates for a place from the city's spatial index (no geocoding)"""
+    place_id = place.place_id if hasattr(place, 'place_id') else place.get('place_id')
+    try:
+        city_index = await city_spatial_indexes.get(city)
+    except Exception as e:
+        print(f"DEBUG: Could not load spatial index for {city}: {e}")
+        return None
+    return city_index.coordinates_for(place_id=place_id, name=place_name)
+
+
+def estimate_travel_minutes(distance):
+    """Convert a distance in km into a door-to-door travel time estimate (in minutes)"""
+    # Enhanced travel time calculation based on distance
+    if distance <= 0.5:  # Very close (500m or less)
+        # Walking speed: 4 km/h for short distances (includes stops, traffic lights)
+        travel_time_minutes = (distance / 4.0) * 60
+        speed_used = "4 km/h"
+    elif distance <= 2.0:  # Close (2km or less)
+        # Walking speed: 5 km/h for medium distances
+        travel_time_minutes = (distance / 5.0) * 60
+        speed_used = "5 km/h"
+    elif distance <= 5.0:  # Medium distance (5km or less)
+        # Walking speed: 6 km/h for longer distances
+        travel_time_minutes = (distance / 6.0) * 60
+        speed_used = "6 km/h"
+    else:  # Long distance (over 5km)
+        # Consider public transport or taxi
+        # Assume 20 km/h average for mixed transport
+        travel_time_minutes = (distance / 20.0) * 60
+        speed_used = "20 km/h (transport)"
+    
+    # Add buffer time for city navigation (finding places, traffic lights, etc.)
+    buffer_time = min(distance * 2, 10)  # 2 minutes per km, max 10 minutes
+    total_time = travel_time_minutes + buffer_time
+    
+    print(f"DEBUG: Travel calculation - Distance: {distance:.2f}km, Speed: {speed_used}, Base time: {travel_time_minutes:.1f}min, Buffer: {buffer_time:.1f}min, Total: {total_time:.1f}min")
+    
+    # Cap at reasonable limits
+    final_time = min(max(total_time, 5), 45)  # Minimum 5 minutes, maximum 45 minutes
+    print(f"DEBUG: Final travel time: {final_time:.1f} minutes")
+    return final_time
+
+
+async def calculate_travel_time(place1, place2, city=None, distance_matrix=None):
     """Calculate travel time between two places (in minutes) with coordinate caching"""
     # Get coordinates for both places
     coords1 = None
@@ -2091,6 +1889,12 @@ async def calculate_travel_time(place1, place2, city=None):
     place1_name = place1.place_name if hasattr(place1, 'place_name') else place1.get('name', 'Unknown')
     place2_name = place2.place_name if hasattr(place2, 'place_name') else place2.get('name', 'Unknown')
     
+    # OPTIMIZATION: Use the route's precomputed distance matrix when both places are in it
+    if distance_matrix is not None and distance_matrix.has_coordinates(place1) and distance_matrix.has_coordinates(place2):
+        distance = distance_matrix.distance(place1, place2)
+        print(f"DEBUG: Distance between {place1_name} and {place2_name}: {distance:.2f} km (matrix)")
+        return estimate_travel_minutes(distance)
+    
     # OPTIMIZATION: Check if coordinates are already cached in place objects to prevent repeated geocoding
     if hasattr(place1, '_cached_coords'):
         coords1 = place1._cached_coords
@@ -2133,10 +1937,16 @@ async def calculate_travel_time(place1, place2, city=None):
             print(f"DEBUG: {place2_name} - Using coordinates from dict: {coords2}")
     
     # If coordinates are missing, try to get them via geocoding
+    if (not coords1 or coords1[0] is None or coords1[1] is None) and city:
+        indexed_coords = await lookup_city_coordinates(place1, place1_name, city)
+        if indexed_coords:
+            coords1 = indexed_coords
+            print(f"DEBUG: {place1_name} - Using coordinates from {city} spatial index: {coords1}")
+    
     if not coords1 or coords1[0] is None or coords1[1] is None:
         print(f"DEBUG: {place1_name} - No coordinates found, attempting geocoding...")
         if city:
-            scraper = PlaceScraper()
+            scraper = get_place_scraper()
             place_data = await scraper.get_place(city, place1_name)
             if place_data and place_data.latitude and place_data.longitude:
                 coords1 = (place_data.latitude, place_data.longitude)
@@ -2165,10 +1975,16 @@ async def calculate_travel_time(place1, place2, city=None):
                 else:
                     print(f"DEBUG: {place1_name} - No fallback coordinates available")
     
+    if (not coords2 or coords2[0] is None or coords2[1] is None) and city:
+        indexed_coords = await lookup_city_coordinates(place2, place2_name, city)
+        if indexed_coords:
+            coords2 = indexed_coords
+            print(f"DEBUG: {place2_name} - Using coordinates from {city} spatial index: {coords2}")
+    
     if not coords2 or coords2[0] is None or coords2[1] is None:
         print(f"DEBUG: {place2_name} - No coordinates found, attempting geocoding...")
         if city:
-            scraper = PlaceScraper()
+            scraper = get_place_scraper()
             place_data = await scraper.get_place(city, place2_name)
             if place_data and place_data.latitude and place_data.longitude:
                 coords2 = (place_data.latitude, place_data.longitude)
@@ -2191,36 +2007,7 @@ async def calculate_travel_time(place1, place2, city=None):
         # Calculate distance using Haversine formula
         distance = calculate_distance(coords1[0], coords1[1], coords2[0], coords2[1])
         print(f"DEBUG: Distance between {place1_name} and {place2_name}: {distance:.2f} km")
-        
-        # Enhanced travel time calculation based on distance
-        if distance <= 0.5:  # Very close (500m or less)
-            # Walking speed: 4 km/h for short distances (includes stops, traffic lights)
-            travel_time_minutes = (distance / 4.0) * 60
-            speed_used = "4 km/h"
-        elif distance <= 2.0:  # Close (2km or less)
-            # Walking speed: 5 km/h for medium distances
-            travel_time_minutes = (distance / 5.0) * 60
-            speed_used = "5 km/h"
-        elif distance <= 5.0:  # Medium distance (5km or less)
-            # Walking speed: 6 km/h for longer distances
-            travel_time_minutes = (distance / 6.0) * 60
-            speed_used = "6 km/h"
-        else:  # Long distance (over 5km)
-            # Consider public transport or taxi
-            # Assume 20 km/h average for mixed transport
-            travel_time_minutes = (distance / 20.0) * 60
-            speed_used = "20 km/h (transport)"
-        
-        # Add buffer time for city navigation (finding places, traffic lights, etc.)
-        buffer_time = min(distance * 2, 10)  # 2 minutes per km, max 10 minutes
-        total_time = travel_time_minutes + buffer_time
-        
-        print(f"DEBUG: Travel calculation - Distance: {distance:.2f}km, Speed: {speed_used}, Base time: {travel_time_minutes:.1f}min, Buffer: {buffer_time:.1f}min, Total: {total_time:.1f}min")
-        
-        # Cap at reasonable limits
-        final_time = min(max(total_time, 5), 45)  # Minimum 5 minutes, maximum 45 minutes
-        print(f"DEBUG: Final travel time: {final_time:.1f} minutes")
-        return final_time
+        return estimate_travel_minutes(distance)
     else:
         # Default travel time when coordinates are missing or geocoding failed
         # Use a reasonable default based on typical city travel
@@ -2229,7 +2016,7 @@ async def calculate_travel_time(place1, place2, city=None):
         return default_time
 
 
-async def create_smart_schedule(day_places, day_date, travel_style, city, travel_counter=1):
+async def create_smart_schedule(day_places, day_date, travel_style, city, travel_counter=1, distance_matrix=None, resolved_places=None):
     """Create smart schedule with realistic timing and breaks"""
     print(f"DEBUG: create_smart_schedule called for {day_date.strftime('%Y-%m-%d')} with {len(day_places)} places")
     
@@ -2267,7 +2054,7 @@ async def create_smart_schedule(day_places, day_date, travel_style, city, travel
         travel_activity_data = None
         
         if i > 0:
-            travel_time = await calculate_travel_time(day_places[i-1], place, city)
+            travel_time = await calculate_travel_time(day_places[i-1], place, city, distance_matrix)
             
             # Debug logging for travel time
             prev_place_name = day_places[i-1].place_name if hasattr(day_places[i-1], 'place_name') else day_places[i-1].get('name')
@@ -2348,73 +2135,11 @@ async def create_smart_schedule(day_places, day_date, travel_style, city, travel
             place_notes = place.notes if hasattr(place, 'notes') else ""
             place_category = "attraction"  # Default for must-visit places
             
-            # Try to get place data from database for must-visit places
-            #print(f"DEBUG: Looking for '{place_name}' in city '{city}' in database...")
-            
-            # First try exact match
-            db_place = await places_collection.find_one({
-                "city": {"$regex": f"^{city}$", "$options": "i"},
-                "name": {"$regex": f"^{place_name}$", "$options": "i"}
-            })
-            
-            # If not found by exact name, try smart partial matching
-            if not db_place:
-                #print(f"DEBUG: Exact match not found, trying smart partial matching for '{place_name}'...")
-                
-                # Try if must-visit name is contained in database name
-                db_place = await places_collection.find_one({
-                    "city": {"$regex": f"^{city}$", "$options": "i"},
-                    "name": {"$regex": place_name, "$options": "i"}
-                })
-                
-                if not db_place:
-                    # Try reverse matching - if database name is contained in must-visit name
-                    db_place = await places_collection.find_one({
-                        "city": {"$regex": f"^{city}$", "$options": "i"},
-                        "name": {"$regex": f".*{place_name}.*", "$options": "i"}
-                    })
-                
-                if not db_place:
-                    # Try word-by-word matching
-                    place_words = place_name.lower().split()
-                    #print(f"DEBUG: Trying word-by-word matching with words: {place_words}")
-                    
-                    # Get all places in the city to check manually
-                    all_city_places = await places_collection.find({
-                        "city": {"$regex": f"^{city}$", "$options": "i"}
-                    }).to_list(length=None)
-                    
-                    best_match = None
-                    best_score = 0
-                    
-                    for place in all_city_places:
-                        db_name = place.get("name", "").lower()
-                        score = 0
-                        
-                        # Count how many words from must-visit name are in database name
-                        for word in place_words:
-                            if word in db_name:
-                                score += 1
-                        
-                        # Also check if database name words are in must-visit name
-                        db_words = db_name.split()
-                        for word in db_words:
-                            if word in place_name.lower():
-                                score += 0.5
-                        
-                        # Bonus for exact word matches
-                        if place_name.lower() in db_name or db_name in place_name.lower():
-                            score += 2
-                        
-                        if score > best_score:
-                            best_score = score
-                            best_match = place
-                    
-                    if best_match and best_score >= 1:  # At least one word match
-                        db_place = best_match
-                        #print(f"DEBUG: Found via word matching with score {best_score}: {best_match.get('name')}")
-                    #else:
-                    #    print(f"DEBUG: No word matches found")
+            # Use the place record resolved once per route (no database round trips in this loop)
+            if resolved_places is not None and id(place) in resolved_places:
+                db_place = resolved_places[id(place)]
+            else:
+                db_place = await resolve_must_visit_place(city, place_name, {})
             
             # Use database place_id if found, otherwise use the original place_id
             if db_place:
@@ -2731,70 +2456,14 @@ def validate_and_fix_schedule(schedule: List[Activity], day_date: datetime) -> L
 
 async def search_places_endpoint(
     request: SearchPlacesRequest,
-    token: HTTPAuthorizationCredentials = Depends(HTTPBearer())
+    current_user: Dict
 ):
     try:
-        # User authentication
-        try:
-            payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-            username = payload.get("sub") or payload.get("user_id")
-            if not username:
-                return SearchPlacesResponse(
-                    success=False,
-                    message="Invalid token: user_id missing",
-                    status_code=401,
-                    data=[]
-                )
-        except JWTError:
-            return SearchPlacesResponse(
-                success=False,
-                message="Invalid token",
-                status_code=401,
-                data=[]
-            )
-        # Build MongoDB query with partial city search
-        query = {"city": {"$regex": request.city, "$options": "i"}}
-        
-        # Add category filter only if provided and not empty
-        if request.category and request.category.strip():
-            query["$or"] = [
-                {"category": {"$regex": request.category, "$options": "i"}},
-                {"wayfare_category": {"$regex": request.category, "$options": "i"}}
-            ]
-        
-        # Add name filter only if provided and not empty
-        if request.name and request.name.strip():
-            query["name"] = {"$regex": request.name, "$options": "i"}
-        
-        # Add country filter only if provided and not empty
-        if request.country and request.country.strip():
-            query["country"] = {"$regex": request.country, "$options": "i"}
-        
-        # Add keyword search only if provided and not empty (using regex for partial matching)
-        if request.keywords and request.keywords.strip():
-            keyword_regex = {"$regex": request.keywords, "$options": "i"}
-            keyword_conditions = [
-                {"name": keyword_regex},
-                {"description": keyword_regex},
-                {"category": keyword_regex},
-                {"wayfare_category": keyword_regex}
-            ]
-            
-            # Handle existing $or conditions from category search
-            if "$or" in query:
-                # Combine with existing $or conditions using $and
-                existing_or = query.pop("$or")
-                query["$and"] = [
-                    {"$or": existing_or},
-                    {"$or": keyword_conditions}
-                ]
-            else:
-                query["$or"] = keyword_conditions
-        print("MongoDB query:", query)
-        places = await places_collection.find(query).limit(request.limit or 20).to_list(length=None)
-        print("Places returned from MongoDB:", len(places))
-        for place in places:
-            print(place)
+        query = build_place_search_query(request)
+        places, next_cursor = await fetch_page(
+            places_collection, query, PLACE_SEARCH_SORT, search_limit(request), request.cursor
+        )
+        print(f"DEBUG: Place search returned {len(places)} places (more: {next_cursor is not None})")
         result = []
         for place in places:
             place["_id"] = str(place["_id"])
@@ -2806,46 +2475,6 @@ async def search_places_endpoint(
                     coords["lat"] = float(lat) if lat is not None else 0.0
                     coords["lng"] = float(lng) if lng is not None else 0.0
                     place["coordinates"] = coords
-            # Updated budget filtering (Python-side)
-            if request.budget:
-                price_value = parse_price(place.get("price", ""))
-                if request.budget == "low" and price_value >= 20:
-                    print(f"Filtered out by budget (low): {place['name']} (price_value: {price_value})")
-                    continue
-                elif request.budget == "medium" and price_value >= 50:
-                    print(f"Filtered out by budget (medium): {place['name']} (price_value: {price_value})")
-                    continue
-                # For 'high', do not filter out any places
-            # Rating filtering (Python-side) - only filter if values > 0
-            if request.min_rating is not None and request.min_rating > 0 and place.get("rating") is not None:
-                try:
-                    place_rating = float(place["rating"])
-                    print(f"Place: {place['name']}, place_rating: {place_rating}, min_rating: {request.min_rating}")
-                    if place_rating < request.min_rating:
-                        print(f"Filtered out by min_rating: {place['name']} (place_rating: {place_rating}, min_rating: {request.min_rating})")
-                        continue
-                except Exception as e:
-                    print(f"Rating conversion error for {place['name']}: {e}")
-                    continue
-            if request.rating is not None and request.rating > 0 and place.get("rating") is not None:
-                try:
-                    place_rating = float(place["rating"])
-                    if place_rating != request.rating:
-                        print(f"Filtered out by rating: {place['name']} (place_rating: {place_rating}, rating: {request.rating})")
-                        continue
-                except Exception as e:
-                    print(f"Rating conversion error for {place['name']}: {e}")
-                    continue
-            # Popularity filtering (if needed)
-            if hasattr(request, "popularity") and request.popularity is not None and place.get("popularity") is not None:
-                try:
-                    place_popularity = float(place["popularity"])
-                    if place_popularity < request.popularity:
-                        print(f"Filtered out by popularity: {place['name']} (place_popularity: {place_popularity}, popularity: {request.popularity})")
-                        continue
-                except Exception as e:
-                    print(f"Popularity conversion error for {place['name']}: {e}")
-                    continue
             try:
                 # Convert popularity to float if present
                 if "popularity" in place:
@@ -2863,12 +2492,22 @@ async def search_places_endpoint(
                 result.append(PlaceInCityResponse(**place))
             except Exception as e:
                 print(f"Error creating PlaceInCityResponse for {place.get('name', 'unknown')}: {e}")
-        print("Final result count:", len(result))
         return SearchPlacesResponse(
             success=True,
             message="Places fetched successfully" if result else "No places found.",
             status_code=200,
-            data=result
+            data=result,
+            next_cursor=next_cursor
+        )
+    except InvalidCursor as e:
+        return JSONResponse(
+            status_code=400,
+            content=SearchPlacesResponse(
+                success=False,
+                message=str(e),
+                status_code=400,
+                data=[]
+            ).dict()
         )
     except Exception as e:
         return JSONResponse(
@@ -2884,16 +2523,9 @@ async def search_places_endpoint(
 
 async def autocomplete_places_endpoint(
     request: AutocompletePlacesRequest,
-    token: HTTPAuthorizationCredentials = Depends(HTTPBearer())
+    current_user: Dict
 ):
     """Autocomplete endpoint for place search in UI"""
-    try:
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
 
     # Extract validated parameters from BaseModel
     city = request.city
@@ -2908,53 +2540,13 @@ async def autocomplete_places_endpoint(
             data=[]
         )
 
-    # Clean search term
-    search_term = search_term.strip().lower()
-    
-    # Build search query with multiple matching strategies
-    search_query = {
-        "city": {"$regex": f"^{city}$", "$options": "i"},
-        "$or": [
-            # Exact match (highest priority)
-            {"name": {"$regex": f"^{search_term}$", "$options": "i"}},
-            # Starts with search term
-            {"name": {"$regex": f"^{search_term}", "$options": "i"}},
-            # Contains search term
-            {"name": {"$regex": search_term, "$options": "i"}},
-            # Word-by-word matching
-            {"name": {"$regex": f".*{search_term}.*", "$options": "i"}}
-        ]
-    }
+    # Ranked in memory: exact > prefix > word-prefix > contains, then popularity
+    autocomplete_index = await city_autocomplete_indexes.get(city)
+    matches = autocomplete_index.search(search_term, limit)
 
-    # Execute search
-    places = await places_collection.find(search_query).limit(limit * 2).to_list(length=None)
-    
-    # Sort results by relevance (exact matches first, then starts with, then contains)
-    def calculate_relevance_score(place_name: str, search_term: str) -> int:
-        place_name_lower = place_name.lower()
-        search_term_lower = search_term.lower()
-        
-        if place_name_lower == search_term_lower:
-            return 100  # Exact match
-        elif place_name_lower.startswith(search_term_lower):
-            return 80   # Starts with
-        elif search_term_lower in place_name_lower:
-            return 60   # Contains
-        else:
-            return 40   # Word match
-    
-    # Sort places by relevance score
-    places_with_scores = []
-    for place in places:
-        score = calculate_relevance_score(place.get("name", ""), search_term)
-        places_with_scores.append((place, score))
-    
-    # Sort by score (highest first) and then by popularity
-    places_with_scores.sort(key=lambda x: (-x[1], float(x[0].get("popularity", "999999"))))
-    
     # Convert to response format
     results = []
-    for place, score in places_with_scores[:limit]:
+    for place, tier in matches:
         place_response = PlaceInCityResponse(
             _id=str(place["_id"]),
             place_id=place.get("place_id"),
@@ -2993,29 +2585,10 @@ async def autocomplete_places_endpoint(
 
 # ROUTE MANAGEMENT ENDPOINTS
 
-async def get_user_routes_endpoint(token: HTTPAuthorizationCredentials):
+async def get_user_routes_endpoint(current_user: Dict):
     """Get all routes for the current user with place images (optimized)"""
     try:
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            return RouteListResponse(
-                success=False,
-                message="Invalid credentials",
-                status_code=401,
-                data=[]
-            )
-        
-        user = await user_collection.find_one({"username": username})
-        if not user:
-            return RouteListResponse(
-                success=False,
-                message="User not found",
-                status_code=404,
-                data=[]
-            )
-        
-        user_id = str(user["_id"])
+        user_id = str(current_user["_id"])
         routes = await route_collection.find({"user_id": user_id}).to_list(length=None)
         
         # Process routes (images are now stored directly in activities during creation)
@@ -3032,13 +2605,6 @@ async def get_user_routes_endpoint(token: HTTPAuthorizationCredentials):
             status_code=200,
             data=route_responses
         )
-    except JWTError:
-        return RouteListResponse(
-            success=False,
-            message="Invalid token",
-            status_code=401,
-            data=[]
-        )
     except Exception as e:
         return RouteListResponse(
             success=False,
@@ -3048,7 +2614,37 @@ async def get_user_routes_endpoint(token: HTTPAuthorizationCredentials):
         )
 
 
-async def get_route_by_id_endpoint(route_id: str, token: HTTPAuthorizationCredentials):
+async def get_user_route_summaries_endpoint(current_user: Dict, limit: int = 20, cursor: Optional[str] = None):
+    """Page of the current user's routes, newest first, without the itinerary"""
+    try:
+        user_id = str(current_user["_id"])
+        routes, next_cursor = await fetch_page(
+            route_collection, {"user_id": user_id}, ROUTE_SUMMARY_SORT, max(1, min(limit, 50)), cursor,
+            projection=ROUTE_SUMMARY_PROJECTION
+        )
+        return RouteSummaryListResponse(
+            success=True,
+            message="Routes fetched successfully",
+            status_code=200,
+            data=[RouteSummary(**route_summary_document(route)) for route in routes],
+            next_cursor=next_cursor
+        )
+    except InvalidCursor as e:
+        return _route_summary_error(str(e), 400)
+    except Exception as e:
+        return _route_summary_error(f"Error: {str(e)}", 500)
+
+
+def _route_summary_error(message: str, status_code: int) -> RouteSummaryListResponse:
+    return RouteSummaryListResponse(
+        success=False,
+        message=message,
+        status_code=status_code,
+        data=[]
+    )
+
+
+async def get_route_by_id_endpoint(route_id: str, current_user: Dict):
     """Get a specific route by ID and track view"""
     try:
         # Validate route_id format
@@ -3060,26 +2656,6 @@ async def get_route_by_id_endpoint(route_id: str, token: HTTPAuthorizationCreden
                 data=None
             )
         
-        # Get current user
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            return RouteDetailResponse(
-                success=False,
-                message="Invalid credentials",
-                status_code=401,
-                data=None
-            )
-        
-        user = await user_collection.find_one({"username": username})
-        if not user:
-            return RouteDetailResponse(
-                success=False,
-                message="User not found",
-                status_code=404,
-                data=None
-            )
-        
         # Get route
         route = await route_collection.find_one({"_id": ObjectId(route_id)})
         if not route:
@@ -3090,11 +2666,11 @@ async def get_route_by_id_endpoint(route_id: str, token: HTTPAuthorizationCreden
                 data=None
             )
         
-        # Track view (increment view count)
-        await route_collection.update_one(
-            {"_id": ObjectId(route_id)},
-            {"$inc": {"stats.views_count": 1}}
-        )
+        # Track view: buffered in memory and written in batches, off the request path
+        view_counter.record(route["_id"])
+        stats = route.get("stats") or {}
+        stats["views_count"] = (stats.get("views_count") or 0) + view_counter.pending(route["_id"])
+        route["stats"] = stats
         
         # Prepare response
         route["route_id"] = str(route["_id"])
@@ -3107,13 +2683,6 @@ async def get_route_by_id_endpoint(route_id: str, token: HTTPAuthorizationCreden
             status_code=200,
             data=RouteResponse(**route)
         )
-    except JWTError:
-        return RouteDetailResponse(
-            success=False,
-            message="Invalid token",
-            status_code=401,
-            data=None
-        )
     except Exception as e:
         return RouteDetailResponse(
             success=False,
@@ -3126,7 +2695,7 @@ async def get_route_by_id_endpoint(route_id: str, token: HTTPAuthorizationCreden
 async def update_route_endpoint(
     route_id: str,
     route_update: RouteUpdateInput,
-    token: HTTPAuthorizationCredentials
+    current_user: Dict
 ):
     """Update a route"""
     try:
@@ -3134,17 +2703,7 @@ async def update_route_endpoint(
         if not ObjectId.is_valid(route_id):
             raise HTTPException(status_code=400, detail="Invalid route ID format")
         
-        # Get current user
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-        
-        user = await user_collection.find_one({"username": username})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        user_id = str(user["_id"])
+        user_id = str(current_user["_id"])
         
         # Check if route exists and belongs to user
         route = await route_collection.find_one({"_id": ObjectId(route_id)})
@@ -3172,6 +2731,7 @@ async def update_route_endpoint(
             update_data["must_visit"] = [mv.dict() for mv in route_update.must_visit]
         if route_update.days is not None:
             update_data["days"] = [day.dict() for day in route_update.days]
+            update_data["cover_image"] = cover_image(route_update.days)
         
         # Add updated_at timestamp
         update_data["updated_at"] = datetime.utcnow()
@@ -3187,30 +2747,18 @@ async def update_route_endpoint(
             "message": "Route updated successfully",
             "status_code": 200
         }
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating route: {str(e)}")
 
 
-async def delete_route_endpoint(route_id: str, token: HTTPAuthorizationCredentials):
+async def delete_route_endpoint(route_id: str, current_user: Dict):
     """Delete a route"""
     try:
         # Validate route_id format
         if not ObjectId.is_valid(route_id):
             raise HTTPException(status_code=400, detail="Invalid route ID format")
         
-        # Get current user
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-        
-        user = await user_collection.find_one({"username": username})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        user_id = str(user["_id"])
+        user_id = str(current_user["_id"])
         
         # Check if route exists and belongs to user
         route = await route_collection.find_one({"_id": ObjectId(route_id)})
@@ -3228,14 +2776,23 @@ async def delete_route_endpoint(route_id: str, token: HTTPAuthorizationCredentia
             "message": "Route deleted successfully",
             "status_code": 200
         }
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting route: {str(e)}")
 
 
+def _public_routes_query(category: Optional[str], season: Optional[str], budget: Optional[str]) -> Dict:
+    query = {"is_public": True}  # Only get public routes
+    if category:
+        query["category"] = category
+    if season:
+        query["season"] = season
+    if budget:
+        query["budget"] = budget
+    return query
+
+
 async def get_public_routes_endpoint(
-    token: HTTPAuthorizationCredentials,
+    current_user: Dict,
     category: Optional[str] = None,
     season: Optional[str] = None,
     budget: Optional[str] = None,
@@ -3243,25 +2800,7 @@ async def get_public_routes_endpoint(
 ):
     """Get public routes with optional filtering"""
     try:
-        # Get current user
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            return RouteListResponse(
-                success=False,
-                message="Invalid credentials",
-                status_code=401,
-                data=[]
-            )
-        
-        # Build query for public routes
-        query = {"is_public": True}  # Only get public routes
-        if category:
-            query["category"] = category
-        if season:
-            query["season"] = season
-        if budget:
-            query["budget"] = budget
+        query = _public_routes_query(category, season, budget)
         
         # Get public routes only
         routes = await route_collection.find(query).limit(limit).to_list(length=None)
@@ -3279,13 +2818,6 @@ async def get_public_routes_endpoint(
             status_code=200,
             data=route_responses
         )
-    except JWTError:
-        return RouteListResponse(
-            success=False,
-            message="Invalid token",
-            status_code=401,
-            data=[]
-        )
     except Exception as e:
         return RouteListResponse(
             success=False,
@@ -3295,8 +2827,126 @@ async def get_public_routes_endpoint(
         )
 
 
+async def get_public_route_summaries_endpoint(
+    current_user: Dict,
+    category: Optional[str] = None,
+    season: Optional[str] = None,
+    budget: Optional[str] = None,
+    limit: int = 10,
+    cursor: Optional[str] = None
+):
+    """Page of public routes, newest first, without the itinerary"""
+    try:
+        routes, next_cursor = await fetch_page(
+            route_collection, _public_routes_query(category, season, budget), ROUTE_SUMMARY_SORT,
+            max(1, min(limit, 50)), cursor, projection=ROUTE_SUMMARY_PROJECTION
+        )
+        return RouteSummaryListResponse(
+            success=True,
+            message="Public routes fetched successfully",
+            status_code=200,
+            data=[RouteSummary(**route_summary_document(route)) for route in routes],
+            next_cursor=next_cursor
+        )
+    except InvalidCursor as e:
+        return _route_summary_error(str(e), 400)
+    except Exception as e:
+        return _route_summary_error(f"Error: {str(e)}", 500)
+
+
+def _public_route_search_query(
+    user_id: str,
+    q: Optional[str],
+    city: Optional[str],
+    country: Optional[str],
+    category: Optional[str],
+    season: Optional[str],
+    budget: Optional[str],
+    travel_style: Optional[str]
+) -> Dict:
+    """Filter for public routes that are NOT from the current user.
+
+    City and country match case-insensitively (as whole values, taken literally); category, season,
+    budget and travel_style match exactly.
+    """
+    query = {
+        "is_public": True,  # Only search public routes
+        "user_id": {"$ne": user_id}  # Exclude current user's routes
+    }
+    
+    # Text search on route title
+    if q and len(q.strip()) >= 2:
+        query["title"] = {"$regex": q.strip(), "$options": "i"}
+    
+    # Location filters
+    if city:
+        query["city"] = {"$regex": f"^{re.escape(city)}$", "$options": "i"}
+    
+    if country:
+        query["country"] = {"$regex": f"^{re.escape(country)}$", "$options": "i"}
+    
+    # Category filters
+    if category:
+        query["category"] = category
+    
+    if season:
+        query["season"] = season
+    
+    if budget:
+        query["budget"] = budget
+        
+    if travel_style:
+        query["travel_style"] = travel_style
+    return query
+
+
+def _route_search_sort(sort_by: str) -> List:
+    if sort_by == "popularity":
+        return [("stats.views_count", -1), ("stats.likes_count", -1)]
+    elif sort_by == "rating":
+        # Sort by likes and views as proxy for rating
+        return [("stats.likes_count", -1), ("stats.views_count", -1)]
+    elif sort_by == "recent":
+        return [("created_at", -1)]
+    elif sort_by == "title":
+        return [("title", 1)]
+    # Default to popularity
+    return [("stats.views_count", -1), ("stats.likes_count", -1)]
+
+
+def _route_search_message(
+    count: int,
+    q: Optional[str],
+    city: Optional[str],
+    country: Optional[str],
+    category: Optional[str],
+    season: Optional[str],
+    budget: Optional[str],
+    travel_style: Optional[str]
+) -> str:
+    search_terms = []
+    if q:
+        search_terms.append(f"title containing '{q}'")
+    if city:
+        search_terms.append(f"city '{city}'")
+    if country:
+        search_terms.append(f"country '{country}'")
+    if category:
+        search_terms.append(f"category '{category}'")
+    if season:
+        search_terms.append(f"season '{season}'")
+    if budget:
+        search_terms.append(f"budget '{budget}'")
+    if travel_style:
+        search_terms.append(f"travel style '{travel_style}'")
+    
+    if search_terms:
+        return f"Found {count} public routes for: {', '.join(search_terms)}"
+    return f"Found {count} public routes"
+
+
 async def search_public_routes_endpoint(
-    token: HTTPAuthorizationCredentials,
+    current_user: Dict,
     q: Optional[str] = None,
     city: Optional[str] = None,
     country: Optional[str] = None,
@@ -3311,78 +2961,14 @@ async def search_public_routes_endpoint(
     Search public routes with multiple filters and sorting options
     """
     try:
-        # Get current user for authentication
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            return RouteListResponse(
-                success=False,
-                message="Invalid credentials",
-                status_code=401,
-                data=[]
-            )
-        
-        # Get current user to exclude their routes
-        user = await user_collection.find_one({"username": username})
-        if not user:
-            return RouteListResponse(
-                success=False,
-                message="User not found",
-                status_code=404,
-                data=[]
-            )
-        
-        # Build search query - only public routes that are NOT from the current user
-        user_id = str(user["_id"])
-        query = {
-            "is_public": True,  # Only search public routes
-            "user_id": {"$ne": user_id}  # Exclude current user's routes
-        }
-        
-        # Text search on route title
-        if q and len(q.strip()) >= 2:
-            query["title"] = {"$regex": q.strip(), "$options": "i"}
-        
-        # Location filters
-        if city:
-            query["city"] = {"$regex": f"^{city}$", "$options": "i"}
-        
-        if country:
-            query["country"] = {"$regex": f"^{country}$", "$options": "i"}
-        
-        # Category filters
-        if category:
-            query["category"] = category
-        
-        if season:
-            query["season"] = season
-        
-        if budget:
-            query["budget"] = budget
-            
-        if travel_style:
-            query["travel_style"] = travel_style
+        user_id = str(current_user["_id"])
+        query = _public_route_search_query(user_id, q, city, country, category, season, budget, travel_style)
         
         # Validate limit
         limit = max(1, min(limit, 50))  # Between 1 and 50
         
-        # Determine sort criteria
-        sort_criteria = []
-        if sort_by == "popularity":
-            sort_criteria = [("stats.views_count", -1), ("stats.likes_count", -1)]
-        elif sort_by == "rating":
-            # Sort by likes and views as proxy for rating
-            sort_criteria = [("stats.likes_count", -1), ("stats.views_count", -1)]
-        elif sort_by == "recent":
-            sort_criteria = [("created_at", -1)]
-        elif sort_by == "title":
-            sort_criteria = [("title", 1)]
-        else:
-            # Default to popularity
-            sort_criteria = [("stats.views_count", -1), ("stats.likes_count", -1)]
-        
         # Execute search
-        routes = await route_collection.find(query).sort(sort_criteria).limit(limit).to_list(length=None)
+        routes = await route_collection.find(query).sort(_route_search_sort(sort_by)).limit(limit).to_list(length=None)
         
         # Process results
         route_responses = []
@@ -3392,42 +2978,13 @@ async def search_public_routes_endpoint(
             route.pop("_id", None)
             route_responses.append(RouteResponse(**route))
         
-        # Build response message
-        search_terms = []
-        if q:
-            search_terms.append(f"title containing '{q}'")
-        if city:
-            search_terms.append(f"city '{city}'")
-        if country:
-            search_terms.append(f"country '{country}'")
-        if category:
-            search_terms.append(f"category '{category}'")
-        if season:
-            search_terms.append(f"season '{season}'")
-        if budget:
-            search_terms.append(f"budget '{budget}'")
-        if travel_style:
-            search_terms.append(f"travel style '{travel_style}'")
-        
-        if search_terms:
-            message = f"Found {len(route_responses)} public routes for: {', '.join(search_terms)}"
-        else:
-            message = f"Found {len(route_responses)} public routes"
-        
         return RouteListResponse(
             success=True,
-            message=message,
+            message=_route_search_message(len(route_responses), q, city, country, category, season, budget, travel_style),
             status_code=200,
             data=route_responses
         )
     
-    except JWTError:
-        return RouteListResponse(
-            success=False,
-            message="Invalid token",
-            status_code=401,
-            data=[]
-        )
     except Exception as e:
         return RouteListResponse(
             success=False,
@@ -3437,26 +2994,52 @@ async def search_public_routes_endpoint(
         )
 
 
+async def search_public_route_summaries_endpoint(
+    current_user: Dict,
+    q: Optional[str] = None,
+    city: Optional[str] = None,
+    country: Optional[str] = None,
+    category: Optional[str] = None,
+    season: Optional[str] = None,
+    budget: Optional[str] = None,
+    travel_style: Optional[str] = None,
+    limit: int = 20,
+    sort_by: str = "popularity",
+    cursor: Optional[str] = None
+):
+    """Page of search_public_routes_endpoint results without the itinerary; cursors continue the same sort_by"""
+    try:
+        user_id = str(current_user["_id"])
+        query = _public_route_search_query(user_id, q, city, country, category, season, budget, travel_style)
+        # _id makes the order total so the cursor never skips or repeats routes with equal stats
+        sort = _route_search_sort(sort_by) + [("_id", -1)]
+        routes, next_cursor = await fetch_page(
+            route_collection, query, sort, max(1, min(limit, 50)), cursor,
+            projection=ROUTE_SUMMARY_PROJECTION
+        )
+        return RouteSummaryListResponse(
+            success=True,
+            message=_route_search_message(len(routes), q, city, country, category, season, budget, travel_style),
+            status_code=200,
+            data=[RouteSummary(**route_summary_document(route)) for route in routes],
+            next_cursor=next_cursor
+        )
+    except InvalidCursor as e:
+        return _route_summary_error(str(e), 400)
+    except Exception as e:
+        return _route_summary_error(f"Search error: {str(e)}", 500)
+
+
 async def toggle_route_privacy_endpoint(
     route_id: str,
     is_public: bool,
-    token: HTTPAuthorizationCredentials
+    current_user: Dict
 ):
     """
     Toggle the privacy setting of a route (public/private)
     """
     try:
-        # Verify token and get user
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            return {"success": False, "message": "Invalid credentials", "status_code": 401}
-        
-        user = await user_collection.find_one({"username": username})
-        if not user:
-            return {"success": False, "message": "User not found", "status_code": 404}
-        
-        user_id = str(user["_id"])
+        user_id = str(current_user["_id"])
         
         # Validate route_id format
         try:
@@ -3489,29 +3072,16 @@ async def toggle_route_privacy_endpoint(
             "status_code": 200
         }
     
-    except JWTError:
-        return {"success": False, "message": "Invalid token", "status_code": 401}
     except Exception as e:
         return {"success": False, "message": f"Error: {str(e)}", "status_code": 500}
 
 
 ## FEEDBACK ENDPOINTS
 # Place Feedback Endpoints
-async def submit_place_feedback_endpoint(request: SubmitPlaceFeedbackRequest, token: HTTPAuthorizationCredentials):
+async def submit_place_feedback_endpoint(request: SubmitPlaceFeedbackRequest, current_user: Dict):
     """Submit feedback for a place"""
     try:
-        # Verify token and get user_id
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-        
-        # Get user_id from username
-        user = await user_collection.find_one({"username": username})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        user_id = str(user["_id"])
+        user_id = str(current_user["_id"])
         
         # Check if place exists
         place = await places_collection.find_one({"place_id": request.place_id})
@@ -3534,11 +3104,14 @@ async def submit_place_feedback_endpoint(request: SubmitPlaceFeedbackRequest, to
                 "updated_at": datetime.utcnow()
             }
             
-            # Update the existing feedback
-            await place_feedback_collection.update_one(
+            # Update the existing feedback; BEFORE gives the rating actually replaced
+            previous = await place_feedback_collection.find_one_and_update(
                 {"_id": existing_feedback["_id"]},
-                {"$set": update_doc}
+                {"$set": update_doc},
+                return_document=ReturnDocument.BEFORE
             )
+            if previous:
+                await apply_rating_change(PLACE, request.place_id, previous.get("rating"), request.rating)
             
             return SubmitFeedbackResponse(
                 success=True,
@@ -3562,6 +3135,7 @@ async def submit_place_feedback_endpoint(request: SubmitPlaceFeedbackRequest, to
         # Insert new feedback
         result = await place_feedback_collection.insert_one(feedback_doc)
         feedback_id = str(result.inserted_id)
+        await apply_rating_change(PLACE, request.place_id, None, request.rating)
         
         return SubmitFeedbackResponse(
             success=True,
@@ -3571,42 +3145,37 @@ async def submit_place_feedback_endpoint(request: SubmitPlaceFeedbackRequest, to
             created_at=feedback_doc["created_at"]
         )
         
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
     except HTTPException:
         raise  # Re-raise HTTPExceptions to preserve their status codes
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error submitting feedback: {str(e)}")
 
-async def get_place_feedback_endpoint(place_id: str, token: HTTPAuthorizationCredentials):
-    """Get all feedback for a specific place"""
+async def get_place_feedback_endpoint(
+    place_id: str,
+    current_user: Dict,
+    sort_by: str = "newest",
+    limit: int = 20,
+    cursor: Optional[str] = None
+):
+    """Get one page of feedback for a specific place (sort_by: newest, highest, lowest)"""
     try:
-        # Verify token
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-        
-        # Check if place exists
-        place = await places_collection.find_one({"place_id": place_id})
-        if not place:
-            raise HTTPException(status_code=404, detail="Place not found")
+        feedback_list, usernames, next_cursor = await fetch_feedback_page(
+            place_feedback_collection, "place_id", place_id, sort_by, limit, cursor
+        )
         
-        # Get all feedback for the place
-        feedback_cursor = place_feedback_collection.find({"place_id": place_id})
-        feedback_list = await feedback_cursor.to_list(length=None)
+        # Only an empty first page needs to tell "no feedback" from "no such place"
+        if not feedback_list and not cursor:
+            place = await places_collection.find_one({"place_id": place_id}, {"_id": 1})
+            if not place:
+                raise HTTPException(status_code=404, detail="Place not found")
         
         # Convert to response format
         feedback_responses = []
         for feedback in feedback_list:
-            # Get username for this feedback
-            user = await user_collection.find_one({"_id": ObjectId(feedback["user_id"])})
-            username = user.get("username", "Unknown") if user else "Unknown"
-            
             feedback_response = PlaceFeedbackResponse(
                 feedback_id=str(feedback["_id"]),
                 user_id=feedback["user_id"],
-                username=username,
+                username=usernames.get(feedback["user_id"], "Unknown"),
                 place_id=feedback["place_id"],
                 rating=feedback["rating"],
                 comment=feedback.get("comment"),
@@ -3620,25 +3189,20 @@ async def get_place_feedback_endpoint(place_id: str, token: HTTPAuthorizationCre
             success=True,
             message=f"Retrieved {len(feedback_responses)} feedback entries for place",
             status_code=200,
-            data=feedback_responses
+            data=feedback_responses,
+            next_cursor=next_cursor
         )
         
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    except (InvalidCursor, InvalidFeedbackSort) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
         raise  # Re-raise HTTPExceptions to preserve their status codes
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving feedback: {str(e)}")
 
-async def get_user_place_feedback_endpoint(place_id: str, user_id: str, token: HTTPAuthorizationCredentials):
+async def get_user_place_feedback_endpoint(place_id: str, user_id: str, current_user: Dict):
     """Get specific user's feedback for a place"""
     try:
-        # Verify token
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-        
         # Find the feedback
         feedback = await place_feedback_collection.find_one({
             "place_id": place_id,
@@ -3671,28 +3235,15 @@ async def get_user_place_feedback_endpoint(place_id: str, user_id: str, token: H
             data=[feedback_response]
         )
         
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
     except HTTPException:
         raise  # Re-raise HTTPExceptions to preserve their status codes
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving user feedback: {str(e)}")
 
-async def update_place_feedback_endpoint(feedback_id: str, request: UpdatePlaceFeedbackRequest, token: HTTPAuthorizationCredentials):
+async def update_place_feedback_endpoint(feedback_id: str, request: UpdatePlaceFeedbackRequest, current_user: Dict):
     """Update existing place feedback"""
     try:
-        # Verify token and get user_id
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-        
-        # Get user_id from username
-        user = await user_collection.find_one({"username": username})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        user_id = str(user["_id"])
+        user_id = str(current_user["_id"])
         
         # Validate ObjectId format
         try:
@@ -3720,10 +3271,13 @@ async def update_place_feedback_endpoint(feedback_id: str, request: UpdatePlaceF
             update_data["visited_on"] = request.visited_on
         
         # Update feedback
-        await place_feedback_collection.update_one(
+        previous = await place_feedback_collection.find_one_and_update(
             {"_id": feedback_object_id},
-            {"$set": update_data}
+            {"$set": update_data},
+            return_document=ReturnDocument.BEFORE
         )
+        if previous and request.rating is not None:
+            await apply_rating_change(PLACE, previous["place_id"], previous.get("rating"), request.rating)
         
         return UpdateFeedbackResponse(
             success=True,
@@ -3732,28 +3286,15 @@ async def update_place_feedback_endpoint(feedback_id: str, request: UpdatePlaceF
             updated_at=update_data["updated_at"]
         )
         
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
     except HTTPException:
         raise  # Re-raise HTTPExceptions to preserve their status codes
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating feedback: {str(e)}")
 
-async def delete_place_feedback_endpoint(feedback_id: str, token: HTTPAuthorizationCredentials):
+async def delete_place_feedback_endpoint(feedback_id: str, current_user: Dict):
     """Delete place feedback"""
     try:
-        # Verify token and get user_id
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-        
-        # Get user_id from username
-        user = await user_collection.find_one({"username": username})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        user_id = str(user["_id"])
+        user_id = str(current_user["_id"])
         
         # Validate ObjectId format
         try:
@@ -3771,7 +3312,9 @@ async def delete_place_feedback_endpoint(feedback_id: str, token: HTTPAuthorizat
             raise HTTPException(status_code=403, detail="Not authorized to delete this feedback")
         
         # Delete feedback
-        await place_feedback_collection.delete_one({"_id": feedback_object_id})
+        deleted = await place_feedback_collection.find_one_and_delete({"_id": feedback_object_id})
+        if deleted:
+            await apply_rating_change(PLACE, deleted["place_id"], deleted.get("rating"), None)
         
         return DeleteFeedbackResponse(
             success=True,
@@ -3780,53 +3323,21 @@ async def delete_place_feedback_endpoint(feedback_id: str, token: HTTPAuthorizat
             deleted_at=datetime.utcnow()
         )
         
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
     except HTTPException:
         raise  # Re-raise HTTPExceptions to preserve their status codes
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting feedback: {str(e)}")
 
-async def get_place_feedback_stats_endpoint(place_id: str, token: HTTPAuthorizationCredentials):
+async def get_place_feedback_stats_endpoint(place_id: str, current_user: Dict):
     """Get feedback statistics for a place"""
     try:
-        # Verify token
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-        
         # Check if place exists
         place = await places_collection.find_one({"place_id": place_id})
         if not place:
             raise HTTPException(status_code=404, detail="Place not found")
         
-        # Get all feedback for the place
-        feedback_cursor = place_feedback_collection.find({"place_id": place_id})
-        feedback_list = await feedback_cursor.to_list(length=None)
-        
-        if not feedback_list:
-            stats_data = {
-                "total_feedback": 0,
-                "average_rating": 0,
-                "rating_distribution": {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-            }
-        else:
-            # Calculate statistics
-            ratings = [feedback["rating"] for feedback in feedback_list]
-            total_feedback = len(ratings)
-            average_rating = sum(ratings) / total_feedback
-            
-            # Rating distribution
-            rating_distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-            for rating in ratings:
-                rating_distribution[rating] += 1
-            
-            stats_data = {
-                "total_feedback": total_feedback,
-                "average_rating": round(average_rating, 2),
-                "rating_distribution": rating_distribution
-            }
+        # Maintained incrementally by the submit/update/delete endpoints
+        stats_data = await get_feedback_stats(PLACE, place_id)
         
         return FeedbackStatsResponse(
             success=True,
@@ -3835,29 +3346,16 @@ async def get_place_feedback_stats_endpoint(place_id: str, token: HTTPAuthorizat
             data=stats_data
         )
         
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
     except HTTPException:
         raise  # Re-raise HTTPExceptions to preserve their status codes
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving statistics: {str(e)}")
 
 # Route Feedback Endpoints
-async def submit_route_feedback_endpoint(request: SubmitRouteFeedbackRequest, token: HTTPAuthorizationCredentials):
+async def submit_route_feedback_endpoint(request: SubmitRouteFeedbackRequest, current_user: Dict):
     """Submit feedback for a route"""
     try:
-        # Verify token and get user_id
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-        
-        # Get user_id from username
-        user = await user_collection.find_one({"username": username})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        user_id = str(user["_id"])
+        user_id = str(current_user["_id"])
         
         # Check if route exists (convert string to ObjectId for MongoDB lookup)
         try:
@@ -3886,11 +3384,14 @@ async def submit_route_feedback_endpoint(request: SubmitRouteFeedbackRequest, to
                 "updated_at": datetime.utcnow()
             }
             
-            # Update the existing feedback
-            await route_feedback_collection.update_one(
+            # Update the existing feedback; BEFORE gives the rating actually replaced
+            previous = await route_feedback_collection.find_one_and_update(
                 {"_id": existing_feedback["_id"]},
-                {"$set": update_doc}
+                {"$set": update_doc},
+                return_document=ReturnDocument.BEFORE
             )
+            if previous:
+                await apply_rating_change(ROUTE, request.route_id, previous.get("rating"), request.rating)
             
             return SubmitFeedbackResponse(
                 success=True,
@@ -3914,6 +3415,7 @@ async def submit_route_feedback_endpoint(request: SubmitRouteFeedbackRequest, to
         # Insert new feedback
         result = await route_feedback_collection.insert_one(feedback_doc)
         feedback_id = str(result.inserted_id)
+        await apply_rating_change(ROUTE, request.route_id, None, request.rating)
         
         return SubmitFeedbackResponse(
             success=True,
@@ -3923,48 +3425,42 @@ async def submit_route_feedback_endpoint(request: SubmitRouteFeedbackRequest, to
             created_at=feedback_doc["created_at"]
         )
         
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
     except HTTPException:
         raise  # Re-raise HTTPExceptions to preserve their status codes
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error submitting route feedback: {str(e)}")
 
-async def get_route_feedback_endpoint(route_id: str, token: HTTPAuthorizationCredentials):
-    """Get all feedback for a specific route"""
+async def get_route_feedback_endpoint(
+    route_id: str,
+    current_user: Dict,
+    sort_by: str = "newest",
+    limit: int = 20,
+    cursor: Optional[str] = None
+):
+    """Get one page of feedback for a specific route (sort_by: newest, highest, lowest)"""
     try:
-        # Verify token
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-        
-        # Check if route exists (convert string to ObjectId for MongoDB lookup)
-        try:
-            from bson import ObjectId
-            route = await route_collection.find_one({"_id": ObjectId(route_id)})
-        except:
-            # If ObjectId conversion fails, try string lookup for backward compatibility
-            route = await route_collection.find_one({"route_id": route_id})
-        
-        if not route:
-            raise HTTPException(status_code=404, detail="Route not found")
+        feedback_list, usernames, next_cursor = await fetch_feedback_page(
+            route_feedback_collection, "route_id", route_id, sort_by, limit, cursor
+        )
         
-        # Get all feedback for the route
-        feedback_cursor = route_feedback_collection.find({"route_id": route_id})
-        feedback_list = await feedback_cursor.to_list(length=None)
+        # Only an empty first page needs to tell "no feedback" from "no such route"
+        if not feedback_list and not cursor:
+            # Check if route exists (convert string to ObjectId for MongoDB lookup)
+            if ObjectId.is_valid(route_id):
+                route = await route_collection.find_one({"_id": ObjectId(route_id)}, {"_id": 1})
+            else:
+                # If ObjectId conversion fails, try string lookup for backward compatibility
+                route = await route_collection.find_one({"route_id": route_id}, {"_id": 1})
+            if not route:
+                raise HTTPException(status_code=404, detail="Route not found")
         
         # Convert to response format
         feedback_responses = []
         for feedback in feedback_list:
-            # Get username for this feedback
-            user = await user_collection.find_one({"_id": ObjectId(feedback["user_id"])})
-            username = user.get("username", "Unknown") if user else "Unknown"
-            
             feedback_response = RouteFeedbackResponse(
                 feedback_id=str(feedback["_id"]),
                 user_id=feedback["user_id"],
-                username=username,
+                username=usernames.get(feedback["user_id"], "Unknown"),
                 route_id=feedback["route_id"],
                 rating=feedback["rating"],
                 comment=feedback.get("comment"),
@@ -3978,25 +3474,20 @@ async def get_route_feedback_endpoint(route_id: str, token: HTTPAuthorizationCre
             success=True,
             message=f"Retrieved {len(feedback_responses)} feedback entries for route",
             status_code=200,
-            data=feedback_responses
+            data=feedback_responses,
+            next_cursor=next_cursor
         )
         
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
+    except (InvalidCursor, InvalidFeedbackSort) as e:
+        raise HTTPException(status_code=400, detail=str(e))
     except HTTPException:
         raise  # Re-raise HTTPExceptions to preserve their status codes
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving route feedback: {str(e)}")
 
-async def get_route_feedback_stats_endpoint(route_id: str, token: HTTPAuthorizationCredentials):
+async def get_route_feedback_stats_endpoint(route_id: str, current_user: Dict):
     """Get feedback statistics for a route"""
     try:
-        # Verify token
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-        
         # Check if route exists (convert string to ObjectId for MongoDB lookup)
         try:
             from bson import ObjectId
@@ -4008,32 +3499,8 @@ async def get_route_feedback_stats_endpoint(route_id: str, token: HTTPAuthorizat
         if not route:
             raise HTTPException(status_code=404, detail="Route not found")
         
-        # Get all feedback for the route
-        feedback_cursor = route_feedback_collection.find({"route_id": route_id})
-        feedback_list = await feedback_cursor.to_list(length=None)
-        
-        if not feedback_list:
-            stats_data = {
-                "total_feedback": 0,
-                "average_rating": 0,
-                "rating_distribution": {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-            }
-        else:
-            # Calculate statistics
-            ratings = [feedback["rating"] for feedback in feedback_list]
-            total_feedback = len(ratings)
-            average_rating = sum(ratings) / total_feedback
-            
-            # Rating distribution
-            rating_distribution = {1: 0, 2: 0, 3: 0, 4: 0, 5: 0}
-            for rating in ratings:
-                rating_distribution[rating] += 1
-            
-            stats_data = {
-                "total_feedback": total_feedback,
-                "average_rating": round(average_rating, 2),
-                "rating_distribution": rating_distribution
-            }
+        # Maintained incrementally by the submit/update/delete endpoints
+        stats_data = await get_feedback_stats(ROUTE, route_id)
         
         return FeedbackStatsResponse(
             success=True,
@@ -4042,28 +3509,15 @@ async def get_route_feedback_stats_endpoint(route_id: str, token: HTTPAuthorizat
             data=stats_data
         )
         
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
     except HTTPException:
         raise  # Re-raise HTTPExceptions to preserve their status codes
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error retrieving route statistics: {str(e)}")
 
-async def update_route_feedback_endpoint(feedback_id: str, request: UpdateRouteFeedbackRequest, token: HTTPAuthorizationCredentials):
+async def update_route_feedback_endpoint(feedback_id: str, request: UpdateRouteFeedbackRequest, current_user: Dict):
     """Update existing route feedback"""
     try:
-        # Verify token and get user_id
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-        
-        # Get user_id from username
-        user = await user_collection.find_one({"username": username})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        user_id = str(user["_id"])
+        user_id = str(current_user["_id"])
         
         # Validate ObjectId format
         try:
@@ -4091,10 +3545,13 @@ async def update_route_feedback_endpoint(feedback_id: str, request: UpdateRouteF
             update_data["visited_on"] = request.visited_on
         
         # Update feedback
-        await route_feedback_collection.update_one(
+        previous = await route_feedback_collection.find_one_and_update(
             {"_id": feedback_object_id},
-            {"$set": update_data}
+            {"$set": update_data},
+            return_document=ReturnDocument.BEFORE
         )
+        if previous and request.rating is not None:
+            await apply_rating_change(ROUTE, previous["route_id"], previous.get("rating"), request.rating)
         
         return UpdateFeedbackResponse(
             success=True,
@@ -4103,28 +3560,15 @@ async def update_route_feedback_endpoint(feedback_id: str, request: UpdateRouteF
             updated_at=update_data["updated_at"]
         )
         
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
     except HTTPException:
         raise  # Re-raise HTTPExceptions to preserve their status codes
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error updating route feedback: {str(e)}")
 
-async def delete_route_feedback_endpoint(feedback_id: str, token: HTTPAuthorizationCredentials):
+async def delete_route_feedback_endpoint(feedback_id: str, current_user: Dict):
     """Delete route feedback"""
     try:
-        # Verify token and get user_id
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-        
-        # Get user_id from username
-        user = await user_collection.find_one({"username": username})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-        
-        user_id = str(user["_id"])
+        user_id = str(current_user["_id"])
         
         # Validate ObjectId format
         try:
@@ -4142,7 +3586,9 @@ async def delete_route_feedback_endpoint(feedback_id: str, token: HTTPAuthorizat
             raise HTTPException(status_code=403, detail="Not authorized to delete this feedback")
         
         # Delete feedback
-        await route_feedback_collection.delete_one({"_id": feedback_object_id})
+        deleted = await route_feedback_collection.find_one_and_delete({"_id": feedback_object_id})
+        if deleted:
+            await apply_rating_change(ROUTE, deleted["route_id"], deleted.get("rating"), None)
         
         return DeleteFeedbackResponse(
             success=True,
@@ -4151,22 +3597,14 @@ async def delete_route_feedback_endpoint(feedback_id: str, token: HTTPAuthorizat
             deleted_at=datetime.utcnow()
         )
         
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
     except HTTPException:
         raise  # Re-raise HTTPExceptions to preserve their status codes
     except Exception as e:
         raise HTTPException(status_code=500, detail=f"Error deleting route feedback: {str(e)}")
 
-async def get_user_route_feedback_endpoint(route_id: str, user_id: str, token: HTTPAuthorizationCredentials):
+async def get_user_route_feedback_endpoint(route_id: str, user_id: str, current_user: Dict):
     """Get specific user's feedback for a route"""
     try:
-        # Verify token
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid credentials")
-        
         # Find the feedback
         feedback = await route_feedback_collection.find_one({
             "route_id": route_id,
@@ -4199,8 +3637,6 @@ async def get_user_route_feedback_endpoint(route_id: str, user_id: str, token: H
             data=[feedback_response]
         )
         
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
     except HTTPException:
         raise  # Re-raise HTTPExceptions to preserve their status codes
     except Exception as e:
@@ -4208,25 +3644,15 @@ async def get_user_route_feedback_endpoint(route_id: str, user_id: str, token: H
 
 # ==================== EMAIL VERIFICATION SYSTEM ====================
 
-# In-memory storage for verification codes (in production, use Redis or database)
-verification_codes = {}
-
-def generate_verification_code() -> str:
-    """Generate a 6-digit verification code"""
-    return ''.join(random.choices(string.digits, k=6))
-
 async def send_verification_email_endpoint(request: SendVerificationRequest):
     """Send verification code to email"""
+    # Generate and store the verification code (expires in 10 minutes, shared across workers)
+    try:
+        verification_code = await verification_store.issue(request.email)
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=f"Error creating verification code: {str(e)}")
+    
     try:
-        # Generate verification code
-        verification_code = generate_verification_code()
-        
-        # Store the code with email (expires in 10 minutes)
-        verification_codes[request.email] = {
-            "code": verification_code,
-            "created_at": datetime.utcnow()
-        }
-        
         # Create email message
         html_content = f"""
         <!DOCTYPE html>
@@ -4256,15 +3682,8 @@ async def send_verification_email_endpoint(request: SendVerificationRequest):
         </html>
         """
         
-        message = MessageSchema(
-            subject="WayfareProject Email Verification",
-            recipients=[request.email],
-            body=html_content,
-            subtype=MessageType.html
-        )
-        
-        # Send email (or suppress for development)
-        await fastmail.send_message(message)
+        # Queued for the background outbox worker; the response does not wait for SMTP
+        await email_outbox.enqueue([request.email], "WayfareProject Email Verification", html_content)
         
         # In development mode, print the verification code to console
         print(f"📧 DEVELOPMENT MODE: Verification code for {request.email}: {verification_code}")
@@ -4288,110 +3707,24 @@ async def send_verification_email_endpoint(request: SendVerificationRequest):
             status_code=200
         )
 
-async def get_top_rated_places_endpoint(token: HTTPAuthorizationCredentials = Depends(oauth2_scheme)):
+async def get_top_rated_places_endpoint(
+    current_user: Dict,
+    city: Optional[str] = None,
+    category: Optional[str] = None,
+    limit: int = 10
+):
     """
-    Get top 10 rated places based on aggregated feedback ratings.
-    Returns places with their average feedback rating and all place details.
+    Get top rated places based on aggregated feedback ratings, optionally per city and/or category.
+    Ranked by Bayesian-weighted rating from the in-memory leaderboard (services/leaderboard.py).
     """
     try:
-        # User authentication
-        try:
-            payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-            username = payload.get("sub")
-            if not username:
-                return TopRatedPlacesResponse(
-                    success=False,
-                    message="Invalid credentials",
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                    data=[]
-                )
-        except JWTError:
-            return TopRatedPlacesResponse(
-                success=False,
-                message="Invalid token",
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                data=[]
-            )
-
-        # Aggregate feedback ratings for each place
-        pipeline = [
-            {
-                "$group": {
-                    "_id": "$place_id",
-                    "total_rating": {"$sum": "$rating"},
-                    "feedback_count": {"$sum": 1},
-                    "average_rating": {"$avg": "$rating"}
-                }
-            },
-            {
-                "$sort": {
-                    "average_rating": -1,  # Highest average rating first
-                    "_id": 1  # Then alphabetically by place_id
-                }
-            },
-            {
-                "$limit": 10  # Get top 10 places
-            }
-        ]
-        
-        # Execute aggregation pipeline
-        feedback_aggregation = await place_feedback_collection.aggregate(pipeline).to_list(length=None)
-        
-        if not feedback_aggregation:
-            return TopRatedPlacesResponse(
-                success=True,
-                message="No feedback data available",
-                status_code=200,
-                data=[]
-            )
-        
-        # Get place details for the top-rated places
-        top_rated_places = []
-        for feedback_data in feedback_aggregation:
-            place_id = feedback_data["_id"]
-            
-            # Get place details from places collection
-            place = await places_collection.find_one({"place_id": place_id})
-            
-            if place:
-                # Create TopRatedPlaceResponse object
-                top_rated_place = TopRatedPlaceResponse(
-                    place_id=place_id,
-                    name=place.get("name", ""),
-                    city=place.get("city", ""),
-                    category=place.get("category", ""),
-                    wayfare_category=place.get("wayfare_category"),
-                    price=place.get("price"),
-                    rating=float(place.get("rating", 0) or 0),  # Original place rating
-                    wayfare_rating=round(feedback_data["average_rating"], 2),  # Calculated average (renamed)
-                    total_feedback_count=feedback_data["feedback_count"],
-                    image=place.get("image"),
-                    detail_url=place.get("detail_url"),
-                    opening_hours=place.get("opening_hours"),
-                    coordinates=PlaceCoordinates(
-                        lat=float(place.get("coordinates", {}).get("lat", 0.0) or 0.0),
-                        lng=float(place.get("coordinates", {}).get("lng", 0.0) or 0.0)
-                    ) if place.get("coordinates") and place.get("coordinates").get("lat") is not None and place.get("coordinates").get("lng") is not None else None,
-                    address=place.get("address"),
-                    source=place.get("source"),
-                    country=place.get("country"),
-                    country_id=place.get("country_id"),
-                    city_id=place.get("city_id"),
-                    popularity=float(place.get("popularity", 0) or 0),
-                    duration=place.get("duration"),
-                    created_at=place.get("created_at"),
-                    updated_at=place.get("updated_at")
-                )
-                top_rated_places.append(top_rated_place)
-        
-        # Sort by wayfare rating (descending) and then alphabetically by name
-        top_rated_places.sort(key=lambda x: (-x.wayfare_rating, x.name.lower()))
+        top_rated = await top_rated_places.top(city, category, max(1, min(limit, LEADERBOARD_MAX_SIZE)))
         
         return TopRatedPlacesResponse(
             success=True,
-            message="Top rated places retrieved successfully",
+            message="Top rated places retrieved successfully" if top_rated else "No feedback data available",
             status_code=200,
-            data=top_rated_places
+            data=top_rated
         )
         
     except Exception as e:
@@ -4405,26 +3738,16 @@ async def get_top_rated_places_endpoint(token: HTTPAuthorizationCredentials = De
 async def verify_email_code_endpoint(request: VerifyCodeRequest):
     """Verify the email verification code"""
     try:
-        # Find the verification record by code
-        user_email = None
-        for email, record in verification_codes.items():
-            if record["code"] == request.verification_code:
-                user_email = email
-                break
+        # Single lookup by code hash; the record is removed so the code works once
+        record = await verification_store.consume(request.verification_code)
         
-        if not user_email:
+        if not record:
             raise HTTPException(status_code=400, detail="Invalid verification code")
         
         # Check if code is expired (10 minutes)
-        record = verification_codes[user_email]
-        time_diff = datetime.utcnow() - record["created_at"]
-        if time_diff.total_seconds() > 600:  # 10 minutes
-            del verification_codes[user_email]
+        if is_expired(record):
             raise HTTPException(status_code=400, detail="Verification code has expired")
         
-        # Code is valid, remove it from storage
-        del verification_codes[user_email]
-        
         return VerificationResponse(
             success=True,
             message="Code verified successfully",
@@ -4437,23 +3760,12 @@ async def verify_email_code_endpoint(request: VerifyCodeRequest):
         raise HTTPException(status_code=500, detail=f"Error verifying code: {str(e)}") 
 
 
-async def search_cities_endpoint(query: str, limit: int, token: HTTPAuthorizationCredentials):
+async def search_cities_endpoint(query: str, limit: int, current_user: Dict):
     """
     Search cities by name for autocomplete functionality.
     Returns cities that match the search query with country information.
     """
     try:
-        # User authentication
-        payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-        username = payload.get("sub")
-
-        if not username:
-            raise HTTPException(status_code=401, detail="Invalid token")
-
-        user = await user_collection.find_one({"username": username})
-        if not user:
-            raise HTTPException(status_code=404, detail="User not found")
-
         # Search cities with case-insensitive regex
         search_pattern = {"$regex": f"^{query}", "$options": "i"}
         cities_cursor = cities_collection.find(
@@ -4502,8 +3814,6 @@ async def search_cities_endpoint(query: str, limit: int, token: HTTPAuthorizatio
             data=search_results
         )
         
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
     except Exception as e:
         return CitySearchResponse(
             success=False,
@@ -4519,7 +3829,7 @@ async def search_places_for_must_visit_endpoint(
     query: str = "",
     category: str = None,
     limit: int = 20,
-    token: HTTPAuthorizationCredentials = None
+    current_user: Optional[Dict] = None
 ):
     """
     Search/autocomplete places for must-visit selection in route creation.
@@ -4529,25 +3839,18 @@ async def search_places_for_must_visit_endpoint(
         query: Search term for place names (optional, for autocomplete)
         category: Optional category filter (museum, restaurant, etc.)
         limit: Maximum number of places to return (default: 20, max: 50)
-        token: JWT authentication token
+        current_user: Authenticated user (optional)
         
     Returns:
         PlaceSearchResponse with list of matching places for UI selection
     """
     try:
-        # Validate authentication
-        if token:
-            payload = jwt.decode(token.credentials, SECRET_KEY, algorithms=[ALGORITHM])
-            username = payload.get("sub")
-            if not username:
-                raise HTTPException(status_code=401, detail="Invalid credentials")
-        
         # Validate limit
         limit = min(max(limit, 1), 50)  # Clamp between 1-50
         
         # Build query for places collection
         search_query = {
-            "city": {"$regex": f"^{city}$", "$options": "i"},
+            "city_norm": normalize_text(city),
             "active": {"$ne": False}  # Exclude inactive places
         }
         
@@ -4557,11 +3860,11 @@ async def search_places_for_must_visit_endpoint(
         
         # Add category filter if provided (search wayfare_category primarily)
         if category:
-            search_query["wayfare_category"] = {"$regex": f"^{category}$", "$options": "i"}
+            search_query["wayfare_category"] = {"$regex": f"^{re.escape(category)}$", "$options": "i"}
         
         # Query places collection with sorting by rating and name
         places_cursor = places_collection.find(search_query).sort([
-            ("rating", -1),  # Primary sort: highest rated first
+            ("rating_num", -1),  # Primary sort: highest rated first
             ("name", 1)      # Secondary sort: alphabetical for ties
         ]).limit(limit)
         
@@ -4619,8 +3922,6 @@ async def search_places_for_must_visit_endpoint(
             data=search_results
         )
         
-    except JWTError:
-        raise HTTPException(status_code=401, detail="Invalid token")
     except Exception as e:
         return PlaceSearchResponse(
             success=False,
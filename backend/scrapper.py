@@ -1,12 +1,38 @@
 from typing import Optional, List, Dict
-from dataclasses import dataclass
+from dataclasses import dataclass, asdict
 import asyncio
+import os
+from concurrent.futures import ThreadPoolExecutor
 from geopy.geocoders import Nominatim
 from config.database import places_collection, cities_collection
+from config.indexes import CASE_INSENSITIVE
 from models.model import PlaceModel
 import geopy
 from math import radians, cos, sin, asin, sqrt
 from difflib import SequenceMatcher
+from services.geocode_cache import geocode_cache, is_cache_miss, place_cache_key, query_cache_key
+from services.rate_limiter import AsyncTokenBucket
+
+# Geocoding runs on its own bounded pool so slow Nominatim calls never starve the default executor.
+# Nominatim's usage policy allows at most 1 request per second per application. The token bucket
+# below lives in process memory, so it only enforces that for a single worker: with N uvicorn
+# workers (or several hosts) run one geocoding worker or set NOMINATIM_REQUESTS_PER_SECOND to 1/N.
+GEOCODING_MAX_WORKERS = int(os.getenv("GEOCODING_MAX_WORKERS", "4"))
+NOMINATIM_REQUESTS_PER_SECOND = float(os.getenv("NOMINATIM_REQUESTS_PER_SECOND", "1"))
+# How often the shared scraper reloads the city mapping and city center cache
+CITY_DATA_REFRESH_SECONDS = int(os.getenv("CITY_DATA_REFRESH_SECONDS", "3600"))
+
+geocoding_executor: Optional[ThreadPoolExecutor] = None
+nominatim_rate_limiter = AsyncTokenBucket(rate=NOMINATIM_REQUESTS_PER_SECOND, capacity=1)
+
+
+def get_geocoding_executor() -> ThreadPoolExecutor:
+    """The geocoding pool, created on first use and again after stop_place_scraper() released it"""
+    global geocoding_executor
+    if geocoding_executor is None:
+        geocoding_executor = ThreadPoolExecutor(max_workers=GEOCODING_MAX_WORKERS, thread_name_prefix="geocoding")
+    return geocoding_executor
+
 
 @dataclass
 class Place:
@@ -30,6 +56,8 @@ class PlaceScraper:
         self._mapping_loaded = False
         # NEW: City center coordinates cache for validation
         self._city_coordinates: Dict[str, tuple] = {}
+        self._mapping_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
 
     def _calculate_distance(self, lat1: float, lng1: float, lat2: float, lng2: float) -> float:
         """Calculate distance between two coordinates using Haversine formula"""
@@ -50,9 +78,7 @@ class PlaceScraper:
         
         # Try to find city in database
         try:
-            city_doc = await cities_collection.find_one({
-                "name": {"$regex": f"^{city}$", "$options": "i"}
-            })
+            city_doc = await cities_collection.find_one({"name": city}, collation=CASE_INSENSITIVE)
             
             if city_doc and city_doc.get("coordinates"):
                 coords = city_doc["coordinates"]
@@ -185,56 +211,112 @@ class PlaceScraper:
         print(f"DEBUG: ACCEPTED - Place '{name}' passed validation: {distance_km:.1f}km, {confidence}% confidence")
         return True
 
-    async def _load_city_mapping(self):
+    async def _load_city_mapping(self, force: bool = False):
         """Load all cities from database and create dynamic geocoding mapping"""
-        if self._mapping_loaded:
+        if self._mapping_loaded and not force:
             return
             
-        try:
-            print("DEBUG: Loading city mapping from database...")
-            # Get all active cities from database
-            cities = await cities_collection.find({"active": True}).to_list(length=None)
-            
-            for city_doc in cities:
-                city_name = city_doc.get("name", "").lower()
-                country = city_doc.get("country", "")
+        async with self._mapping_lock:
+            if self._mapping_loaded and not force:
+                return
+            try:
+                print("DEBUG: Loading city mapping from database...")
+                # Get all active cities from database
+                cities = await cities_collection.find(
+                    {"active": True}, {"name": 1, "country": 1}
+                ).to_list(length=None)
                 
-                if not city_name or not country:
-                    continue
+                # Build into a fresh dict and swap it in, so concurrent lookups never see a partial mapping
+                city_mapping: Dict[str, Dict[str, str]] = {}
+                for city_doc in cities:
+                    city_name = city_doc.get("name", "").lower()
+                    country = city_doc.get("country", "")
                     
-                # Create mapping entry
-                city_info = {
-                    "name": city_doc.get("name"),
-                    "country": country
-                }
-                
-                # Add primary city name
-                self._city_mapping[city_name] = city_info
-                
-                # Add variations
-                if " " in city_name:
-                    # Add version without spaces: "New York" -> "newyork"
-                    no_space_version = city_name.replace(" ", "")
-                    self._city_mapping[no_space_version] = city_info
+                    if not city_name or not country:
+                        continue
+                        
+                    # Create mapping entry
+                    city_info = {
+                        "name": city_doc.get("name"),
+                        "country": country
+                    }
+                    
+                    # Add primary city name
+                    city_mapping[city_name] = city_info
                     
-                # Add common abbreviations for specific cities
-                if city_name == "new york city":
-                    self._city_mapping["nyc"] = city_info
-                    self._city_mapping["new york"] = city_info
-                elif city_name == "los angeles":
-                    self._city_mapping["la"] = city_info
-                elif city_name == "san francisco":
-                    self._city_mapping["sf"] = city_info
-                elif city_name == "ho chi minh city":
-                    self._city_mapping["saigon"] = city_info
-                    self._city_mapping["hcmc"] = city_info
+                    # Add variations
+                    if " " in city_name:
+                        # Add version without spaces: "New York" -> "newyork"
+                        no_space_version = city_name.replace(" ", "")
+                        city_mapping[no_space_version] = city_info
+                        
+                    # Add common abbreviations for specific cities
+                    if city_name == "new york city":
+                        city_mapping["nyc"] = city_info
+                        city_mapping["new york"] = city_info
+                    elif city_name == "los angeles":
+                        city_mapping["la"] = city_info
+                    elif city_name == "san francisco":
+                        city_mapping["sf"] = city_info
+                    elif city_name == "ho chi minh city":
+                        city_mapping["saigon"] = city_info
+                        city_mapping["hcmc"] = city_info
                 
-            self._mapping_loaded = True
-            print(f"DEBUG: Loaded {len(self._city_mapping)} city mapping entries from {len(cities)} cities")
-            
+                self._city_mapping = city_mapping
+                self._mapping_loaded = True
+                print(f"DEBUG: Loaded {len(city_mapping)} city mapping entries from {len(cities)} cities")
+                
+            except Exception as e:
+                print(f"DEBUG: Error loading city mapping: {e}")
+                # Continue with the previous (possibly empty) mapping - will fall back to hardcoded logic
+
+    async def _load_city_coordinates(self):
+        """Preload city center coordinates for every city that has them (one query instead of one per city)"""
+        try:
+            cities = await cities_collection.find(
+                {"coordinates": {"$exists": True}}, {"name": 1, "coordinates": 1}
+            ).to_list(length=None)
         except Exception as e:
-            print(f"DEBUG: Error loading city mapping: {e}")
-            # Continue with empty mapping - will fall back to hardcoded logic
+            print(f"DEBUG: Error loading city coordinates: {e}")
+            return
+        
+        city_coordinates: Dict[str, tuple] = {}
+        for city_doc in cities:
+            coords = city_doc.get("coordinates") or {}
+            lat, lng = coords.get("lat"), coords.get("lng")
+            if city_doc.get("name") and lat and lng:
+                city_coordinates[city_doc["name"].lower()] = (lat, lng)
+        self._city_coordinates = city_coordinates
+        print(f"DEBUG: Loaded center coordinates for {len(city_coordinates)} cities")
+
+    async def refresh_city_data(self):
+        """Reload the city mapping and city center cache from the database"""
+        await self._load_city_mapping(force=True)
+        await self._load_city_coordinates()
+
+    def start_background_refresh(self, interval_seconds: float = CITY_DATA_REFRESH_SECONDS):
+        """Periodically refresh city data on the running event loop (idempotent)"""
+        if self._refresh_task and not self._refresh_task.done():
+            return
+
+        async def refresh_loop():
+            while True:
+                await asyncio.sleep(interval_seconds)
+                try:
+                    await self.refresh_city_data()
+                except Exception as e:
+                    print(f"DEBUG: Background city data refresh failed: {e}")
+
+        self._refresh_task = asyncio.get_event_loop().create_task(refresh_loop())
+
+    async def stop_background_refresh(self):
+        if self._refresh_task:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
 
     async def get_place_from_db(self, city: str, name: str) -> Optional[Place]:
         db_place = await places_collection.find_one({"city": city, "name": name})
@@ -254,6 +336,61 @@ class PlaceScraper:
             )
         return None
 
+    async def _geocode_query(self, query: str) -> Optional[Dict]:
+        """Raw Nominatim lookup for one query string, cached per query (errors are raised, not cached)"""
+        key = query_cache_key(query)
+        cached = await geocode_cache.get(key)
+        if not is_cache_miss(cached):
+            return cached
+
+        await nominatim_rate_limiter.acquire()
+        loop = asyncio.get_event_loop()
+        location = await loop.run_in_executor(get_geocoding_executor(), lambda q=query: self.geolocator.geocode(q, timeout=10))
+        result = None
+        if location:
+            result = {
+                "address": location.address,
+                "latitude": location.latitude,
+                "longitude": location.longitude
+            }
+        await geocode_cache.set(key, result)
+        return result
+
+    async def _try_geocoding_query(self, city: str, name: str, query: str,
+                                   max_distance_km: float, min_confidence: int) -> Optional[Place]:
+        """Geocode a single query and return the result only if it passes validation"""
+        try:
+            print(f"DEBUG: Trying geocoding for '{name}' with query: '{query}'")
+            location = await self._geocode_query(query)
+        except Exception as e:
+            print(f"DEBUG: Geocoding failed for '{name}' with query '{query}': {str(e)}")
+            raise
+        
+        if not location:
+            print(f"DEBUG: Geocoding returned None for '{name}' with query '{query}'")
+            return None
+        if not (location["latitude"] and location["longitude"]):
+            print(f"DEBUG: Geocoding returned location but no coordinates for '{name}' with query '{query}'")
+            return None
+        
+        print(f"DEBUG: Geocoding successful for '{name}' using query: '{query}' -> ({location['latitude']}, {location['longitude']})")
+        potential_result = Place(
+            name=name,
+            address=location["address"],
+            latitude=location["latitude"],
+            longitude=location["longitude"],
+            place_id=None,
+            rating=None,
+            types=[],
+            opening_hours=None
+        )
+        
+        # Validate geocoding result with geographic and confidence checks
+        if await self._validate_geocoding_result(city, name, potential_result, max_distance_km, min_confidence):
+            return potential_result
+        print(f"DEBUG: Validation failed for '{name}' with query '{query}'")
+        return None
+
     async def get_place(self, city: str, name: str, max_distance_km: float = 50, min_confidence: int = 60) -> Optional[Place]:
         """Get place information by city and name using database lookup and geocoding with validation"""
         db_place = await self.get_place_from_db(city, name)
@@ -265,12 +402,22 @@ class PlaceScraper:
             print(f"DEBUG: Rejected obviously fake place name: '{name}'")
             return None
             
+        # Previously geocoded (or known-missing) places skip the network entirely
+        cache_key = place_cache_key(city, name, max_distance_km, min_confidence)
+        cached = await geocode_cache.get(cache_key)
+        if not is_cache_miss(cached):
+            if cached is None:
+                print(f"DEBUG: Geocode cache hit (no result) for '{name}' in '{city}'")
+                return None
+            print(f"DEBUG: Geocode cache hit for '{name}' in '{city}'")
+            return Place(**cached)
+            
         # Load city mapping if not already loaded
         await self._load_city_mapping()
         
         # Fallback to geocoding with Nominatim (run in thread pool)
         print(f"DEBUG: Starting geocoding process for '{name}' in city '{city}'")
-        loop = asyncio.get_event_loop()
+        geocoding_errors = 0
         try:
             # Clean and normalize the place name
             clean_name = name.strip()
@@ -341,41 +488,21 @@ class PlaceScraper:
                 ])
                 print(f"DEBUG: Using fallback queries for unknown city '{city}'")
             
+            # Drop duplicate queries (e.g. when the name needs no cleaning) but keep priority order
+            search_queries = list(dict.fromkeys(search_queries))
+            
+            # Try queries one at a time in priority order and stop at the first validated result.
+            # The rate limiter serialises Nominatim calls anyway, so issuing several at once would only
+            # spend requests on lower-priority queries (and let them win just by finishing first).
             for query in search_queries:
                 try:
-                    print(f"DEBUG: Trying geocoding for '{name}' with query: '{query}'")
-                    # Add more detailed error handling
-                    location = await loop.run_in_executor(None, lambda q=query: self.geolocator.geocode(q, timeout=10))
-                    if location:
-                        if location.latitude and location.longitude:
-                            print(f"DEBUG: Geocoding successful for '{name}' using query: '{query}' -> ({location.latitude}, {location.longitude})")
-                            
-                            # NEW: Create result and validate it
-                            potential_result = Place(
-                                name=name,
-                                address=location.address,
-                                latitude=location.latitude,
-                                longitude=location.longitude,
-                                place_id=None,
-                                rating=None,
-                                types=[],
-                                opening_hours=None
-                            )
-                            
-                            # NEW: Validate geocoding result with geographic and confidence checks
-                            if await self._validate_geocoding_result(city, name, potential_result, max_distance_km, min_confidence):
-                                return potential_result
-                            else:
-                                # Continue to next query if validation fails
-                                print(f"DEBUG: Validation failed for '{name}', trying next query...")
-                                continue
-                        else:
-                            print(f"DEBUG: Geocoding returned location but no coordinates for '{name}' with query '{query}'")
-                    else:
-                        print(f"DEBUG: Geocoding returned None for '{name}' with query '{query}'")
-                except Exception as e:
-                    print(f"DEBUG: Geocoding failed for '{name}' with query '{query}': {str(e)}")
+                    potential_result = await self._try_geocoding_query(city, name, query, max_distance_km, min_confidence)
+                except Exception:
+                    geocoding_errors += 1
                     continue
+                if potential_result:
+                    await geocode_cache.set(cache_key, asdict(potential_result))
+                    return potential_result
             
             print(f"DEBUG: All geocoding attempts failed for '{name}'")
             
@@ -398,12 +525,16 @@ class PlaceScraper:
                 
                 # NEW: Validate fallback result too
                 if await self._validate_geocoding_result(city, name, fallback_result, max_distance_km, min_confidence):
+                    await geocode_cache.set(cache_key, asdict(fallback_result))
                     return fallback_result
                 else:
                     print(f"DEBUG: Fallback coordinates for '{name}' failed validation")
             
             # FIXED: If no fallback coordinates and all validation failed, return None instead of Place with None coordinates
             print(f"DEBUG: No fallback coordinates available for '{name}', geocoding completely failed")
+            # Only remember a miss when Nominatim actually answered every query (not on network errors)
+            if geocoding_errors == 0:
+                await geocode_cache.set(cache_key, None)
             return None
             
         except Exception as e:
@@ -441,3 +572,31 @@ class PlaceScraper:
         return None  # Force use of dynamic system only
         
         # All hardcoded fallback logic removed - use dynamic database lookup only
+
+
+_place_scraper: Optional[PlaceScraper] = None
+
+
+def get_place_scraper() -> PlaceScraper:
+    """Process-wide PlaceScraper shared by all requests (one Nominatim client, one city cache)"""
+    global _place_scraper
+    if _place_scraper is None:
+        _place_scraper = PlaceScraper()
+    return _place_scraper
+
+
+async def start_place_scraper():
+    """Warm the shared scraper's city data and start its background refresh (app startup)"""
+    scraper = get_place_scraper()
+    await scraper.refresh_city_data()
+    scraper.start_background_refresh()
+
+
+async def stop_place_scraper():
+    """Stop the background refresh and release the geocoding pool (app shutdown)"""
+    if _place_scraper is not None:
+        await _place_scraper.stop_background_refresh()
+    global geocoding_executor
+    if geocoding_executor is not None:
+        geocoding_executor.shutdown(wait=False, cancel_futures=True)
+        geocoding_executor = None
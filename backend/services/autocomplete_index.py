@@ -0,0 +1,237 @@
+import asyncio
+import time
+from bisect import insort
+from collections import OrderedDict
+from typing import Dict, List, Optional, Set, Tuple
+
+from config.database import places_collection
+from services.place_normalization import normalize_text
+
+# Relevance tiers, best first
+EXACT, PREFIX, WORD_PREFIX, CONTAINS = 0, 1, 2, 3
+
+_NO_POPULARITY = 999999.0
+# Trie postings stop at this depth; longer terms are verified against the candidate names
+MAX_TRIE_DEPTH = 12
+
+
+def _trigrams(text: str) -> Set[str]:
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+class _TrieNode:
+    __slots__ = ("children", "ids")
+
+    def __init__(self):
+        self.children: Dict[str, "_TrieNode"] = {}
+        # Every entry whose key passes through this node, kept sorted by entry sort key
+        self.ids: List[Tuple] = []
+
+
+class _Trie:
+    def __init__(self, max_depth: int = MAX_TRIE_DEPTH):
+        self.root = _TrieNode()
+        self.max_depth = max_depth
+
+    def insert(self, key: str, item: Tuple, in_order: bool = False):
+        """in_order: items arrive already sorted (bulk build), so appending keeps postings sorted"""
+        node = self.root
+        for char in key[:self.max_depth]:
+            child = node.children.get(char)
+            if child is None:
+                child = node.children[char] = _TrieNode()
+            node = child
+            if in_order:
+                node.ids.append(item)
+            else:
+                insort(node.ids, item)
+
+    def prefixed(self, prefix: str) -> List[Tuple]:
+        """Entries whose key starts with prefix[:max_depth] (callers verify longer prefixes)"""
+        node = self.root
+        for char in prefix[:self.max_depth]:
+            node = node.children.get(char)
+            if node is None:
+                return []
+        return node.ids
+
+
+class CityAutocompleteIndex:
+    """Place-name autocomplete for one city: prefix tries over whole names and over each word,
+    plus a trigram index for substring matches.
+
+    Results are ranked exact > prefix > word-prefix > contains, then by popularity (lower is
+    better), then name. Entries can be added incrementally; postings stay sorted on insert.
+    """
+
+    def __init__(self, city: str, places: List[Dict]):
+        self.city = city
+        self.places: List[Dict] = []
+        self.names: List[str] = []
+        self._removed: Set[int] = set()
+        self._by_place_id: Dict[str, int] = {}
+        self._exact: Dict[str, List[Tuple]] = {}
+        self._names_trie = _Trie()
+        self._words_trie = _Trie()
+        self._trigrams: Dict[str, Set[int]] = {}
+
+        # Bulk build: register everything, then fill postings in sort order (no insort needed)
+        for place in places:
+            self._register(place)
+        for item in sorted(self._sort_key(i) for i in range(len(self.places))):
+            self._index(item, in_order=True)
+
+    def __len__(self) -> int:
+        return len(self.places) - len(self._removed)
+
+    def _sort_key(self, i: int) -> Tuple:
+        place = self.places[i]
+        popularity = place.get("popularity_num")
+        if popularity is None:
+            try:
+                popularity = float(place.get("popularity"))
+            except (TypeError, ValueError):
+                popularity = _NO_POPULARITY
+        return (popularity, self.names[i], i)
+
+    def _register(self, place: Dict) -> Optional[int]:
+        name = normalize_text(place.get("name"))
+        if not name:
+            return None
+        place_id = place.get("place_id")
+        if place_id and place_id in self._by_place_id:
+            self.remove(place_id)
+
+        i = len(self.places)
+        self.places.append(place)
+        self.names.append(name)
+        if place_id:
+            self._by_place_id[place_id] = i
+        return i
+
+    def _index(self, item: Tuple, in_order: bool = False):
+        i = item[-1]
+        name = self.names[i]
+        if in_order:
+            self._exact.setdefault(name, []).append(item)
+        else:
+            insort(self._exact.setdefault(name, []), item)
+        self._names_trie.insert(name, item, in_order)
+        words = name.split()
+        for position in range(1, len(words)):
+            # Suffix starting at each later word, so multi-word terms ("san marco") also match
+            self._words_trie.insert(" ".join(words[position:]), item, in_order)
+        for gram in _trigrams(name):
+            self._trigrams.setdefault(gram, set()).add(i)
+
+    def add(self, place: Dict):
+        """Index one more place document (replaces an existing entry with the same place_id)"""
+        i = self._register(place)
+        if i is not None:
+            self._index(self._sort_key(i))
+
+    def remove(self, place_id: str):
+        i = self._by_place_id.pop(place_id, None)
+        if i is not None:
+            self._removed.add(i)
+
+    def _contains(self, term: str) -> List[Tuple]:
+        if len(term) >= 3:
+            grams = sorted(_trigrams(term), key=lambda gram: len(self._trigrams.get(gram, ())))
+            candidates = set(self._trigrams.get(grams[0], ()))
+            for gram in grams[1:]:
+                if not candidates:
+                    break
+                candidates &= self._trigrams.get(gram, set())
+        else:
+            candidates = range(len(self.names))
+        return sorted(self._sort_key(i) for i in candidates if term in self.names[i])
+
+    def search(self, term: str, limit: int) -> List[Tuple[Dict, int]]:
+        """Up to `limit` (place, tier) pairs for a search term, best first"""
+        term = normalize_text(term)
+        if not term or limit <= 0:
+            return []
+
+        results: List[Tuple[Dict, int]] = []
+        seen: Set[int] = set()
+        word_term = " " + term
+        tiers = (
+            (EXACT, lambda: self._exact.get(term, []), None),
+            (PREFIX, lambda: self._names_trie.prefixed(term), lambda name: name.startswith(term)),
+            (WORD_PREFIX, lambda: self._words_trie.prefixed(term), lambda name: word_term in name),
+            (CONTAINS, lambda: self._contains(term), None),
+        )
+        needs_check = len(term) > MAX_TRIE_DEPTH
+        for tier, candidates, check in tiers:
+            for item in candidates():
+                i = item[-1]
+                if i in seen or i in self._removed:
+                    continue
+                if needs_check and check is not None and not check(self.names[i]):
+                    continue
+                seen.add(i)
+                results.append((self.places[i], tier))
+                if len(results) >= limit:
+                    return results
+        return results
+
+
+class AutocompleteIndexCache:
+    """Per-city autocomplete indexes, built on first use, rebuilt after ttl_seconds, LRU-bounded"""
+
+    def __init__(self, ttl_seconds: float = 900, max_cities: int = 50):
+        self.ttl_seconds = ttl_seconds
+        self.max_cities = max_cities
+        self._indexes: "OrderedDict[str, Tuple[float, CityAutocompleteIndex]]" = OrderedDict()
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    def _fresh(self, key: str) -> Optional[CityAutocompleteIndex]:
+        cached = self._indexes.get(key)
+        if cached and time.monotonic() - cached[0] < self.ttl_seconds:
+            self._indexes.move_to_end(key)
+            return cached[1]
+        return None
+
+    async def get(self, city: str) -> CityAutocompleteIndex:
+        key = normalize_text(city)
+        index = self._fresh(key)
+        if index is not None:
+            return index
+
+        async with self._locks.setdefault(key, asyncio.Lock()):
+            index = self._fresh(key)
+            if index is not None:
+                return index
+
+            started = time.perf_counter()
+            places = await places_collection.find({"city_norm": key}).to_list(length=None)
+            index = CityAutocompleteIndex(city, places)
+            self._indexes[key] = (time.monotonic(), index)
+            self._indexes.move_to_end(key)
+            while len(self._indexes) > self.max_cities:
+                evicted, _ = self._indexes.popitem(last=False)
+                self._locks.pop(evicted, None)
+            print(f"DEBUG: Built autocomplete index for {city} with {len(index)} places "
+                  f"in {(time.perf_counter() - started) * 1000:.1f}ms")
+            return index
+
+    def add_place(self, place: Dict):
+        """Call after inserting/updating a place so a loaded city index picks it up without a rebuild"""
+        cached = self._indexes.get(normalize_text(place.get("city")))
+        if cached:
+            cached[1].add(place)
+
+    def remove_place(self, city: str, place_id: str):
+        cached = self._indexes.get(normalize_text(city))
+        if cached:
+            cached[1].remove(place_id)
+
+    def invalidate(self, city: Optional[str] = None):
+        if city is None:
+            self._indexes.clear()
+        else:
+            self._indexes.pop(normalize_text(city), None)
+
+
+city_autocomplete_indexes = AutocompleteIndexCache()
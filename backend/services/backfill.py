@@ -0,0 +1,53 @@
+"""Shared plumbing for the one-off document backfills (place_normalization, route_summaries).
+
+Each backfill module supplies the query, projection and per-document $set; this module runs the
+batched bulk writes, reads the *_ON_STARTUP switch and builds the `python -m` command line.
+"""
+import argparse
+import asyncio
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from pymongo import UpdateOne
+
+BACKFILL_BATCH_SIZE = 500
+
+
+def startup_flag(name: str, default: bool = True) -> bool:
+    """Whether the app should run a backfill on startup, e.g. PLACE_BACKFILL_ON_STARTUP=false to skip it"""
+    return os.getenv(name, "true" if default else "false").lower() == "true"
+
+
+async def backfill(collection, query: Dict[str, Any], projection: Optional[Dict[str, Any]],
+                   fields_for: Callable[[Dict[str, Any]], Dict[str, Any]], label: str,
+                   batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """$set fields_for(document) on every document matching query; returns the number updated"""
+    started = time.perf_counter()
+    updated = 0
+    batch = []
+    async for document in collection.find(query, projection):
+        batch.append(UpdateOne({"_id": document["_id"]}, {"$set": fields_for(document)}))
+        if len(batch) >= batch_size:
+            await collection.bulk_write(batch, ordered=False)
+            updated += len(batch)
+            batch = []
+    if batch:
+        await collection.bulk_write(batch, ordered=False)
+        updated += len(batch)
+
+    print(f"DEBUG: Backfilled {label} on {updated} documents in {time.perf_counter() - started:.1f}s")
+    return updated
+
+
+def build_parser(description: str, all_help: str):
+    parser = argparse.ArgumentParser(description=description)
+    parser.add_argument("--all", action="store_true", help=all_help)
+    parser.add_argument("--batch-size", type=int, default=BACKFILL_BATCH_SIZE)
+    return parser
+
+
+def run_cli(parser: argparse.ArgumentParser, job: Callable[..., Awaitable[int]]):
+    """Entry point for `python -m <backfill module>`"""
+    args = parser.parse_args()
+    asyncio.run(job(only_missing=not args.all, batch_size=args.batch_size))
@@ -0,0 +1,110 @@
+import numpy as np
+from typing import Dict, List, Optional, Sequence, Tuple
+
+EARTH_RADIUS_KM = 6371
+
+
+def get_place_coordinates(place) -> Optional[Tuple[float, float]]:
+    """Return (lat, lng) for a must-visit model or a place document, or None if unknown"""
+    coords = None
+    if isinstance(place, dict):
+        coords = place.get("coordinates")
+    elif hasattr(place, "coordinates"):
+        coords = place.coordinates
+
+    if not coords:
+        return None
+
+    if isinstance(coords, dict):
+        lat, lng = coords.get("lat"), coords.get("lng")
+    else:
+        lat, lng = getattr(coords, "lat", None), getattr(coords, "lng", None)
+
+    if lat is None or lng is None:
+        return None
+    try:
+        return float(lat), float(lng)
+    except (TypeError, ValueError):
+        return None
+
+
+def haversine_matrix(lats: Sequence[float], lngs: Sequence[float]) -> np.ndarray:
+    """Build the full pairwise great-circle distance matrix (km) in one vectorized pass.
+
+    NaN coordinates produce rows/columns of +inf, matching calculate_distance for missing coordinates.
+    """
+    lat = np.radians(np.asarray(lats, dtype=np.float64))
+    lng = np.radians(np.asarray(lngs, dtype=np.float64))
+
+    dlat = lat[:, None] - lat[None, :]
+    dlng = lng[:, None] - lng[None, :]
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat)[:, None] * np.cos(lat)[None, :] * np.sin(dlng / 2) ** 2
+    distances = 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+    return np.where(np.isnan(distances), np.inf, distances)
+
+
+def haversine_to_point(lat: float, lng: float, lats: np.ndarray, lngs: np.ndarray) -> np.ndarray:
+    """Distances (km) from a single point to an array of points"""
+    lat1, lng1 = np.radians(lat), np.radians(lng)
+    lat2, lng2 = np.radians(lats), np.radians(lngs)
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lng2 - lng1) / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.clip(a, 0.0, 1.0)))
+
+
+class DistanceMatrix:
+    """Pairwise distance matrix for the candidate places of a single route.
+
+    Places are keyed by object identity, so the same place repeated in a list (as happens when
+    places are cycled to fill long trips) shares one row.
+    """
+
+    def __init__(self, places: Sequence):
+        self._index: Dict[int, int] = {}
+        self.places: List = []
+        lats: List[float] = []
+        lngs: List[float] = []
+
+        for place in places:
+            key = id(place)
+            if key in self._index:
+                continue
+            self._index[key] = len(self.places)
+            self.places.append(place)
+            coords = get_place_coordinates(place)
+            lats.append(coords[0] if coords else np.nan)
+            lngs.append(coords[1] if coords else np.nan)
+
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lngs = np.asarray(lngs, dtype=np.float64)
+        self.matrix = haversine_matrix(self.lats, self.lngs) if self.places else np.zeros((0, 0))
+
+    def __len__(self) -> int:
+        return len(self.places)
+
+    def __contains__(self, place) -> bool:
+        return id(place) in self._index
+
+    def index_of(self, place) -> Optional[int]:
+        return self._index.get(id(place))
+
+    def has_coordinates(self, place) -> bool:
+        i = self.index_of(place)
+        return i is not None and not np.isnan(self.lats[i])
+
+    def distance(self, place1, place2) -> float:
+        """Distance in km between two places, +inf if either is unknown or lacks coordinates"""
+        i, j = self.index_of(place1), self.index_of(place2)
+        if i is None or j is None:
+            return float("inf")
+        return float(self.matrix[i, j])
+
+    def min_distance_to(self, place, others: Sequence) -> float:
+        """Smallest distance from place to any place in others (+inf if none are comparable)"""
+        i = self.index_of(place)
+        if i is None or not others:
+            return float("inf")
+        cols = [j for j in (self.index_of(other) for other in others) if j is not None]
+        if not cols:
+            return float("inf")
+        return float(self.matrix[i, cols].min())
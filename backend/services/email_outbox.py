@@ -0,0 +1,259 @@
+"""Background email delivery.
+
+Endpoints call `email_outbox.enqueue(...)` and return immediately. The message is stored in the
+email_outbox collection first (so a crash never loses it), then a worker sends queued messages in
+batches over one kept-open SMTP connection, retrying failures with exponential backoff.
+
+Point it at a local SMTP stand-in to test delivery, e.g.
+
+    python -m aiosmtpd -n -l localhost:8025
+    EmailOutbox(SmtpSettings(hostname="localhost", port=8025, start_tls=False))
+"""
+import asyncio
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from email.message import EmailMessage
+from typing import Dict, List, Optional
+
+import aiosmtplib
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+import config.database as database_config
+
+EMAIL_BATCH_SIZE = int(os.getenv("EMAIL_BATCH_SIZE", "20"))
+EMAIL_MAX_ATTEMPTS = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+EMAIL_RETRY_BASE_SECONDS = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "5"))
+EMAIL_RETRY_MAX_SECONDS = float(os.getenv("EMAIL_RETRY_MAX_SECONDS", "600"))
+# How often due retries and messages left over by another process/crash are picked up from MongoDB
+EMAIL_OUTBOX_POLL_SECONDS = float(os.getenv("EMAIL_OUTBOX_POLL_SECONDS", "10"))
+# Close the SMTP connection after this long without sending
+EMAIL_SMTP_IDLE_SECONDS = float(os.getenv("EMAIL_SMTP_IDLE_SECONDS", "60"))
+# A message claimed by a worker that has not finished by then is considered abandoned
+EMAIL_SEND_LEASE_SECONDS = 300
+
+PENDING, SENDING, SENT, FAILED = "pending", "sending", "sent", "failed"
+
+
+@dataclass
+class SmtpSettings:
+    hostname: str
+    port: int
+    sender: str = "noreply@wayfareproject.com"
+    username: Optional[str] = None
+    password: Optional[str] = None
+    use_tls: bool = False
+    start_tls: bool = True
+    validate_certs: bool = True
+    timeout: float = 60
+    suppress_send: bool = False
+
+    @classmethod
+    def from_mail_config(cls, config) -> "SmtpSettings":
+        """Settings from a fastapi_mail ConnectionConfig (config/email.py)"""
+        sender = config.MAIL_FROM
+        if config.MAIL_FROM_NAME:
+            sender = f"{config.MAIL_FROM_NAME} <{config.MAIL_FROM}>"
+        return cls(
+            hostname=config.MAIL_SERVER,
+            port=config.MAIL_PORT,
+            sender=sender,
+            username=config.MAIL_USERNAME if config.USE_CREDENTIALS else None,
+            password=config.MAIL_PASSWORD.get_secret_value() if config.USE_CREDENTIALS else None,
+            use_tls=config.MAIL_SSL_TLS,
+            start_tls=config.MAIL_STARTTLS,
+            validate_certs=config.VALIDATE_CERTS,
+            timeout=config.TIMEOUT,
+            suppress_send=bool(config.SUPPRESS_SEND),
+        )
+
+
+def retry_delay(attempts: int) -> float:
+    return min(EMAIL_RETRY_BASE_SECONDS * 2 ** (attempts - 1), EMAIL_RETRY_MAX_SECONDS)
+
+
+class EmailOutbox:
+    def __init__(self, settings: Optional[SmtpSettings] = None, batch_size: int = EMAIL_BATCH_SIZE,
+                 max_attempts: int = EMAIL_MAX_ATTEMPTS, poll_seconds: float = EMAIL_OUTBOX_POLL_SECONDS,
+                 idle_seconds: float = EMAIL_SMTP_IDLE_SECONDS):
+        self._settings = settings
+        self.batch_size = batch_size
+        self.max_attempts = max_attempts
+        self.poll_seconds = poll_seconds
+        self.idle_seconds = idle_seconds
+        self._queue: "asyncio.Queue[ObjectId]" = asyncio.Queue()
+        self._smtp: Optional[aiosmtplib.SMTP] = None
+        self._last_sent = 0.0
+        self._worker_task: Optional[asyncio.Task] = None
+        self._poll_task: Optional[asyncio.Task] = None
+
+    @property
+    def settings(self) -> SmtpSettings:
+        if self._settings is None:
+            # Imported lazily so an outbox with explicit settings (tests, scripts) never loads the app mail config
+            from config.email import mail_config
+            self._settings = SmtpSettings.from_mail_config(mail_config)
+        return self._settings
+
+    async def enqueue(self, recipients: List[str], subject: str, html: str) -> ObjectId:
+        """Persist a message and hand it to the worker; does not wait for SMTP"""
+        now = datetime.utcnow()
+        result = await database_config.email_outbox_collection.insert_one({
+            "to": recipients,
+            "subject": subject,
+            "html": html,
+            "status": PENDING,
+            "attempts": 0,
+            "next_attempt_at": now,
+            "created_at": now,
+        })
+        self._queue.put_nowait(result.inserted_id)
+        return result.inserted_id
+
+    async def _claim(self, message_id: ObjectId) -> Optional[Dict]:
+        """Atomically take a due message so two workers (or processes) never send it twice"""
+        now = datetime.utcnow()
+        return await database_config.email_outbox_collection.find_one_and_update(
+            {"_id": message_id, "$or": [
+                {"status": PENDING, "next_attempt_at": {"$lte": now}},
+                {"status": SENDING, "lease_until": {"$lt": now}},
+            ]},
+            {"$set": {"status": SENDING, "lease_until": now + timedelta(seconds=EMAIL_SEND_LEASE_SECONDS)}},
+            return_document=ReturnDocument.AFTER
+        )
+
+    async def _connection(self) -> aiosmtplib.SMTP:
+        if self._smtp is None or not self._smtp.is_connected:
+            settings = self.settings
+            self._smtp = aiosmtplib.SMTP(
+                hostname=settings.hostname,
+                port=settings.port,
+                use_tls=settings.use_tls,
+                start_tls=settings.start_tls,
+                validate_certs=settings.validate_certs,
+                timeout=settings.timeout,
+            )
+            await self._smtp.connect()
+            if settings.username:
+                await self._smtp.login(settings.username, settings.password)
+        return self._smtp
+
+    async def _close_connection(self):
+        if self._smtp is not None:
+            try:
+                if self._smtp.is_connected:
+                    await self._smtp.quit()
+            except Exception:
+                self._smtp.close()
+            self._smtp = None
+
+    def _build(self, message: Dict) -> EmailMessage:
+        email = EmailMessage()
+        email["From"] = self.settings.sender
+        email["To"] = ", ".join(message["to"])
+        email["Subject"] = message["subject"]
+        email.set_content(message["html"], subtype="html")
+        return email
+
+    async def _send_batch(self, messages: List[Dict]):
+        collection = database_config.email_outbox_collection
+        for message in messages:
+            try:
+                if self.settings.suppress_send:
+                    print(f"DEBUG: Email to {message['to']} suppressed (SUPPRESS_SEND)")
+                else:
+                    smtp = await self._connection()
+                    await smtp.send_message(self._build(message))
+                    self._last_sent = time.monotonic()
+                # The body is only needed to send; finished messages keep just the metadata until their TTL
+                await collection.update_one(
+                    {"_id": message["_id"]},
+                    {"$set": {"status": SENT, "sent_at": datetime.utcnow()}, "$unset": {"lease_until": "", "html": ""}}
+                )
+            except Exception as e:
+                # Drop the connection; the next message reconnects
+                await self._close_connection()
+                attempts = message.get("attempts", 0) + 1
+                now = datetime.utcnow()
+                update = {
+                    "$set": {"status": PENDING, "attempts": attempts, "last_error": str(e),
+                             "next_attempt_at": now + timedelta(seconds=retry_delay(attempts))},
+                    "$unset": {"lease_until": ""},
+                }
+                if attempts >= self.max_attempts:
+                    update["$set"].update({"status": FAILED, "failed_at": now})
+                    update["$unset"]["html"] = ""
+                await collection.update_one({"_id": message["_id"]}, update)
+                print(f"DEBUG: Email to {message['to']} failed (attempt {attempts}/{self.max_attempts}): {e}")
+
+    async def process_once(self, timeout: Optional[float] = None) -> int:
+        """Wait for queued messages, then send up to batch_size of them; returns the number claimed"""
+        try:
+            first = await asyncio.wait_for(self._queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return 0
+        message_ids = [first]
+        while len(message_ids) < self.batch_size and not self._queue.empty():
+            message_ids.append(self._queue.get_nowait())
+
+        messages = [message for message in [await self._claim(message_id) for message_id in message_ids] if message]
+        if messages:
+            await self._send_batch(messages)
+        return len(messages)
+
+    async def enqueue_due(self) -> int:
+        """Queue retries that are due and messages abandoned by a crashed worker"""
+        now = datetime.utcnow()
+        due = await database_config.email_outbox_collection.find(
+            {"$or": [
+                {"status": PENDING, "next_attempt_at": {"$lte": now}},
+                {"status": SENDING, "lease_until": {"$lt": now}},
+            ]},
+            {"_id": 1}
+        ).sort("next_attempt_at", 1).limit(self.batch_size * 10).to_list(length=None)
+        for message in due:
+            self._queue.put_nowait(message["_id"])
+        return len(due)
+
+    async def _worker_loop(self):
+        while True:
+            try:
+                await self.process_once(timeout=self.idle_seconds)
+                if self._queue.empty() and time.monotonic() - self._last_sent >= self.idle_seconds:
+                    await self._close_connection()
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"DEBUG: Email outbox worker error: {e}")
+                await asyncio.sleep(1)
+
+    async def _poll_loop(self):
+        while True:
+            try:
+                await self.enqueue_due()
+            except Exception as e:
+                print(f"DEBUG: Email outbox poll failed: {e}")
+            await asyncio.sleep(self.poll_seconds)
+
+    async def start(self):
+        if self._worker_task is None or self._worker_task.done():
+            self._worker_task = asyncio.create_task(self._worker_loop())
+        if self._poll_task is None or self._poll_task.done():
+            self._poll_task = asyncio.create_task(self._poll_loop())
+
+    async def stop(self):
+        """Stop the worker; unsent messages stay in MongoDB and are picked up on the next start"""
+        for task in (self._poll_task, self._worker_task):
+            if task is not None:
+                task.cancel()
+                try:
+                    await task
+                except asyncio.CancelledError:
+                    pass
+        self._poll_task = self._worker_task = None
+        await self._close_connection()
+
+
+email_outbox = EmailOutbox()
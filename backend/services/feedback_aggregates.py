@@ -0,0 +1,254 @@
+"""Per-place and per-route feedback aggregates: count, rating sum and a 1-5 histogram.
+
+The feedback endpoints keep them current with atomic $inc updates, so stats reads are a single
+point lookup. Rebuild them from the raw feedback collections (after a crash between the
+feedback write and the $inc, or on first deploy):
+
+    cd backend
+    python -m services.feedback_aggregates                 # places and routes
+    python -m services.feedback_aggregates --kind route
+"""
+import argparse
+import asyncio
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, Optional
+
+from bson import ObjectId
+from pymongo import ReplaceOne
+from pymongo.errors import BulkWriteError, DuplicateKeyError
+
+import config.database as database_config
+
+PLACE = "place"
+ROUTE = "route"
+RATINGS = (1, 2, 3, 4, 5)
+
+# Lock document in feedback_aggregates (it has no kind, so aggregate queries never see it) held while a
+# rebuild runs, so workers starting together and a manual rebuild never rebuild at the same time.
+# A lock older than the lease is treated as abandoned by a crashed process.
+REBUILD_LOCK_ID = "lock:rebuild"
+REBUILD_LOCK_SECONDS = 3600
+# How often the rebuild recounts one aggregate that keeps being $inc'ed before leaving it as is
+REBUILD_TARGET_ATTEMPTS = 5
+
+# kind -> (feedback collection attribute in config.database, field holding the target id)
+FEEDBACK_SOURCES = {
+    PLACE: ("place_feedback_collection", "place_id"),
+    ROUTE: ("route_feedback_collection", "route_id"),
+}
+
+
+def aggregate_id(kind: str, target_id: str) -> str:
+    return f"{kind}:{target_id}"
+
+
+async def apply_rating_change(kind: str, target_id: str, old_rating: Optional[int], new_rating: Optional[int]):
+    """Record a feedback insert (old None), rating change, or delete (new None)"""
+    if old_rating == new_rating:
+        return
+    increments: Dict[str, int] = {"count": (new_rating is not None) - (old_rating is not None),
+                                  "sum": (new_rating or 0) - (old_rating or 0)}
+    if old_rating is not None:
+        increments[f"histogram.{old_rating}"] = -1
+    if new_rating is not None:
+        increments[f"histogram.{new_rating}"] = 1
+    await database_config.feedback_aggregates_collection.update_one(
+        {"_id": aggregate_id(kind, target_id)},
+        {"$inc": {**increments, "version": 1},
+         "$set": {"updated_at": datetime.utcnow()},
+         "$setOnInsert": {"kind": kind, "target_id": target_id}},
+        upsert=True
+    )
+
+
+def stats_from_aggregate(aggregate: Optional[Dict[str, Any]]) -> Dict[str, Any]:
+    """FeedbackStatsResponse.data for an aggregate document (None means no feedback yet)"""
+    histogram = (aggregate or {}).get("histogram", {})
+    count = (aggregate or {}).get("count", 0)
+    return {
+        "total_feedback": count,
+        "average_rating": round(aggregate["sum"] / count, 2) if count > 0 else 0,
+        "rating_distribution": {rating: histogram.get(str(rating), 0) for rating in RATINGS},
+    }
+
+
+async def get_feedback_stats(kind: str, target_id: str) -> Dict[str, Any]:
+    aggregate = await database_config.feedback_aggregates_collection.find_one({"_id": aggregate_id(kind, target_id)})
+    return stats_from_aggregate(aggregate)
+
+
+def _empty_aggregate(kind: str, target_id: str, rebuilt_at: datetime) -> Dict[str, Any]:
+    return {
+        "_id": aggregate_id(kind, target_id), "kind": kind, "target_id": target_id,
+        "count": 0, "sum": 0, "histogram": {str(r): 0 for r in RATINGS},
+        "updated_at": rebuilt_at, "rebuilt_at": rebuilt_at,
+    }
+
+
+async def _recount(kind: str, match: Dict[str, Any], rebuilt_at: datetime) -> Dict[str, Dict[str, Any]]:
+    """Aggregate documents, by target id, recomputed from the raw feedback matching match"""
+    collection_name, target_field = FEEDBACK_SOURCES[kind]
+    feedback_collection = getattr(database_config, collection_name)
+    pipeline = [{"$match": match},
+                {"$group": {"_id": {"target": f"${target_field}", "rating": "$rating"}, "n": {"$sum": 1}}}]
+    by_target: Dict[str, Dict[str, Any]] = {}
+    async for group in feedback_collection.aggregate(pipeline):
+        target_id, rating, n = group["_id"].get("target"), group["_id"].get("rating"), group["n"]
+        if target_id is None or rating not in RATINGS:
+            continue
+        aggregate = by_target.setdefault(target_id, _empty_aggregate(kind, target_id, rebuilt_at))
+        aggregate["count"] += n
+        aggregate["sum"] += rating * n
+        aggregate["histogram"][str(rating)] += n
+    return by_target
+
+
+async def _rebuild_target(kind: str, target_id: str, rebuilt_at: datetime) -> bool:
+    """Recompute one aggregate, retrying while $inc updates race with it; False if it never settled.
+
+    The replace only applies if the aggregate's version is still the one read before recounting, so
+    an $inc landing between the recount and the write forces another recount instead of being lost
+    or counted twice.
+    """
+    aggregates_collection = database_config.feedback_aggregates_collection
+    _id = aggregate_id(kind, target_id)
+    for _ in range(REBUILD_TARGET_ATTEMPTS):
+        current = await aggregates_collection.find_one({"_id": _id}, {"version": 1})
+        version = (current or {}).get("version")
+        recounted = await _recount(kind, {FEEDBACK_SOURCES[kind][1]: target_id}, rebuilt_at)
+        doc = recounted.get(target_id)
+        if current is None:
+            if doc is None:
+                return True
+            try:
+                await aggregates_collection.insert_one(doc)
+                return True
+            except DuplicateKeyError:
+                continue
+        if doc is None:
+            result = await aggregates_collection.delete_one({"_id": _id, "version": version})
+            if result.deleted_count:
+                return True
+        else:
+            doc["version"] = version
+            result = await aggregates_collection.replace_one({"_id": _id, "version": version}, doc)
+            if result.matched_count:
+                return True
+    print(f"DEBUG: Feedback aggregate {_id} kept changing during the rebuild, left as is")
+    return False
+
+
+async def rebuild_feedback_aggregates(kind: str) -> int:
+    """Recompute every aggregate of one kind from the raw feedback; returns the number of targets.
+
+    Aggregates whose target no longer has feedback are deleted. Aggregates the feedback endpoints
+    $inc while the bulk pass runs are skipped by it and recomputed one by one afterwards.
+    """
+    aggregates_collection = database_config.feedback_aggregates_collection
+
+    started = time.perf_counter()
+    rebuilt_at = datetime.utcnow()
+    by_target = await _recount(kind, {}, rebuilt_at)
+
+    # Only replace aggregates nobody has $inc'ed since the rebuild started; for the others the
+    # upsert collides on _id and the duplicate-key error is ignored
+    untouched_since_start = {"$or": [{"updated_at": {"$lt": rebuilt_at}}, {"updated_at": {"$exists": False}}]}
+    if by_target:
+        try:
+            await aggregates_collection.bulk_write(
+                [ReplaceOne({"_id": doc["_id"], **untouched_since_start}, doc, upsert=True)
+                 for doc in by_target.values()],
+                ordered=False
+            )
+        except BulkWriteError as e:
+            if any(error.get("code") != 11000 for error in e.details.get("writeErrors", [])):
+                raise
+    # Anything of this kind neither rewritten above (updated_at == rebuilt_at) nor written to since
+    # has no feedback left
+    await aggregates_collection.delete_many({"kind": kind, **untouched_since_start})
+
+    # The skipped aggregates hold the pre-rebuild value (or, if created by an $inc during the rebuild,
+    # only that one rating) plus the deltas; recount them against the feedback as it is now
+    touched = aggregates_collection.find(
+        {"kind": kind, "updated_at": {"$gte": rebuilt_at}, "rebuilt_at": {"$ne": rebuilt_at}}, {"target_id": 1}
+    )
+    repaired = 0
+    async for aggregate in touched:
+        await _rebuild_target(kind, aggregate["target_id"], rebuilt_at)
+        repaired += 1
+    print(f"DEBUG: Rebuilt {len(by_target)} {kind} feedback aggregates ({repaired} recounted after concurrent "
+          f"updates) in {time.perf_counter() - started:.1f}s")
+    return len(by_target)
+
+
+async def _acquire_rebuild_lock() -> Optional[ObjectId]:
+    """Take the rebuild lock; returns the token to release it with, or None if another process holds it"""
+    now = datetime.utcnow()
+    token = ObjectId()
+    try:
+        # Matches only a missing or expired lock; a live one makes the upsert collide on _id
+        await database_config.feedback_aggregates_collection.update_one(
+            {"_id": REBUILD_LOCK_ID, "expires_at": {"$lt": now}},
+            {"$set": {"expires_at": now + timedelta(seconds=REBUILD_LOCK_SECONDS), "locked_at": now,
+                      "token": token}},
+            upsert=True
+        )
+        return token
+    except DuplicateKeyError:
+        return None
+
+
+async def _release_rebuild_lock(token: ObjectId):
+    # A process whose lease expired mid-rebuild must not delete the lock a newer holder has taken
+    await database_config.feedback_aggregates_collection.delete_one({"_id": REBUILD_LOCK_ID, "token": token})
+
+
+async def _has_aggregates() -> bool:
+    return await database_config.feedback_aggregates_collection.find_one(
+        {"kind": {"$in": list(FEEDBACK_SOURCES)}}, {"_id": 1}
+    ) is not None
+
+
+async def rebuild_with_lock(kinds: Iterable[str], only_if_empty: bool = False) -> bool:
+    """Rebuild the given kinds while holding the rebuild lock; False if another process holds it.
+
+    With only_if_empty, nothing is rebuilt once any aggregate exists (checked again under the lock,
+    in case another worker finished a rebuild in the meantime).
+    """
+    token = await _acquire_rebuild_lock()
+    if token is None:
+        print("DEBUG: Feedback aggregates are being rebuilt by another process, skipping")
+        return False
+    try:
+        if only_if_empty and await _has_aggregates():
+            return True
+        for kind in kinds:
+            await rebuild_feedback_aggregates(kind)
+        return True
+    finally:
+        await _release_rebuild_lock(token)
+
+
+async def ensure_feedback_aggregates():
+    """Build the aggregates on first deploy; later drift is fixed by running the rebuild by hand.
+
+    Only one worker builds them; the others see the lock (or the finished aggregates) and skip.
+    """
+    if not await _has_aggregates():
+        await rebuild_with_lock(FEEDBACK_SOURCES, only_if_empty=True)
+
+
+def build_parser():
+    parser = argparse.ArgumentParser(description="Rebuild feedback aggregates from the raw feedback collections")
+    parser.add_argument("--kind", choices=sorted(FEEDBACK_SOURCES), help="only rebuild place or route aggregates")
+    return parser
+
+
+async def main(args):
+    if not await rebuild_with_lock([args.kind] if args.kind else FEEDBACK_SOURCES):
+        raise SystemExit("Another rebuild is running; try again when it finishes")
+
+
+if __name__ == "__main__":
+    asyncio.run(main(build_parser().parse_args()))
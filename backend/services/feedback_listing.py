@@ -0,0 +1,53 @@
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from bson import ObjectId
+from pymongo import ASCENDING, DESCENDING
+
+import config.database as database_config
+from services.pagination import fetch_page
+
+# Every order ends in _id so cursors are stable. Served by the *_created_at_id and
+# *_rating_created_at_id indexes in config/indexes.py ("lowest" walks the rating index
+# backwards, so equal ratings are listed oldest first)
+FEEDBACK_SORTS = {
+    "newest": [("created_at", DESCENDING), ("_id", DESCENDING)],
+    "highest": [("rating", DESCENDING), ("created_at", DESCENDING), ("_id", DESCENDING)],
+    "lowest": [("rating", ASCENDING), ("created_at", ASCENDING), ("_id", ASCENDING)],
+}
+DEFAULT_FEEDBACK_SORT = "newest"
+MAX_FEEDBACK_PAGE = 100
+
+
+class InvalidFeedbackSort(ValueError):
+    pass
+
+
+FEEDBACK_PROJECTION = {
+    field: 1 for field in ("user_id", "place_id", "route_id", "rating", "comment", "visited_on", "created_at", "updated_at")
+}
+
+
+async def usernames_by_id(user_ids: Iterable[str]) -> Dict[str, str]:
+    """One $in query for all reviewers on a page"""
+    object_ids = {ObjectId(user_id) for user_id in user_ids if ObjectId.is_valid(user_id)}
+    if not object_ids:
+        return {}
+    users = await database_config.user_collection.find(
+        {"_id": {"$in": list(object_ids)}}, {"username": 1}
+    ).to_list(length=None)
+    return {str(user["_id"]): user.get("username", "Unknown") for user in users}
+
+
+async def fetch_feedback_page(collection, target_field: str, target_id: str, sort_by: Optional[str] = None,
+                              limit: int = 20, cursor: Optional[str] = None
+                              ) -> Tuple[List[Dict[str, Any]], Dict[str, str], Optional[str]]:
+    """(feedback documents, user_id -> username, next cursor) for one page of a place's or route's feedback"""
+    sort_by = sort_by or DEFAULT_FEEDBACK_SORT
+    if sort_by not in FEEDBACK_SORTS:
+        raise InvalidFeedbackSort(f"Invalid sort_by '{sort_by}'; expected one of: {', '.join(FEEDBACK_SORTS)}")
+    feedback, next_cursor = await fetch_page(
+        collection, {target_field: target_id}, FEEDBACK_SORTS[sort_by], max(1, min(limit, MAX_FEEDBACK_PAGE)), cursor,
+        projection=FEEDBACK_PROJECTION, sort_name=sort_by
+    )
+    usernames = await usernames_by_id(item["user_id"] for item in feedback)
+    return feedback, usernames, next_cursor
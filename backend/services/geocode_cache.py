@@ -0,0 +1,116 @@
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional, Tuple
+
+from config.database import geocode_cache_collection
+
+# Validated places change rarely; misses are retried sooner in case Nominatim data improves
+POSITIVE_TTL_SECONDS = 30 * 24 * 3600
+NEGATIVE_TTL_SECONDS = 24 * 3600
+
+_MISSING = object()
+
+
+def normalize_key_part(value: str) -> str:
+    """Case- and whitespace-insensitive form used for cache keys"""
+    return " ".join(str(value).strip().lower().split())
+
+
+def place_cache_key(city: str, name: str, max_distance_km: float, min_confidence: int) -> str:
+    """Key for a validated get_place result (validation limits are part of the key)"""
+    return f"place:{normalize_key_part(city)}|{normalize_key_part(name)}|{max_distance_km:g}|{min_confidence}"
+
+
+def query_cache_key(query: str) -> str:
+    """Key for a raw Nominatim answer to a single query string"""
+    return f"query:{normalize_key_part(query)}"
+
+
+class GeocodeCache:
+    """Two-level geocoding cache: a bounded in-process LRU in front of the geocode_cache collection.
+
+    Values are plain dicts (or None for a cached miss). Mongo documents carry an expires_at
+    field backed by a TTL index; expiry is also checked on read because the TTL monitor is lazy.
+    """
+
+    def __init__(self, max_memory_entries: int = 5000,
+                 positive_ttl_seconds: float = POSITIVE_TTL_SECONDS,
+                 negative_ttl_seconds: float = NEGATIVE_TTL_SECONDS):
+        self.max_memory_entries = max_memory_entries
+        self.positive_ttl_seconds = positive_ttl_seconds
+        self.negative_ttl_seconds = negative_ttl_seconds
+        self._memory: "OrderedDict[str, Tuple[float, Optional[Dict[str, Any]]]]" = OrderedDict()
+        self._ttl_index_ready = False
+
+    def _remember(self, key: str, value: Optional[Dict[str, Any]], ttl_seconds: float):
+        self._memory[key] = (time.monotonic() + ttl_seconds, value)
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_memory_entries:
+            self._memory.popitem(last=False)
+
+    async def _ensure_ttl_index(self):
+        if self._ttl_index_ready:
+            return
+        try:
+            await geocode_cache_collection.create_index("expires_at", expireAfterSeconds=0)
+            self._ttl_index_ready = True
+        except Exception as e:
+            print(f"DEBUG: Could not create geocode cache TTL index: {e}")
+
+    async def get(self, key: str):
+        """Cached value (None for a cached miss), or _MISSING when the key is unknown or expired"""
+        entry = self._memory.get(key)
+        if entry is not None:
+            expires, value = entry
+            if expires > time.monotonic():
+                self._memory.move_to_end(key)
+                return value
+            del self._memory[key]
+
+        try:
+            doc = await geocode_cache_collection.find_one({"_id": key})
+        except Exception as e:
+            print(f"DEBUG: Geocode cache read failed for '{key}': {e}")
+            return _MISSING
+
+        if not doc:
+            return _MISSING
+        remaining = (doc["expires_at"] - datetime.utcnow()).total_seconds()
+        if remaining <= 0:
+            return _MISSING
+
+        value = doc.get("result") if doc.get("found") else None
+        self._remember(key, value, remaining)
+        return value
+
+    async def set(self, key: str, value: Optional[Dict[str, Any]]):
+        """Store a result; None records a miss with the shorter negative TTL"""
+        ttl_seconds = self.positive_ttl_seconds if value is not None else self.negative_ttl_seconds
+        self._remember(key, value, ttl_seconds)
+
+        await self._ensure_ttl_index()
+        now = datetime.utcnow()
+        try:
+            await geocode_cache_collection.replace_one(
+                {"_id": key},
+                {
+                    "found": value is not None,
+                    "result": value,
+                    "created_at": now,
+                    "expires_at": now + timedelta(seconds=ttl_seconds)
+                },
+                upsert=True
+            )
+        except Exception as e:
+            print(f"DEBUG: Geocode cache write failed for '{key}': {e}")
+
+    def clear_memory(self):
+        self._memory.clear()
+
+
+def is_cache_miss(value) -> bool:
+    return value is _MISSING
+
+
+geocode_cache = GeocodeCache()
@@ -0,0 +1,180 @@
+import asyncio
+import os
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+import config.database as database_config
+from models.model import PlaceCoordinates, TopRatedPlaceResponse
+from services.feedback_aggregates import PLACE
+from services.place_normalization import normalize_text
+
+# Bayesian average: every place starts with PRIOR_WEIGHT virtual ratings at the global mean,
+# so a single 5-star review does not outrank fifty 4.8s
+LEADERBOARD_PRIOR_WEIGHT = float(os.getenv("LEADERBOARD_PRIOR_WEIGHT", "5"))
+LEADERBOARD_MIN_FEEDBACK = int(os.getenv("LEADERBOARD_MIN_FEEDBACK", "1"))
+# Cheap check for new feedback (max updated_at of the place aggregates) this often
+LEADERBOARD_REFRESH_SECONDS = int(os.getenv("LEADERBOARD_REFRESH_SECONDS", "30"))
+# Full rebuild at least this often so edited place details show up
+LEADERBOARD_MAX_AGE_SECONDS = int(os.getenv("LEADERBOARD_MAX_AGE_SECONDS", "3600"))
+LEADERBOARD_MAX_SIZE = 50
+
+BoardKey = Tuple[str, str]  # (city_norm, category_norm); "" means any
+
+
+def weighted_rating(rating_sum: float, count: int, global_mean: float,
+                    prior_weight: float = LEADERBOARD_PRIOR_WEIGHT) -> float:
+    return (prior_weight * global_mean + rating_sum) / (prior_weight + count)
+
+
+def _coordinates(place: Dict[str, Any]) -> Optional[PlaceCoordinates]:
+    coordinates = place.get("coordinates") or {}
+    if coordinates.get("lat") is None or coordinates.get("lng") is None:
+        return None
+    return PlaceCoordinates(lat=float(coordinates["lat"] or 0.0), lng=float(coordinates["lng"] or 0.0))
+
+
+def top_rated_place(place: Dict[str, Any], aggregate: Dict[str, Any], score: float) -> TopRatedPlaceResponse:
+    return TopRatedPlaceResponse(
+        place_id=place["place_id"],
+        name=place.get("name", ""),
+        city=place.get("city", ""),
+        category=place.get("category", ""),
+        wayfare_category=place.get("wayfare_category"),
+        price=place.get("price"),
+        rating=float(place.get("rating", 0) or 0),  # Original place rating
+        wayfare_rating=round(aggregate["sum"] / aggregate["count"], 2),  # Plain average of feedback
+        weighted_rating=round(score, 3),
+        total_feedback_count=aggregate["count"],
+        image=place.get("image"),
+        detail_url=place.get("detail_url"),
+        opening_hours=place.get("opening_hours"),
+        coordinates=_coordinates(place),
+        address=place.get("address"),
+        source=place.get("source"),
+        country=place.get("country"),
+        country_id=place.get("country_id"),
+        city_id=place.get("city_id"),
+        popularity=float(place.get("popularity", 0) or 0),
+        duration=place.get("duration"),
+        created_at=place.get("created_at"),
+        updated_at=place.get("updated_at")
+    )
+
+
+class PlaceLeaderboard:
+    """Top-rated places overall, per city, per category and per city+category, ranked by
+    Bayesian-weighted feedback rating and kept in memory ready to serve.
+
+    Built from the feedback_aggregates collection (services/feedback_aggregates.py) plus one
+    $in query for the place details; rebuilt when an aggregate changes.
+
+    Every load() is a full rebuild: it reads all place aggregates and every place with at least
+    min_feedback ratings, then sorts them, so its time and memory grow linearly with the number of
+    rated places (logged on each build). Checking for changes is one indexed find_one; a rebuild
+    runs at most once per refresh_seconds, however much feedback arrives in between.
+    """
+
+    def __init__(self, prior_weight: float = LEADERBOARD_PRIOR_WEIGHT, min_feedback: int = LEADERBOARD_MIN_FEEDBACK,
+                 refresh_seconds: int = LEADERBOARD_REFRESH_SECONDS, max_age_seconds: int = LEADERBOARD_MAX_AGE_SECONDS,
+                 max_size: int = LEADERBOARD_MAX_SIZE):
+        self.prior_weight = prior_weight
+        self.min_feedback = min_feedback
+        self.refresh_seconds = refresh_seconds
+        self.max_age_seconds = max_age_seconds
+        self.max_size = max_size
+        self._boards: Dict[BoardKey, List[TopRatedPlaceResponse]] = {}
+        self._version: Any = None
+        self._load_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self.loaded_at: Optional[float] = None
+
+    async def _aggregates_version(self):
+        """Latest aggregate write; changes whenever feedback is submitted, updated or deleted"""
+        latest = await database_config.feedback_aggregates_collection.find_one(
+            {"kind": PLACE}, {"updated_at": 1}, sort=[("updated_at", -1)]
+        )
+        return latest.get("updated_at") if latest else None
+
+    async def load(self):
+        async with self._load_lock:
+            started = time.perf_counter()
+            version = await self._aggregates_version()
+            aggregates = await database_config.feedback_aggregates_collection.find(
+                {"kind": PLACE, "count": {"$gt": 0}}, {"target_id": 1, "count": 1, "sum": 1}
+            ).to_list(length=None)
+
+            total_count = sum(aggregate["count"] for aggregate in aggregates)
+            global_mean = sum(aggregate["sum"] for aggregate in aggregates) / total_count if total_count else 0.0
+            eligible = {aggregate["target_id"]: aggregate for aggregate in aggregates
+                        if aggregate["count"] >= self.min_feedback}
+
+            # Place details for every ranked place in one query
+            places = await database_config.places_collection.find(
+                {"place_id": {"$in": list(eligible)}}
+            ).to_list(length=None)
+
+            ranked = []
+            for place in places:
+                aggregate = eligible[place["place_id"]]
+                score = weighted_rating(aggregate["sum"], aggregate["count"], global_mean, self.prior_weight)
+                ranked.append((-score, normalize_text(place.get("name")), place, aggregate, score))
+            ranked.sort(key=lambda entry: entry[:2])
+
+            boards: Dict[BoardKey, List[TopRatedPlaceResponse]] = {}
+            for _, _, place, aggregate, score in ranked:
+                city = place.get("city_norm") or normalize_text(place.get("city"))
+                category = normalize_text(place.get("wayfare_category") or place.get("category"))
+                entry = None
+                for key in (("", ""), (city, ""), ("", category), (city, category)):
+                    board = boards.setdefault(key, [])
+                    if len(board) < self.max_size:
+                        entry = entry or top_rated_place(place, aggregate, score)
+                        board.append(entry)
+
+            self._boards = boards
+            self._version = version
+            self.loaded_at = time.monotonic()
+            print(f"DEBUG: Leaderboard built from {len(aggregates)} places ({len(ranked)} ranked, "
+                  f"{len(boards)} boards) in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+    async def top(self, city: Optional[str] = None, category: Optional[str] = None,
+                  limit: int = 10) -> List[TopRatedPlaceResponse]:
+        if self.loaded_at is None:
+            await self.load()
+        board = self._boards.get((normalize_text(city), normalize_text(category)), [])
+        return board[:max(0, limit)]
+
+    async def refresh_if_changed(self) -> bool:
+        stale = self.loaded_at is None or time.monotonic() - self.loaded_at >= self.max_age_seconds
+        if not stale and await self._aggregates_version() == self._version:
+            return False
+        await self.load()
+        return True
+
+    async def _refresh_loop(self):
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.refresh_if_changed()
+            except Exception as e:
+                print(f"DEBUG: Leaderboard refresh failed: {e}")
+
+    async def start(self):
+        try:
+            await self.load()
+        except Exception as e:
+            print(f"DEBUG: Initial leaderboard build failed, will build on first request: {e}")
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+
+top_rated_places = PlaceLeaderboard()
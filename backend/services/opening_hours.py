@@ -0,0 +1,154 @@
+import re
+from bisect import bisect_right
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, FrozenSet, List, Optional, Tuple
+
+MINUTES_PER_DAY = 24 * 60
+MINUTES_PER_WEEK = 7 * MINUTES_PER_DAY
+
+DAY_NAMES = ["monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday"]
+_DAY_LOOKUP = {name: i for i, name in enumerate(DAY_NAMES)}
+_DAY_LOOKUP.update({name[:3]: i for i, name in enumerate(DAY_NAMES)})
+
+_TIME_RE = re.compile(r"^(\d{1,2})(?:[:.](\d{2}))?\s*([ap])?\.?\s*m?\.?$", re.IGNORECASE)
+_RANGE_SPLIT_RE = re.compile(r"\s*(?:,|;|\band\b)\s*", re.IGNORECASE)
+_BOUNDS_SPLIT_RE = re.compile(r"\s*(?:-|–|—|\bto\b)\s*", re.IGNORECASE)
+
+_NO_INFO_VALUES = {"", "notice"}
+_CLOSED_VALUES = {"closed"}
+_ALWAYS_OPEN_VALUES = {"open 24 hours", "24 hours", "open 24h", "24h", "00:00-24:00"}
+
+
+def minute_of_week(moment: datetime) -> int:
+    """Minutes since Monday 00:00 for a datetime"""
+    return moment.weekday() * MINUTES_PER_DAY + moment.hour * 60 + moment.minute
+
+
+def _parse_time(text: str) -> Optional[int]:
+    """'9:00 AM', '09:00', '9am', '21.30' -> minutes after midnight"""
+    match = _TIME_RE.match(text.strip())
+    if not match:
+        return None
+    hour, minute, meridiem = int(match.group(1)), int(match.group(2) or 0), match.group(3)
+    if minute > 59:
+        return None
+    if meridiem:
+        if not 1 <= hour <= 12:
+            return None
+        hour = hour % 12 + (12 if meridiem.lower() == "p" else 0)
+    elif hour > 24 or (hour == 24 and minute):
+        return None
+    return hour * 60 + minute
+
+
+def _parse_day_ranges(hours: str) -> Optional[List[Tuple[int, int]]]:
+    """Ranges (minutes after midnight, end may exceed 1440 for overnight) or None if unparseable"""
+    value = hours.strip().lower()
+    if value in _CLOSED_VALUES:
+        return []
+    if value in _ALWAYS_OPEN_VALUES:
+        return [(0, MINUTES_PER_DAY)]
+
+    ranges = []
+    for part in _RANGE_SPLIT_RE.split(value):
+        if not part:
+            continue
+        bounds = _BOUNDS_SPLIT_RE.split(part)
+        if len(bounds) != 2:
+            return None
+        start, end = _parse_time(bounds[0]), _parse_time(bounds[1])
+        if start is None or end is None:
+            return None
+        if end <= start:
+            # Overnight range ("8:00 PM - 2:00 AM"); identical bounds mean open around the clock
+            end += MINUTES_PER_DAY
+        ranges.append((start, end))
+    return ranges or None
+
+
+class CompiledOpeningHours:
+    """Weekly opening hours as sorted, merged minute-of-week intervals.
+
+    Intervals are closed at both ends (open at exactly the closing minute), matching the
+    scheduler's historical behaviour. Days without usable information are treated as open.
+    """
+
+    __slots__ = ("starts", "ends", "missing_days", "unparsed_days")
+
+    def __init__(self, intervals: List[Tuple[int, int]], missing_days: FrozenSet[int], unparsed_days: FrozenSet[int]):
+        merged: List[List[int]] = []
+        for start, end in sorted(intervals):
+            if merged and start <= merged[-1][1]:
+                merged[-1][1] = max(merged[-1][1], end)
+            else:
+                merged.append([start, end])
+        self.starts = tuple(start for start, _ in merged)
+        self.ends = tuple(end for _, end in merged)
+        self.missing_days = missing_days
+        self.unparsed_days = unparsed_days
+
+    def is_day_unknown(self, day_index: int) -> bool:
+        return day_index in self.missing_days or day_index in self.unparsed_days
+
+    def is_open_at_minute(self, minute: int) -> bool:
+        minute %= MINUTES_PER_WEEK
+        if self.is_day_unknown(minute // MINUTES_PER_DAY):
+            return True
+        i = bisect_right(self.starts, minute) - 1
+        return i >= 0 and minute <= self.ends[i]
+
+    def is_open_at(self, moment: datetime) -> bool:
+        return self.is_open_at_minute(minute_of_week(moment))
+
+    def next_open_slot(self, minute: int, duration_minutes: int, latest_finish: int) -> Optional[int]:
+        """Earliest start >= minute so that [start, start + duration] lies in one opening interval
+        and ends by latest_finish (all in minutes of the same week), or None"""
+        # Intervals that end before `minute` can never hold the visit; later ones are scanned in order
+        i = max(bisect_right(self.starts, minute) - 1, 0)
+        for start, end in zip(self.starts[i:], self.ends[i:]):
+            candidate = max(minute, start)
+            if candidate + duration_minutes > latest_finish:
+                return None
+            if candidate + duration_minutes <= end:
+                return candidate
+        return None
+
+
+def _freeze(opening_hours: Dict) -> Tuple[Tuple[str, str], ...]:
+    return tuple(sorted((str(day), value if isinstance(value, str) else repr(value))
+                        for day, value in opening_hours.items()))
+
+
+@lru_cache(maxsize=4096)
+def _compile_frozen(frozen_hours: Tuple[Tuple[str, str], ...]) -> CompiledOpeningHours:
+    seen_days = set()
+    unparsed_days = set()
+    intervals: List[Tuple[int, int]] = []
+
+    for day_name, hours in frozen_hours:
+        day_index = _DAY_LOOKUP.get(day_name.strip().lower())
+        if day_index is None or hours.strip().lower() in _NO_INFO_VALUES:
+            continue
+        ranges = _parse_day_ranges(hours)
+        seen_days.add(day_index)
+        if ranges is None:
+            unparsed_days.add(day_index)
+            continue
+        day_offset = day_index * MINUTES_PER_DAY
+        for start, end in ranges:
+            start, end = day_offset + start, day_offset + end
+            if end > MINUTES_PER_WEEK:
+                # Sunday overnight range wraps into Monday morning
+                intervals.append((start, MINUTES_PER_WEEK))
+                intervals.append((0, end - MINUTES_PER_WEEK))
+            else:
+                intervals.append((start, end))
+
+    missing_days = frozenset(set(range(7)) - seen_days)
+    return CompiledOpeningHours(intervals, missing_days, frozenset(unparsed_days))
+
+
+def compile_opening_hours(opening_hours: Optional[Dict]) -> CompiledOpeningHours:
+    """Compiled form of a place's opening_hours dict (cached, so each distinct schedule is parsed once)"""
+    return _compile_frozen(_freeze(opening_hours or {}))
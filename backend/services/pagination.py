@@ -0,0 +1,101 @@
+import base64
+import binascii
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from bson import ObjectId, json_util
+
+# (field, direction) pairs; the last one must be unique (normally ("_id", 1)) so the order is total
+SortSpec = Sequence[Tuple[str, int]]
+
+
+# Sort keys are scalars; anything else in a cursor (e.g. a {"$gt": ...} document) was not written by
+# encode_cursor and must not reach the query
+CURSOR_VALUE_TYPES = (type(None), bool, int, float, str, ObjectId, datetime)
+
+
+class InvalidCursor(ValueError):
+    pass
+
+
+def _field_value(document: Dict[str, Any], field: str) -> Any:
+    value: Any = document
+    for part in field.split("."):
+        value = value.get(part) if isinstance(value, dict) else None
+    return value
+
+
+def _sort_tag(sort: SortSpec, sort_name: Optional[str]) -> str:
+    """Identifies the order a cursor was issued for: the caller's sort name, or the sort keys themselves"""
+    return sort_name or ",".join(f"{field}:{direction}" for field, direction in sort)
+
+
+def encode_cursor(document: Dict[str, Any], sort: SortSpec, sort_name: Optional[str] = None) -> str:
+    """Opaque cursor holding the sort-key values of the last document on a page"""
+    values = [_field_value(document, field) for field, _ in sort]
+    payload = {"sort": _sort_tag(sort, sort_name), "values": values}
+    return base64.urlsafe_b64encode(json_util.dumps(payload).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, sort: SortSpec, sort_name: Optional[str] = None) -> List[Any]:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        payload = json_util.loads(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError) as e:
+        raise InvalidCursor("Invalid cursor") from e
+    if not isinstance(payload, dict):
+        raise InvalidCursor("Invalid cursor")
+    # A cursor from one order (e.g. sort_by=highest) would skip or repeat items in another
+    if payload.get("sort") != _sort_tag(sort, sort_name):
+        raise InvalidCursor("Cursor was issued for a different sort order")
+    values = payload.get("values")
+    if not isinstance(values, list) or len(values) != len(sort):
+        raise InvalidCursor("Invalid cursor")
+    if not all(isinstance(value, CURSOR_VALUE_TYPES) for value in values):
+        raise InvalidCursor("Invalid cursor")
+    return values
+
+
+def _after(field: str, direction: int, value: Any) -> Optional[Dict[str, Any]]:
+    """Filter for values strictly after `value` in this direction (MongoDB sorts null lowest)"""
+    if value is None:
+        return {field: {"$ne": None}} if direction > 0 else None
+    if direction > 0:
+        return {field: {"$gt": value}}
+    return {"$or": [{field: {"$lt": value}}, {field: None}]}
+
+
+def keyset_filter(sort: SortSpec, values: Sequence[Any]) -> Dict[str, Any]:
+    """Filter matching documents that come after `values` in `sort` order.
+
+    (a, b, _id) after (x, y, z) = a after x  OR  (a == x AND b after y)  OR  (a == x AND b == y AND _id after z)
+    """
+    branches = []
+    for position, (field, direction) in enumerate(sort):
+        after = _after(field, direction, values[position])
+        if after is None:
+            continue
+        equal_prefix = [{prefix_field: values[i]} for i, (prefix_field, _) in enumerate(sort[:position])]
+        branches.append({"$and": equal_prefix + [after]} if equal_prefix else after)
+    if not branches:
+        # Nothing sorts after the cursor
+        return {"_id": {"$exists": False}}
+    return {"$or": branches}
+
+
+async def fetch_page(collection, query: Dict[str, Any], sort: SortSpec, limit: int,
+                     cursor: Optional[str] = None, projection: Optional[Dict[str, Any]] = None,
+                     collation=None, sort_name: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """One page of `query` in `sort` order plus the cursor for the next page (None on the last page).
+
+    Keyset pagination: the cursor becomes a range predicate on the sort keys, so page N costs
+    the same as page 1 when an index covers `sort`. A collation applies to the cursor comparisons too.
+    Cursors only work with the sort they were issued for (sort_name, or `sort` itself if not given).
+    """
+    if cursor:
+        query = {"$and": [query, keyset_filter(sort, decode_cursor(cursor, sort, sort_name))]}
+    documents = await collection.find(query, projection, collation=collation).sort(list(sort)).limit(limit + 1).to_list(length=None)
+    if len(documents) <= limit:
+        return documents, None
+    documents = documents[:limit]
+    return documents, encode_cursor(documents[-1], sort, sort_name)
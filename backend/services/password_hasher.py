@@ -0,0 +1,136 @@
+import asyncio
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Dict, Optional
+
+from passlib.context import CryptContext
+
+# bcrypt takes ~200-300 ms of CPU per call; run it in worker processes instead of on the event loop
+PASSWORD_HASH_WORKERS = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(4, os.cpu_count() or 1))))
+# Requests beyond this many concurrent hash/verify calls wait in line (queue depth is reported in metrics)
+PASSWORD_HASH_MAX_CONCURRENCY = int(os.getenv("PASSWORD_HASH_MAX_CONCURRENCY", str(PASSWORD_HASH_WORKERS * 2)))
+# Log metrics() this often while there is hashing traffic (0 disables)
+PASSWORD_HASH_METRICS_SECONDS = int(os.getenv("PASSWORD_HASH_METRICS_SECONDS", "300"))
+
+_pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+def _hash_password(password: str) -> str:
+    return _pwd_context.hash(password)
+
+
+def _verify_password(plain_password: str, hashed_password: str) -> bool:
+    return _pwd_context.verify(plain_password, hashed_password)
+
+
+class PasswordHasher:
+    """Async bcrypt hashing/verification backed by a bounded process pool"""
+
+    def __init__(self, max_workers: int = PASSWORD_HASH_WORKERS,
+                 max_concurrency: int = PASSWORD_HASH_MAX_CONCURRENCY,
+                 metrics_seconds: int = PASSWORD_HASH_METRICS_SECONDS):
+        self.max_workers = max(1, max_workers)
+        self.max_concurrency = max(1, max_concurrency)
+        self.metrics_seconds = metrics_seconds
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._metrics_task: Optional[asyncio.Task] = None
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+        self.in_flight = 0
+        self.queued = 0
+        self.max_queued = 0
+        self.completed = 0
+        self.failed = 0
+        self._total_wait_ms = 0.0
+        self._total_run_ms = 0.0
+
+    def _get_executor(self) -> ProcessPoolExecutor:
+        if self._executor is None:
+            # spawn: never fork a process that is running an event loop and driver threads
+            self._executor = ProcessPoolExecutor(
+                max_workers=self.max_workers, mp_context=multiprocessing.get_context("spawn")
+            )
+        return self._executor
+
+    async def _run(self, func, *args):
+        queued_at = time.perf_counter()
+        self.queued += 1
+        self.max_queued = max(self.max_queued, self.queued)
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self.queued -= 1
+
+        started = time.perf_counter()
+        self._total_wait_ms += (started - queued_at) * 1000
+        self.in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            try:
+                result = await loop.run_in_executor(self._get_executor(), func, *args)
+            except BrokenProcessPool:
+                # A worker died (e.g. OOM-killed) - start a fresh pool and retry once
+                print("DEBUG: Password hashing pool broken, restarting it")
+                self._executor = None
+                result = await loop.run_in_executor(self._get_executor(), func, *args)
+            self.completed += 1
+            return result
+        except Exception:
+            self.failed += 1
+            raise
+        finally:
+            self.in_flight -= 1
+            self._total_run_ms += (time.perf_counter() - started) * 1000
+            self._semaphore.release()
+
+    async def hash(self, password: str) -> str:
+        return await self._run(_hash_password, password)
+
+    async def verify(self, plain_password: str, hashed_password: str) -> bool:
+        return await self._run(_verify_password, plain_password, hashed_password)
+
+    def metrics(self) -> Dict[str, float]:
+        finished = self.completed + self.failed
+        return {
+            "workers": self.max_workers,
+            "max_concurrency": self.max_concurrency,
+            "in_flight": self.in_flight,
+            "queued": self.queued,
+            "max_queued": self.max_queued,
+            "completed": self.completed,
+            "failed": self.failed,
+            "avg_wait_ms": self._total_wait_ms / finished if finished else 0.0,
+            "avg_run_ms": self._total_run_ms / finished if finished else 0.0,
+        }
+
+    async def _metrics_loop(self):
+        logged = None
+        while True:
+            await asyncio.sleep(self.metrics_seconds)
+            metrics = self.metrics()
+            # Stay quiet while nobody is logging in or registering
+            if (metrics["completed"], metrics["failed"], metrics["in_flight"], metrics["queued"]) != logged:
+                logged = (metrics["completed"], metrics["failed"], metrics["in_flight"], metrics["queued"])
+                print("DEBUG: Password hasher " + ", ".join(
+                    f"{name}={value:.1f}" if isinstance(value, float) else f"{name}={value}"
+                    for name, value in metrics.items()
+                ))
+
+    def start(self):
+        """Start periodic metrics logging (app startup); the pool itself starts on first use"""
+        if self.metrics_seconds > 0 and (self._metrics_task is None or self._metrics_task.done()):
+            self._metrics_task = asyncio.create_task(self._metrics_loop())
+
+    def shutdown(self):
+        if self._metrics_task is not None:
+            self._metrics_task.cancel()
+            self._metrics_task = None
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+password_hasher = PasswordHasher()
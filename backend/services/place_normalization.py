@@ -0,0 +1,93 @@
+"""Normalized lookup fields stored on place documents.
+
+Queries filter on these instead of case-insensitive regexes, so they can use plain indexes:
+city_norm/name_norm/country_norm (casefolded, accent- and whitespace-insensitive text),
+price_value (parse_price of `price`), rating_num and popularity_num (numeric, None if missing).
+
+Backfill existing documents:
+
+    cd backend
+    python -m services.place_normalization            # only documents missing the fields
+    python -m services.place_normalization --all      # recompute every document
+"""
+import re
+import unicodedata
+from typing import Any, Dict, Optional
+
+import config.database as database_config
+from services.backfill import BACKFILL_BATCH_SIZE, backfill, run_cli, startup_flag
+from services.backfill import build_parser as backfill_parser
+
+NORMALIZED_FIELDS = ("city_norm", "name_norm", "country_norm", "price_value", "rating_num", "popularity_num")
+SOURCE_FIELDS = ("city", "name", "country", "price", "rating", "popularity")
+
+PLACE_BACKFILL_ON_STARTUP = startup_flag("PLACE_BACKFILL_ON_STARTUP")
+
+
+def normalize_text(value: Any) -> str:
+    """'  São  Paulo ' -> 'sao paulo'; the same function must be applied to query values"""
+    if value is None:
+        return ""
+    text = unicodedata.normalize("NFKD", str(value))
+    text = "".join(char for char in text if not unicodedata.combining(char))
+    return " ".join(text.casefold().split())
+
+
+def parse_price(price_str):
+    if not price_str or price_str.strip() == "":
+        return 0.0  # Free
+    # Extract the first number in the string (handles "24£", "€29.90", etc.)
+    match = re.search(r"\d+(\.\d+)?", price_str.replace(",", "."))
+    if match:
+        return float(match.group())
+    return float('inf')  # If no number found, treat as very expensive
+
+
+def _to_number(value: Any) -> Optional[float]:
+    if value is None or value == "":
+        return None
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def normalized_place_fields(place: Dict[str, Any]) -> Dict[str, Any]:
+    """Normalized fields for a place document; call at ingestion time and merge into the document"""
+    price = place.get("price")
+    if isinstance(price, (int, float)):
+        price_value = float(price)
+    else:
+        price_value = parse_price(price if isinstance(price, str) else "")
+    return {
+        "city_norm": normalize_text(place.get("city")),
+        "name_norm": normalize_text(place.get("name")),
+        "country_norm": normalize_text(place.get("country")),
+        "price_value": price_value,
+        "rating_num": _to_number(place.get("rating")),
+        "popularity_num": _to_number(place.get("popularity")),
+    }
+
+
+def with_normalized_fields(place: Dict[str, Any]) -> Dict[str, Any]:
+    """Copy of a place document ready to insert"""
+    return {**place, **normalized_place_fields(place)}
+
+
+async def backfill_normalized_fields(only_missing: bool = True, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """Write normalized fields onto stored places; returns the number of documents updated"""
+    # All fields are written together, so city_norm alone marks a processed document (and is indexed)
+    query = {"city_norm": {"$exists": False}} if only_missing else {}
+    return await backfill(
+        database_config.places_collection, query, {field: 1 for field in SOURCE_FIELDS},
+        normalized_place_fields, "normalized place fields", batch_size
+    )
+
+
+def build_parser():
+    return backfill_parser("Backfill normalized lookup fields on place documents",
+                           "recompute every place, not only those missing fields")
+
+
+if __name__ == "__main__":
+    run_cli(build_parser(), backfill_normalized_fields)
@@ -0,0 +1,64 @@
+import re
+from typing import Any, Dict, List
+
+from pymongo import ASCENDING, DESCENDING
+
+from services.place_normalization import normalize_text
+
+# Best rated first, then most popular (lower popularity is better); _id makes the order total for cursors.
+# Served by the city_norm_rating_popularity_id index in config/indexes.py
+PLACE_SEARCH_SORT = [("rating_num", DESCENDING), ("popularity_num", ASCENDING), ("_id", ASCENDING)]
+MAX_SEARCH_LIMIT = 100
+
+BUDGET_MAX_PRICE = {"low": 20, "medium": 50}
+
+
+def _contains(value: str) -> Dict[str, str]:
+    """Case-insensitive substring match on user input (matched literally, not as a regex)"""
+    return {"$regex": re.escape(value.strip()), "$options": "i"}
+
+
+def build_place_search_query(request) -> Dict[str, Any]:
+    """MongoDB filter for a SearchPlacesRequest; every filter runs server-side so limit() returns full pages"""
+    query: Dict[str, Any] = {"city_norm": normalize_text(request.city)}
+    conditions: List[Dict[str, Any]] = []
+
+    if request.country and request.country.strip():
+        query["country_norm"] = normalize_text(request.country)
+
+    if request.budget in BUDGET_MAX_PRICE:
+        query["price_value"] = {"$lt": BUDGET_MAX_PRICE[request.budget]}
+
+    # Places without a numeric rating or popularity are never returned, with or without a rating
+    # filter: PlaceInCityResponse requires both, so they would be dropped after the fetch and leave
+    # the page short
+    query["rating_num"] = {"$ne": None}
+    query["popularity_num"] = {"$ne": None}
+    if request.min_rating is not None and request.min_rating > 0:
+        query["rating_num"]["$gte"] = request.min_rating
+    if request.rating is not None and request.rating > 0:
+        query["rating_num"]["$eq"] = request.rating
+
+    if request.name and request.name.strip():
+        query["name_norm"] = {"$regex": re.escape(normalize_text(request.name))}
+
+    if request.category and request.category.strip():
+        category = _contains(request.category)
+        conditions.append({"$or": [{"category": category}, {"wayfare_category": category}]})
+
+    if request.keywords and request.keywords.strip():
+        keywords = _contains(request.keywords)
+        conditions.append({"$or": [
+            {"name": keywords},
+            {"description": keywords},
+            {"category": keywords},
+            {"wayfare_category": keywords},
+        ]})
+
+    if conditions:
+        query["$and"] = conditions
+    return query
+
+
+def search_limit(request) -> int:
+    return max(1, min(request.limit or 20, MAX_SEARCH_LIMIT))
@@ -0,0 +1,42 @@
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Optional
+
+
+class StageTimings:
+    """Wall-clock milliseconds per named stage, measured between consecutive checkpoints"""
+
+    def __init__(self):
+        self.stages: Dict[str, float] = {}
+        self._last = time.perf_counter()
+
+    def checkpoint(self, stage: str):
+        now = time.perf_counter()
+        self.stages[stage] = self.stages.get(stage, 0.0) + (now - self._last) * 1000
+        self._last = now
+
+    @property
+    def total_ms(self) -> float:
+        return sum(self.stages.values())
+
+
+_current_timings: ContextVar[Optional[StageTimings]] = ContextVar("stage_timings", default=None)
+
+
+@contextmanager
+def collect_stage_timings():
+    """Collect stage_checkpoint() calls made by code running inside this block (same task/context)"""
+    timings = StageTimings()
+    token = _current_timings.set(timings)
+    try:
+        yield timings
+    finally:
+        _current_timings.reset(token)
+
+
+def stage_checkpoint(stage: str):
+    """Attribute the time since the previous checkpoint to `stage`; a no-op unless timings are collected"""
+    timings = _current_timings.get()
+    if timings is not None:
+        timings.checkpoint(stage)
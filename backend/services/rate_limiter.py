@@ -0,0 +1,34 @@
+import asyncio
+import time
+
+
+class AsyncTokenBucket:
+    """Token bucket for asyncio code: acquire() waits until a token is available.
+
+    Tokens refill continuously at `rate` per second up to `capacity`. Waiters are served
+    in arrival order because the refill and wait run under a lock.
+    """
+
+    def __init__(self, rate: float, capacity: float = 1):
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+        self.rate = rate
+        self.capacity = max(1.0, float(capacity))
+        self._tokens = self.capacity
+        self._updated = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    async def acquire(self):
+        async with self._lock:
+            self._refill()
+            if self._tokens < 1:
+                # Sleeping off the deficit earns the token; re-checking instead can spin on rounding
+                # (0.9999999999999999 tokens) with sleeps too short to move the clock
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+                self._refill()
+            self._tokens = max(0.0, self._tokens - 1)
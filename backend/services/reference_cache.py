@@ -0,0 +1,211 @@
+import asyncio
+import hashlib
+import os
+import time
+from typing import Dict, Optional, Tuple
+
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse, Response
+from pymongo.errors import OperationFailure
+
+import config.database as database_config
+from models.model import (
+    CityResponse,
+    GetAllCitiesResponse,
+    GetAllCountiesResponse,
+    GetAllCountriesListResponse,
+    GetAllRegionsResponse,
+    GetCountriesByRegionListResponse,
+    GetCountriesByRegionResponse,
+)
+
+# Cities/countries/regions almost never change: serve them from memory and re-check periodically
+REFERENCE_DATA_REFRESH_SECONDS = int(os.getenv("REFERENCE_DATA_REFRESH_SECONDS", "300"))
+# Reload immediately on writes when MongoDB supports change streams (replica sets / Atlas)
+REFERENCE_DATA_CHANGE_STREAM = os.getenv("REFERENCE_DATA_CHANGE_STREAM", "true").lower() == "true"
+CHANGE_STREAM_RETRY_MIN_SECONDS = 1
+CHANGE_STREAM_RETRY_MAX_SECONDS = 60
+# Server error codes meaning change streams can never work here (standalone server, or no permission
+# to open one): IllegalOperation, CommandNotSupported, Unauthorized, "only supported on replica sets"
+CHANGE_STREAM_UNSUPPORTED_CODES = {13, 20, 115, 40573}
+
+CITIES_VIEW = "cities"
+COUNTRIES_VIEW = "countries"
+REGIONS_VIEW = "regions"
+EMPTY_REGION_VIEW = "region:"
+
+
+def region_view(region: str) -> str:
+    return f"region:{region.strip().casefold()}"
+
+
+def _render(model) -> Tuple[bytes, str]:
+    """Body bytes exactly as FastAPI would serialize the model, plus a strong ETag"""
+    body = JSONResponse(content=jsonable_encoder(model)).body
+    return body, f'"{hashlib.sha256(body).hexdigest()[:32]}"'
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    if not if_none_match:
+        return False
+    candidates = [value.strip() for value in if_none_match.split(",")]
+    # Weak comparison (RFC 9110): W/"x" matches "x"
+    return "*" in candidates or any(value.removeprefix("W/") == etag for value in candidates)
+
+
+class ReferenceDataCache:
+    """Pre-serialized JSON views (body bytes + ETag) of the cities and countries collections"""
+
+    def __init__(self, refresh_seconds: int = REFERENCE_DATA_REFRESH_SECONDS,
+                 use_change_stream: bool = REFERENCE_DATA_CHANGE_STREAM):
+        self.refresh_seconds = refresh_seconds
+        self.use_change_stream = use_change_stream
+        self._views: Dict[str, Tuple[bytes, str]] = {}
+        self._load_lock = asyncio.Lock()
+        self._refresh_task: Optional[asyncio.Task] = None
+        self._stream_backoff = CHANGE_STREAM_RETRY_MIN_SECONDS
+        self.loaded_at: Optional[float] = None
+
+    async def load(self) -> bool:
+        """Rebuild every view from MongoDB and swap them in at once; returns True if anything changed"""
+        async with self._load_lock:
+            cities = await database_config.cities_collection.find().to_list(length=None)
+            countries = await database_config.countries_collection.find().to_list(length=None)
+            regions = await database_config.countries_collection.distinct("region")
+
+            city_models = []
+            for city in cities:
+                city["city_id"] = str(city["_id"])
+                city.pop("_id", None)
+                city_models.append(CityResponse(**city))
+            for country in countries:
+                country["_id"] = str(country["_id"])
+
+            views = {
+                CITIES_VIEW: _render(GetAllCitiesResponse(
+                    success=True,
+                    message="Cities retrieved successfully",
+                    status_code=200,
+                    data=city_models
+                )),
+                COUNTRIES_VIEW: _render(GetAllCountriesListResponse(
+                    success=True,
+                    message="Countries fetched successfully",
+                    status_code=200,
+                    data=[GetAllCountiesResponse(**country) for country in countries]
+                )),
+                REGIONS_VIEW: _render(GetAllRegionsResponse(
+                    success=True,
+                    message="Regions fetched successfully",
+                    status_code=200,
+                    data=regions
+                )),
+                EMPTY_REGION_VIEW: _render(GetCountriesByRegionListResponse(
+                    success=True,
+                    message="No countries found in the specified region.",
+                    status_code=200,
+                    data=[]
+                )),
+            }
+
+            by_region: Dict[str, list] = {}
+            for country in countries:
+                if isinstance(country.get("region"), str):
+                    by_region.setdefault(region_view(country["region"]), []).append(country)
+            for key, region_countries in by_region.items():
+                views[key] = _render(GetCountriesByRegionListResponse(
+                    success=True,
+                    message="Countries in region fetched successfully",
+                    status_code=200,
+                    data=[GetCountriesByRegionResponse(**country) for country in region_countries]
+                ))
+
+            changed = {key: etag for key, (_, etag) in views.items()} != \
+                {key: etag for key, (_, etag) in self._views.items()}
+            self._views = views
+            self.loaded_at = time.monotonic()
+            if changed:
+                print(f"DEBUG: Reference data loaded: {len(cities)} cities, {len(countries)} countries, {len(regions)} regions")
+            return changed
+
+    async def ensure_loaded(self):
+        if self.loaded_at is None:
+            await self.load()
+
+    async def response(self, view: str, if_none_match: Optional[str] = None,
+                       fallback_view: Optional[str] = None) -> Response:
+        """Serve a view from memory; 304 Not Modified when the client already has this ETag"""
+        await self.ensure_loaded()
+        cached = self._views.get(view)
+        if cached is None and fallback_view is not None:
+            cached = self._views[fallback_view]
+        body, etag = cached
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+        if etag_matches(if_none_match, etag):
+            return Response(status_code=304, headers=headers)
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    async def _watch_changes(self):
+        pipeline = [{"$match": {"ns.coll": {"$in": [
+            database_config.cities_collection.name,
+            database_config.countries_collection.name,
+        ]}}}]
+        async with database_config.database.watch(pipeline) as stream:
+            print("DEBUG: Watching cities/countries change stream")
+            self._stream_backoff = CHANGE_STREAM_RETRY_MIN_SECONDS
+            async for _ in stream:
+                await self.load()
+
+    async def _follow_change_stream(self):
+        """Keep a change stream open, reconnecting with backoff; returns only if change streams are unsupported"""
+        self._stream_backoff = CHANGE_STREAM_RETRY_MIN_SECONDS
+        while True:
+            try:
+                await self._watch_changes()
+            except asyncio.CancelledError:
+                raise
+            except OperationFailure as e:
+                if e.code in CHANGE_STREAM_UNSUPPORTED_CODES:
+                    print(f"DEBUG: Reference data change stream unsupported ({e}), polling every {self.refresh_seconds}s")
+                    return
+                print(f"DEBUG: Reference data change stream failed ({e}), reconnecting in {self._stream_backoff:.0f}s")
+            except Exception as e:
+                # Network errors, primary elections, invalidated streams: reconnect
+                print(f"DEBUG: Reference data change stream closed ({e}), reconnecting in {self._stream_backoff:.0f}s")
+            await asyncio.sleep(self._stream_backoff)
+            self._stream_backoff = min(self._stream_backoff * 2, CHANGE_STREAM_RETRY_MAX_SECONDS)
+            # Pick up writes made while the stream was down
+            try:
+                await self.load()
+            except Exception as e:
+                print(f"DEBUG: Reference data refresh failed: {e}")
+
+    async def _refresh_loop(self):
+        if self.use_change_stream:
+            await self._follow_change_stream()
+        while True:
+            await asyncio.sleep(self.refresh_seconds)
+            try:
+                await self.load()
+            except Exception as e:
+                print(f"DEBUG: Reference data refresh failed: {e}")
+
+    async def start(self):
+        try:
+            await self.load()
+        except Exception as e:
+            print(f"DEBUG: Initial reference data load failed, will load on first request: {e}")
+        if self._refresh_task is None or self._refresh_task.done():
+            self._refresh_task = asyncio.create_task(self._refresh_loop())
+
+    async def stop(self):
+        if self._refresh_task is not None:
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+            self._refresh_task = None
+
+
+reference_cache = ReferenceDataCache()
@@ -0,0 +1,170 @@
+import math
+import numpy as np
+from typing import List, Sequence
+
+from services.distance_matrix import DistanceMatrix
+
+
+def _farthest_first_medoids(distances: np.ndarray, k: int) -> List[int]:
+    """Deterministic seeding: most central point first, then repeatedly the point farthest from all medoids"""
+    medoids = [int(np.argmin(distances.sum(axis=1)))]
+    nearest = distances[medoids[0]].copy()
+    while len(medoids) < k:
+        candidate = int(np.argmax(nearest))
+        if nearest[candidate] <= 0:
+            # Only duplicates left - pick any point not yet used as a medoid
+            candidate = next(i for i in range(len(distances)) if i not in medoids)
+        medoids.append(candidate)
+        nearest = np.minimum(nearest, distances[candidate])
+    return medoids
+
+
+def _assign_with_capacity(distances: np.ndarray, medoids: List[int], capacity: int, place_keys: List[int]) -> List[List[int]]:
+    """Greedy capacity-constrained assignment of points to their nearest medoid.
+
+    A cluster avoids taking a second copy of the same place (cycled duplicates) unless nothing else fits.
+    """
+    n, k = len(distances), len(medoids)
+    to_medoid = distances[:, medoids]
+    order = np.argsort(to_medoid, axis=None, kind="stable")
+
+    clusters: List[List[int]] = [[] for _ in range(k)]
+    cluster_keys = [set() for _ in range(k)]
+    assigned = np.full(n, -1)
+
+    for strict in (True, False):
+        for flat in order:
+            i, c = divmod(int(flat), k)
+            if assigned[i] >= 0 or len(clusters[c]) >= capacity:
+                continue
+            if strict and place_keys[i] in cluster_keys[c]:
+                continue
+            assigned[i] = c
+            clusters[c].append(i)
+            cluster_keys[c].add(place_keys[i])
+    return clusters
+
+
+def cluster_places_into_days(places: Sequence, num_days: int, places_per_day: int,
+                             distance_matrix: DistanceMatrix, max_iterations: int = 10) -> List[List]:
+    """Split places into num_days geographically compact, size-balanced groups (balanced k-medoids).
+
+    No day gets more than places_per_day places: candidates beyond num_days * places_per_day are
+    dropped, lowest-ranked first. Places without coordinates are spread over the smallest days. Days
+    are returned in the order of their best-ranked member, so the candidate ranking still decides
+    which places come first in the trip.
+    """
+    if num_days <= 0:
+        return []
+    places = list(places)[:num_days * max(1, places_per_day)]
+    if not places:
+        return [[] for _ in range(num_days)]
+
+    positions = {}
+    for position, place in enumerate(places):
+        positions.setdefault(id(place), position)
+
+    located = [p for p in places if distance_matrix.has_coordinates(p)]
+    unlocated = [p for p in places if not distance_matrix.has_coordinates(p)]
+    capacity = max(1, math.ceil(len(places) / num_days))
+
+    days: List[List] = []
+    if located:
+        rows = [distance_matrix.index_of(p) for p in located]
+        distances = distance_matrix.matrix[np.ix_(rows, rows)]
+        place_keys = [id(p) for p in located]
+        k = min(num_days, len(located))
+        located_capacity = min(max(capacity, math.ceil(len(located) / k)), max(1, places_per_day))
+
+        medoids = _farthest_first_medoids(distances, k)
+        clusters = _assign_with_capacity(distances, medoids, located_capacity, place_keys)
+        for _ in range(max_iterations):
+            new_medoids = [
+                members[int(np.argmin(distances[np.ix_(members, members)].sum(axis=1)))] if members else medoid
+                for members, medoid in zip(clusters, medoids)
+            ]
+            if new_medoids == medoids:
+                break
+            medoids = new_medoids
+            clusters = _assign_with_capacity(distances, medoids, located_capacity, place_keys)
+
+        days = [[located[i] for i in members] for members in clusters]
+
+    while len(days) < num_days:
+        days.append([])
+
+    for place in unlocated:
+        smallest = min(range(num_days), key=lambda d: len(days[d]))
+        days[smallest].append(place)
+
+    for day in days:
+        day.sort(key=lambda p: positions[id(p)])
+    days.sort(key=lambda day: positions[id(day[0])] if day else len(places))
+    return days
+
+
+def _path_length(path: List[int], distances: np.ndarray) -> float:
+    return float(sum(distances[a, b] for a, b in zip(path, path[1:])))
+
+
+def _two_opt(path: List[int], distances: np.ndarray, first_movable: int, max_passes: int = 20) -> List[int]:
+    """Improve an open path by reversing segments; nodes before first_movable stay fixed"""
+    path = list(path)
+    n = len(path)
+    for _ in range(max_passes):
+        improved = False
+        for i in range(max(first_movable, 0), n - 1):
+            for j in range(i + 1, n):
+                before = after = 0.0
+                if i > 0:
+                    before += distances[path[i - 1], path[i]]
+                    after += distances[path[i - 1], path[j]]
+                if j < n - 1:
+                    before += distances[path[j], path[j + 1]]
+                    after += distances[path[i], path[j + 1]]
+                if after + 1e-9 < before:
+                    path[i:j + 1] = reversed(path[i:j + 1])
+                    improved = True
+        if not improved:
+            break
+    return path
+
+
+def order_day_places(day_places: Sequence, distance_matrix: DistanceMatrix, fixed_prefix: int = 0) -> List:
+    """Order a day's places into a short walking path (nearest neighbour + 2-opt).
+
+    The first fixed_prefix places (e.g. must-visit places) keep their positions and the path continues
+    from the last of them. Places without coordinates keep their relative order at the end of the day.
+    """
+    day_places = list(day_places)
+    prefix = day_places[:fixed_prefix]
+    rest = day_places[fixed_prefix:]
+
+    located = [p for p in rest if distance_matrix.has_coordinates(p)]
+    unlocated = [p for p in rest if not distance_matrix.has_coordinates(p)]
+    if len(located) < 2:
+        return prefix + located + unlocated
+
+    anchor = prefix[-1] if prefix and distance_matrix.has_coordinates(prefix[-1]) else None
+    nodes = ([anchor] if anchor is not None else []) + located
+    rows = [distance_matrix.index_of(p) for p in nodes]
+    distances = distance_matrix.matrix[np.ix_(rows, rows)]
+
+    # Nearest neighbour from the anchor, or from the best-ranked place when the day has no anchor
+    path = [0]
+    remaining = set(range(1, len(nodes)))
+    while remaining:
+        last = path[-1]
+        nxt = min(remaining, key=lambda j: (distances[last, j], j))
+        path.append(nxt)
+        remaining.remove(nxt)
+
+    first_movable = 1 if anchor is not None else 0
+    improved = _two_opt(path, distances, first_movable)
+    if _path_length(improved, distances) < _path_length(path, distances):
+        path = improved
+
+    ordered = [nodes[i] for i in path]
+    if anchor is not None:
+        ordered = ordered[1:]
+    return prefix + ordered + unlocated
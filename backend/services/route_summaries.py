@@ -0,0 +1,65 @@
+"""Lightweight route summaries for list screens.
+
+Summaries carry title, city, dates, stats and a cover image, never the days[].activities[] tree.
+The cover image is stored on the route document (`cover_image`) when the route is written;
+backfill routes created before the field existed:
+
+    cd backend
+    python -m services.route_summaries            # only routes missing cover_image
+    python -m services.route_summaries --all      # recompute every route
+"""
+from typing import Any, Dict, Iterable, Optional
+
+from pymongo import DESCENDING
+
+import config.database as database_config
+from services.backfill import BACKFILL_BATCH_SIZE, backfill, run_cli, startup_flag
+from services.backfill import build_parser as backfill_parser
+
+ROUTE_SUMMARY_FIELDS = (
+    "user_id", "title", "city", "country", "start_date", "end_date", "budget", "travel_style",
+    "category", "season", "is_public", "stats", "cover_image", "created_at", "updated_at",
+)
+ROUTE_SUMMARY_PROJECTION = {field: 1 for field in ROUTE_SUMMARY_FIELDS}
+
+# Newest first; _id breaks ties so the order is total for cursors
+ROUTE_SUMMARY_SORT = [("created_at", DESCENDING), ("_id", DESCENDING)]
+
+ROUTE_COVER_BACKFILL_ON_STARTUP = startup_flag("ROUTE_COVER_BACKFILL_ON_STARTUP")
+
+
+def cover_image(days: Optional[Iterable[Any]]) -> Optional[str]:
+    """First activity image of a route; days may be Day models or stored dicts"""
+    for day in days or []:
+        activities = day.get("activities") if isinstance(day, dict) else day.activities
+        for activity in activities or []:
+            image = activity.get("image") if isinstance(activity, dict) else activity.image
+            if image:
+                return image
+    return None
+
+
+def route_summary_document(route: Dict[str, Any]) -> Dict[str, Any]:
+    """Projected route document -> RouteSummary fields"""
+    route["route_id"] = str(route.pop("_id"))
+    route["user_id"] = str(route["user_id"])
+    route.setdefault("cover_image", None)
+    return route
+
+
+async def backfill_cover_images(only_missing: bool = True, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """Write cover_image onto stored routes; returns the number of routes updated"""
+    query = {"cover_image": {"$exists": False}} if only_missing else {}
+    return await backfill(
+        database_config.route_collection, query, {"days.activities.image": 1},
+        lambda route: {"cover_image": cover_image(route.get("days"))}, "cover images", batch_size
+    )
+
+
+def build_parser():
+    return backfill_parser("Backfill cover images on route documents",
+                           "recompute every route, not only those missing cover_image")
+
+
+if __name__ == "__main__":
+    run_cli(build_parser(), backfill_cover_images)
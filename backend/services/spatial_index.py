@@ -0,0 +1,175 @@
+import asyncio
+import math
+import time
+import numpy as np
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from config.database import places_collection
+from services.distance_matrix import get_place_coordinates, haversine_to_point
+from services.place_normalization import normalize_text
+
+KM_PER_DEGREE_LAT = 111.32
+
+
+class SpatialIndex:
+    """Uniform lat/lng grid over a set of places with radius and k-nearest queries.
+
+    Each bucket covers roughly cell_km x cell_km, so a radius query only has to check the
+    buckets overlapping the search circle instead of every place in the city.
+
+    Route grouping does not use it: a route has at most a few dozen candidates, and the planner
+    (services/route_planner.py) clusters and orders them from the full DistanceMatrix it already
+    builds. The app uses CitySpatialIndex for coordinate lookups; the radius and k-nearest queries
+    are for city-wide searches.
+    """
+
+    def __init__(self, items: Sequence, cell_km: float = 1.0,
+                 coords_fn: Callable = get_place_coordinates):
+        self.items: List = []
+        lats: List[float] = []
+        lngs: List[float] = []
+        for item in items:
+            coords = coords_fn(item)
+            if coords is None:
+                continue
+            self.items.append(item)
+            lats.append(coords[0])
+            lngs.append(coords[1])
+
+        self.lats = np.asarray(lats, dtype=np.float64)
+        self.lngs = np.asarray(lngs, dtype=np.float64)
+        self.cell_km = cell_km
+
+        ref_lat = float(self.lats.mean()) if len(self.lats) else 0.0
+        self._cell_lat = cell_km / KM_PER_DEGREE_LAT
+        self._cell_lng = cell_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(ref_lat)), 0.01))
+
+        buckets: Dict[Tuple[int, int], List[int]] = {}
+        for i in range(len(self.items)):
+            buckets.setdefault(self._cell_of(self.lats[i], self.lngs[i]), []).append(i)
+        self._buckets = {cell: np.asarray(indices, dtype=np.intp) for cell, indices in buckets.items()}
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _cell_of(self, lat: float, lng: float) -> Tuple[int, int]:
+        return int(math.floor(lat / self._cell_lat)), int(math.floor(lng / self._cell_lng))
+
+    def _candidates(self, lat: float, lng: float, rings_lat: int, rings_lng: int) -> np.ndarray:
+        # Sparse grids (e.g. country-wide candidate sets): scanning every point beats walking empty cells
+        if (2 * rings_lat + 1) * (2 * rings_lng + 1) >= len(self._buckets):
+            return np.arange(len(self.items), dtype=np.intp)
+        ci, cj = self._cell_of(lat, lng)
+        found = [
+            self._buckets[(i, j)]
+            for i in range(ci - rings_lat, ci + rings_lat + 1)
+            for j in range(cj - rings_lng, cj + rings_lng + 1)
+            if (i, j) in self._buckets
+        ]
+        return np.concatenate(found) if found else np.zeros(0, dtype=np.intp)
+
+    def query_radius_indices(self, lat: float, lng: float, radius_km: float) -> List[Tuple[int, float]]:
+        """(index, distance_km) pairs within radius_km, nearest first"""
+        if not self.items:
+            return []
+        rings_lat = int(math.ceil(radius_km / self.cell_km))
+        lng_span = radius_km / (KM_PER_DEGREE_LAT * max(math.cos(math.radians(lat)), 0.01))
+        rings_lng = int(math.ceil(lng_span / self._cell_lng))
+
+        candidates = self._candidates(lat, lng, rings_lat, rings_lng)
+        if len(candidates) == 0:
+            return []
+        distances = haversine_to_point(lat, lng, self.lats[candidates], self.lngs[candidates])
+        inside = distances <= radius_km
+        candidates, distances = candidates[inside], distances[inside]
+        order = np.argsort(distances, kind="stable")
+        return [(int(candidates[k]), float(distances[k])) for k in order]
+
+    def query_radius(self, lat: float, lng: float, radius_km: float) -> List:
+        """Places within radius_km of (lat, lng), nearest first"""
+        return [self.items[i] for i, _ in self.query_radius_indices(lat, lng, radius_km)]
+
+    def k_nearest_indices(self, lat: float, lng: float, k: int) -> List[Tuple[int, float]]:
+        """(index, distance_km) pairs for the k places nearest to (lat, lng)"""
+        if not self.items or k <= 0:
+            return []
+        k = min(k, len(self.items))
+
+        rings = 0
+        while True:
+            candidates = self._candidates(lat, lng, rings, rings)
+            exhaustive = len(candidates) == len(self.items)
+            if len(candidates) >= k:
+                distances = haversine_to_point(lat, lng, self.lats[candidates], self.lngs[candidates])
+                order = np.argsort(distances, kind="stable")[:k]
+                # Everything within `rings` full cells of the query has been seen
+                if exhaustive or distances[order[-1]] <= rings * self.cell_km:
+                    return [(int(candidates[i]), float(distances[i])) for i in order]
+            rings = rings * 2 if rings else 1
+
+    def k_nearest(self, lat: float, lng: float, k: int) -> List:
+        """The k places nearest to (lat, lng), nearest first"""
+        return [self.items[i] for i, _ in self.k_nearest_indices(lat, lng, k)]
+
+
+class CitySpatialIndex(SpatialIndex):
+    """Spatial index over one city's places_collection documents with id/name coordinate lookup"""
+
+    def __init__(self, city: str, places: Sequence, cell_km: float = 1.0):
+        super().__init__(places, cell_km=cell_km)
+        self.city = city
+        self._by_place_id: Dict[str, int] = {}
+        self._by_name: Dict[str, int] = {}
+        for i, place in enumerate(self.items):
+            if place.get("place_id"):
+                self._by_place_id[place["place_id"]] = i
+            if place.get("name"):
+                self._by_name.setdefault(place["name"].strip().lower(), i)
+
+    def coordinates_for(self, place_id: Optional[str] = None, name: Optional[str] = None) -> Optional[Tuple[float, float]]:
+        """Known coordinates of a city place by place_id or (case-insensitive) exact name"""
+        i = self._by_place_id.get(place_id) if place_id else None
+        if i is None and name:
+            i = self._by_name.get(name.strip().lower())
+        if i is None:
+            return None
+        return float(self.lats[i]), float(self.lngs[i])
+
+
+class CitySpatialIndexCache:
+    """Lazily built per-city spatial indexes, rebuilt after ttl_seconds"""
+
+    def __init__(self, ttl_seconds: float = 900):
+        self.ttl_seconds = ttl_seconds
+        self._indexes: Dict[str, Tuple[float, CitySpatialIndex]] = {}
+        self._locks: Dict[str, asyncio.Lock] = {}
+
+    async def get(self, city: str) -> CitySpatialIndex:
+        key = normalize_text(city)
+        cached = self._indexes.get(key)
+        if cached and time.monotonic() - cached[0] < self.ttl_seconds:
+            return cached[1]
+
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            cached = self._indexes.get(key)
+            if cached and time.monotonic() - cached[0] < self.ttl_seconds:
+                return cached[1]
+
+            places = await places_collection.find(
+                {"city_norm": normalize_text(city)},
+                {"_id": 0, "place_id": 1, "name": 1, "coordinates": 1}
+            ).to_list(length=None)
+            index = CitySpatialIndex(city, places)
+            self._indexes[key] = (time.monotonic(), index)
+            print(f"DEBUG: Built spatial index for {city} with {len(index)} places")
+            return index
+
+    def invalidate(self, city: Optional[str] = None):
+        if city is None:
+            self._indexes.clear()
+        else:
+            self._indexes.pop(normalize_text(city), None)
+
+
+city_spatial_indexes = CitySpatialIndexCache()
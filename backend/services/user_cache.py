@@ -0,0 +1,81 @@
+import copy
+import os
+import time
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+# Short TTL: the cache only has to absorb bursts of requests made with the same token.
+# It is also the bound on how long another worker can serve a stale user (see UserCache)
+USER_CACHE_TTL_SECONDS = float(os.getenv("USER_CACHE_TTL_SECONDS", "30"))
+USER_CACHE_MAX_ENTRIES = int(os.getenv("USER_CACHE_MAX_ENTRIES", "10000"))
+
+CacheKey = Tuple[str, str]
+
+
+class UserCache:
+    """In-memory LRU of user documents keyed by (username, token id), with a per-entry TTL.
+
+    Writes to a user (password change, profile update, deletion) must call invalidate_user()
+    so the next request reloads the document from MongoDB. Invalidation only reaches this
+    process: other uvicorn workers keep their copy until USER_CACHE_TTL_SECONDS expires, so
+    keep the TTL short when running more than one worker.
+
+    The password hash is never cached; code that needs it reads it from MongoDB.
+    """
+
+    def __init__(self, ttl_seconds: float = USER_CACHE_TTL_SECONDS, max_entries: int = USER_CACHE_MAX_ENTRIES):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max(1, max_entries)
+        self._entries: "OrderedDict[CacheKey, Tuple[float, Dict]]" = OrderedDict()
+        self._keys_by_user: Dict[str, Set[CacheKey]] = {}
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, username: str, token_id: str) -> Optional[Dict]:
+        key = (username, token_id)
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        expires_at, user = entry
+        if expires_at <= time.monotonic():
+            self._remove(key)
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        # Deep copy so endpoints can mutate their user dict (including nested preferences)
+        # without touching the cached one
+        return copy.deepcopy(user)
+
+    def set(self, username: str, token_id: str, user: Dict):
+        if self.ttl_seconds <= 0:
+            return
+        key = (username, token_id)
+        cached = copy.deepcopy({field: value for field, value in user.items() if field != "hashed_password"})
+        self._entries[key] = (time.monotonic() + self.ttl_seconds, cached)
+        self._entries.move_to_end(key)
+        self._keys_by_user.setdefault(username, set()).add(key)
+        while len(self._entries) > self.max_entries:
+            oldest = next(iter(self._entries))
+            self._remove(oldest)
+
+    def invalidate_user(self, username: str):
+        """Drop every cached entry for a user, whatever token it was cached under"""
+        for key in self._keys_by_user.pop(username, set()):
+            self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+        self._keys_by_user.clear()
+
+    def _remove(self, key: CacheKey):
+        self._entries.pop(key, None)
+        keys = self._keys_by_user.get(key[0])
+        if keys is not None:
+            keys.discard(key)
+            if not keys:
+                del self._keys_by_user[key[0]]
+
+
+user_cache = UserCache()
@@ -0,0 +1,124 @@
+"""Email verification codes shared by every worker and process.
+
+Codes are stored under an HMAC of the code (never the code itself), so verification is one
+point lookup by _id. Records expire through a TTL index on expires_at (config/indexes.py);
+expiry is also checked on read because the TTL monitor only runs about once a minute.
+
+VERIFICATION_STORE_BACKEND=memory keeps codes in process memory instead (single worker only,
+e.g. local development without MongoDB).
+"""
+import hashlib
+import hmac
+import os
+import secrets
+import string
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from pymongo.errors import DuplicateKeyError
+
+import config.database as database_config
+
+VERIFICATION_CODE_TTL_SECONDS = int(os.getenv("VERIFICATION_CODE_TTL_SECONDS", "600"))
+VERIFICATION_CODE_LENGTH = 6
+VERIFICATION_STORE_BACKEND = os.getenv("VERIFICATION_STORE_BACKEND", "mongo").lower()
+VERIFICATION_CODE_SECRET = os.getenv(
+    "VERIFICATION_CODE_SECRET", os.getenv("SECRET_KEY", "fallback_secret_key_change_in_production")
+)
+# Six digits only allow a million live codes; give up rather than loop forever
+MAX_ISSUE_ATTEMPTS = 10
+
+
+def generate_verification_code(length: int = VERIFICATION_CODE_LENGTH) -> str:
+    return "".join(secrets.choice(string.digits) for _ in range(length))
+
+
+def hash_code(code: str, secret: str = VERIFICATION_CODE_SECRET) -> str:
+    return hmac.new(secret.encode(), code.strip().encode(), hashlib.sha256).hexdigest()
+
+
+def is_expired(record: Dict, now: Optional[datetime] = None) -> bool:
+    return record["expires_at"] <= (now or datetime.utcnow())
+
+
+class MongoVerificationBackend:
+    """verification_codes collection: {_id: code hash, email, created_at, expires_at}"""
+
+    async def put(self, record: Dict) -> bool:
+        """False if the code hash is already taken by another live code"""
+        try:
+            await database_config.verification_codes_collection.insert_one(record)
+            return True
+        except DuplicateKeyError:
+            return False
+
+    async def delete_email(self, email: str):
+        await database_config.verification_codes_collection.delete_many({"email": email})
+
+    async def pop(self, code_hash: str) -> Optional[Dict]:
+        # Atomic: a code can be consumed once, even with concurrent requests on different workers
+        return await database_config.verification_codes_collection.find_one_and_delete({"_id": code_hash})
+
+
+class InMemoryVerificationBackend:
+    def __init__(self):
+        self._records: Dict[str, Dict] = {}
+        self._by_email: Dict[str, str] = {}
+
+    def _sweep(self):
+        now = datetime.utcnow()
+        for code_hash in [code_hash for code_hash, record in self._records.items() if is_expired(record, now)]:
+            record = self._records.pop(code_hash)
+            if self._by_email.get(record["email"]) == code_hash:
+                del self._by_email[record["email"]]
+
+    async def put(self, record: Dict) -> bool:
+        self._sweep()
+        if record["_id"] in self._records:
+            return False
+        self._records[record["_id"]] = record
+        self._by_email[record["email"]] = record["_id"]
+        return True
+
+    async def delete_email(self, email: str):
+        code_hash = self._by_email.pop(email, None)
+        if code_hash is not None:
+            self._records.pop(code_hash, None)
+
+    async def pop(self, code_hash: str) -> Optional[Dict]:
+        record = self._records.pop(code_hash, None)
+        if record is not None and self._by_email.get(record["email"]) == code_hash:
+            del self._by_email[record["email"]]
+        return record
+
+
+class VerificationCodeStore:
+    def __init__(self, backend=None, ttl_seconds: int = VERIFICATION_CODE_TTL_SECONDS):
+        self.backend = backend or (
+            InMemoryVerificationBackend() if VERIFICATION_STORE_BACKEND == "memory" else MongoVerificationBackend()
+        )
+        self.ttl_seconds = ttl_seconds
+
+    async def issue(self, email: str) -> str:
+        """New code for an email; replaces any code previously sent to it"""
+        await self.backend.delete_email(email)
+        for _ in range(MAX_ISSUE_ATTEMPTS):
+            code = generate_verification_code()
+            now = datetime.utcnow()
+            record = {
+                "_id": hash_code(code),
+                "email": email,
+                "created_at": now,
+                "expires_at": now + timedelta(seconds=self.ttl_seconds),
+            }
+            # Codes are looked up by value alone, so two live codes must never collide
+            if await self.backend.put(record):
+                return code
+        raise RuntimeError("Could not allocate a unique verification code")
+
+    async def consume(self, code: str) -> Optional[Dict]:
+        """Remove and return the record for a code (None if unknown); callers check is_expired()"""
+        return await self.backend.pop(hash_code(code))
+
+
+verification_store = VerificationCodeStore()
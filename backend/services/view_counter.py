@@ -0,0 +1,99 @@
+import asyncio
+import os
+from collections import Counter
+from typing import Optional
+
+from bson import ObjectId
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+import config.database as database_config
+
+# Route views are counted in memory and written as one bulk_write of $inc per interval
+VIEW_COUNT_FLUSH_SECONDS = float(os.getenv("VIEW_COUNT_FLUSH_SECONDS", "5"))
+# Flush early when this many distinct routes are waiting
+VIEW_COUNT_MAX_PENDING = int(os.getenv("VIEW_COUNT_MAX_PENDING", "1000"))
+# Write errors worth retrying on the next flush (interrupted, failover, write conflict, timeout);
+# any other per-route error (e.g. a route with stats: null) would fail forever, so its views are dropped
+TRANSIENT_WRITE_ERROR_CODES = {11600, 11602, 91, 189, 10107, 13435, 13436, 112, 50, 262}
+
+
+class ViewCounterBuffer:
+    """Aggregates stats.views_count increments per route and flushes them in batches.
+
+    Counts still pending when the process dies are lost; stop() flushes them on a clean shutdown.
+    """
+
+    def __init__(self, flush_seconds: float = VIEW_COUNT_FLUSH_SECONDS, max_pending: int = VIEW_COUNT_MAX_PENDING):
+        self.flush_seconds = flush_seconds
+        self.max_pending = max_pending
+        self._pending: Counter = Counter()
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._early_flush: Optional[asyncio.Task] = None
+
+    def record(self, route_id: ObjectId, views: int = 1):
+        """Count a view; never touches the database"""
+        self._pending[route_id] += views
+        if len(self._pending) >= self.max_pending and (self._early_flush is None or self._early_flush.done()):
+            self._early_flush = asyncio.create_task(self.flush())
+
+    def pending(self, route_id: ObjectId) -> int:
+        """Views recorded but not written yet, so responses can include them"""
+        return self._pending.get(route_id, 0)
+
+    async def flush(self) -> int:
+        """Write all pending increments; returns the number of routes updated"""
+        async with self._flush_lock:
+            if not self._pending:
+                return 0
+            pending, self._pending = self._pending, Counter()
+            operations = [
+                UpdateOne({"_id": route_id}, {"$inc": {"stats.views_count": views}})
+                for route_id, views in pending.items()
+            ]
+            route_ids = list(pending)
+            try:
+                await database_config.route_collection.bulk_write(operations, ordered=False)
+            except BulkWriteError as e:
+                # Unordered: every operation not listed in writeErrors has already been applied
+                failed = e.details.get("writeErrors", [])
+                dropped = 0
+                for error in failed:
+                    route_id = route_ids[error["index"]]
+                    if error.get("code") in TRANSIENT_WRITE_ERROR_CODES:
+                        self._pending[route_id] += pending[route_id]
+                    else:
+                        dropped += 1
+                        print(f"DEBUG: Dropping {pending[route_id]} views for route {route_id}: {error.get('errmsg')}")
+                print(f"DEBUG: View count flush failed for {len(failed)} of {len(operations)} routes "
+                      f"({len(failed) - dropped} retried)")
+                return len(operations) - len(failed)
+            except Exception as e:
+                # Nothing was confirmed written; keep the counts for the next flush instead of dropping them
+                self._pending.update(pending)
+                print(f"DEBUG: View count flush failed for {len(operations)} routes: {e}")
+                return 0
+            return len(operations)
+
+    async def _flush_loop(self):
+        while True:
+            await asyncio.sleep(self.flush_seconds)
+            await self.flush()
+
+    async def start(self):
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.create_task(self._flush_loop())
+
+    async def stop(self):
+        if self._flush_task is not None:
+            self._flush_task.cancel()
+            try:
+                await self._flush_task
+            except asyncio.CancelledError:
+                pass
+            self._flush_task = None
+        await self.flush()
+
+
+view_counter = ViewCounterBuffer()
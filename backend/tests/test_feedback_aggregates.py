@@ -0,0 +1,81 @@
+import asyncio
+
+from bson import ObjectId
+
+import config.database as database_config
+from services import feedback_aggregates
+from services.feedback_aggregates import PLACE, apply_rating_change, stats_from_aggregate
+
+
+class FakeAggregates:
+    """Documents by _id; supports the upserted $inc/$set/$setOnInsert and equality-filtered deletes"""
+
+    def __init__(self):
+        self.docs = {}
+
+    async def update_one(self, filter, update, upsert=False):
+        doc = self.docs.get(filter["_id"])
+        if doc is None:
+            doc = self.docs[filter["_id"]] = {"_id": filter["_id"], **update.get("$setOnInsert", {})}
+        for path, n in update.get("$inc", {}).items():
+            target = doc
+            *parents, field = path.split(".")
+            for parent in parents:
+                target = target.setdefault(parent, {})
+            target[field] = target.get(field, 0) + n
+        doc.update(update.get("$set", {}))
+
+    async def find_one(self, filter, projection=None):
+        return self.docs.get(filter["_id"])
+
+    async def delete_one(self, filter):
+        doc = self.docs.get(filter["_id"])
+        if doc is not None and all(doc.get(key) == value for key, value in filter.items()):
+            del self.docs[filter["_id"]]
+
+
+def test_rating_changes_keep_count_sum_and_histogram(monkeypatch):
+    aggregates = FakeAggregates()
+    monkeypatch.setattr(database_config, "feedback_aggregates_collection", aggregates)
+
+    async def run():
+        await apply_rating_change(PLACE, "p1", None, 5)
+        await apply_rating_change(PLACE, "p1", None, 3)
+        await apply_rating_change(PLACE, "p1", 3, 4)
+        await apply_rating_change(PLACE, "p1", 4, 4)
+        await apply_rating_change(PLACE, "p1", 5, None)
+    asyncio.run(run())
+
+    aggregate = aggregates.docs["place:p1"]
+    assert (aggregate["kind"], aggregate["target_id"]) == (PLACE, "p1")
+    assert (aggregate["count"], aggregate["sum"]) == (1, 4)
+    assert aggregate["histogram"] == {"5": 0, "3": 0, "4": 1}
+    # The no-op change did not bump the version the rebuild compares against
+    assert aggregate["version"] == 4
+
+
+def test_stats_from_aggregate():
+    aggregate = {"count": 3, "sum": 11, "histogram": {"3": 1, "4": 2}}
+    assert stats_from_aggregate(aggregate) == {
+        "total_feedback": 3,
+        "average_rating": 3.67,
+        "rating_distribution": {1: 0, 2: 0, 3: 1, 4: 2, 5: 0},
+    }
+    assert stats_from_aggregate(None) == {
+        "total_feedback": 0,
+        "average_rating": 0,
+        "rating_distribution": {1: 0, 2: 0, 3: 0, 4: 0, 5: 0},
+    }
+
+
+def test_release_leaves_a_lock_taken_over_by_another_process(monkeypatch):
+    aggregates = FakeAggregates()
+    monkeypatch.setattr(database_config, "feedback_aggregates_collection", aggregates)
+    lock_id = feedback_aggregates.REBUILD_LOCK_ID
+
+    aggregates.docs[lock_id] = {"_id": lock_id, "token": ObjectId()}
+    asyncio.run(feedback_aggregates._release_rebuild_lock(ObjectId()))
+    assert lock_id in aggregates.docs
+
+    asyncio.run(feedback_aggregates._release_rebuild_lock(aggregates.docs[lock_id]["token"]))
+    assert lock_id not in aggregates.docs
@@ -0,0 +1,62 @@
+from datetime import datetime
+
+from services.opening_hours import MINUTES_PER_DAY, compile_opening_hours
+
+# 2026-10-19 is a Monday
+MONDAY = 19
+
+
+def week(**days):
+    """Opening hours with every day closed except the given ones"""
+    hours = {day: "Closed" for day in ("monday", "tuesday", "wednesday", "thursday", "friday", "saturday", "sunday")}
+    hours.update(days)
+    return hours
+
+
+def at(day_offset, hour, minute=0):
+    return datetime(2026, 10, MONDAY + day_offset, hour, minute)
+
+
+def test_multiple_ranges_in_one_day():
+    compiled = compile_opening_hours(week(monday="9:00 AM - 12:00 PM, 2:00 PM - 6:00 PM"))
+    assert compiled.is_open_at(at(0, 10))
+    assert compiled.is_open_at(at(0, 12))  # closing minute counts as open
+    assert not compiled.is_open_at(at(0, 13))
+    assert compiled.is_open_at(at(0, 17, 59))
+    assert not compiled.is_open_at(at(0, 18, 1))
+    assert not compiled.is_open_at(at(1, 10))
+
+
+def test_overnight_range_runs_into_the_next_day():
+    compiled = compile_opening_hours(week(friday="8:00 PM - 2:00 AM"))
+    assert not compiled.is_open_at(at(4, 19))
+    assert compiled.is_open_at(at(4, 23))
+    assert compiled.is_open_at(at(5, 1, 30))
+    assert not compiled.is_open_at(at(5, 3))
+
+
+def test_sunday_overnight_range_wraps_into_monday():
+    compiled = compile_opening_hours(week(sunday="22:00 - 03:00"))
+    assert compiled.is_open_at(at(6, 23))
+    assert compiled.is_open_at(at(0, 2))
+    assert not compiled.is_open_at(at(0, 4))
+
+
+def test_missing_and_unparseable_days_count_as_open():
+    hours = week(tuesday="by appointment")
+    del hours["wednesday"]
+    compiled = compile_opening_hours(hours)
+    assert compiled.is_day_unknown(1) and compiled.is_day_unknown(2)
+    assert compiled.is_open_at(at(1, 3))
+    assert compiled.is_open_at(at(2, 3))
+    assert not compiled.is_open_at(at(3, 3))
+    assert compile_opening_hours(None).is_open_at(at(0, 3))
+
+
+def test_next_open_slot_skips_gaps_too_short_for_the_visit():
+    compiled = compile_opening_hours(week(monday="9:00 - 10:00, 11:00 - 15:00"))
+    nine, eleven = 9 * 60, 11 * 60
+    assert compiled.next_open_slot(8 * 60, 30, MINUTES_PER_DAY) == nine
+    assert compiled.next_open_slot(nine + 45, 30, MINUTES_PER_DAY) == eleven
+    assert compiled.next_open_slot(nine, 90, MINUTES_PER_DAY) == eleven
+    assert compiled.next_open_slot(nine, 90, 12 * 60) is None
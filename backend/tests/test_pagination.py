@@ -0,0 +1,69 @@
+import base64
+from datetime import datetime
+
+import pytest
+from bson import ObjectId, json_util
+
+from services.pagination import InvalidCursor, decode_cursor, encode_cursor, keyset_filter
+
+SORT = [("stats.rating", -1), ("created_at", 1), ("_id", 1)]
+
+
+def raw_cursor(payload):
+    return base64.urlsafe_b64encode(json_util.dumps(payload).encode()).decode().rstrip("=")
+
+
+def test_cursor_round_trips_sort_key_values():
+    document = {"_id": ObjectId(), "created_at": datetime(2026, 10, 1, 12, 30), "stats": {"rating": 4.5}, "name": "x"}
+    cursor = encode_cursor(document, SORT)
+    assert "=" not in cursor
+    assert decode_cursor(cursor, SORT) == [4.5, datetime(2026, 10, 1, 12, 30), document["_id"]]
+
+
+def test_missing_sort_field_encodes_as_null():
+    document = {"_id": ObjectId(), "created_at": datetime(2026, 10, 1)}
+    assert decode_cursor(encode_cursor(document, SORT), SORT)[0] is None
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    raw_cursor(["values"]),
+    raw_cursor({"sort": "stats.rating:-1,created_at:1,_id:1", "values": [1, 2]}),
+    raw_cursor({"sort": "stats.rating:-1,created_at:1,_id:1", "values": {"a": 1}}),
+    raw_cursor({"sort": "stats.rating:-1,created_at:1,_id:1", "values": [{"$gt": 0}, None, None]}),
+    raw_cursor({"sort": "stats.rating:-1,created_at:1,_id:1", "values": [[1], None, None]}),
+])
+def test_malformed_cursors_are_rejected(cursor):
+    with pytest.raises(InvalidCursor, match="Invalid cursor"):
+        decode_cursor(cursor, SORT)
+
+
+def test_cursor_only_decodes_for_the_sort_it_was_issued_for():
+    document = {"_id": ObjectId(), "created_at": datetime(2026, 10, 1), "stats": {"rating": 3}}
+    cursor = encode_cursor(document, SORT, sort_name="highest")
+    assert decode_cursor(cursor, SORT, sort_name="highest")[0] == 3
+    with pytest.raises(InvalidCursor, match="different sort order"):
+        decode_cursor(cursor, SORT, sort_name="lowest")
+    with pytest.raises(InvalidCursor, match="different sort order"):
+        decode_cursor(encode_cursor(document, SORT), [("created_at", 1), ("_id", 1)])
+
+
+def test_keyset_filter_expands_to_equal_prefix_branches():
+    last_id = ObjectId()
+    assert keyset_filter([("name", 1), ("_id", 1)], ["b", last_id]) == {"$or": [
+        {"name": {"$gt": "b"}},
+        {"$and": [{"name": "b"}, {"_id": {"$gt": last_id}}]},
+    ]}
+
+
+def test_keyset_filter_orders_null_lowest():
+    last_id = ObjectId()
+    # Descending: nulls come after every value; after a null only the _id tie-break is left
+    assert keyset_filter([("rating", -1), ("_id", 1)], [3, last_id])["$or"][0] == {
+        "$or": [{"rating": {"$lt": 3}}, {"rating": None}]
+    }
+    assert keyset_filter([("rating", -1), ("_id", 1)], [None, last_id]) == {"$or": [
+        {"$and": [{"rating": None}, {"_id": {"$gt": last_id}}]},
+    ]}
+    # Ascending: everything non-null comes after a null
+    assert keyset_filter([("rating", 1), ("_id", 1)], [None, last_id])["$or"][0] == {"rating": {"$ne": None}}
@@ -0,0 +1,74 @@
+import asyncio
+from types import SimpleNamespace
+
+import pytest
+
+from services import rate_limiter
+from services.rate_limiter import AsyncTokenBucket
+
+
+class FakeClock:
+    """Stands in for the limiter's clock and sleep so waiting advances virtual time instantly"""
+
+    def __init__(self, monkeypatch):
+        self.now = 0.0
+        real_sleep = asyncio.sleep
+
+        async def sleep(seconds):
+            self.now += seconds
+            await real_sleep(0)
+
+        # Only the limiter's view of time changes; the event loop keeps the real clock
+        monkeypatch.setattr(rate_limiter, "time", SimpleNamespace(monotonic=lambda: self.now))
+        monkeypatch.setattr(rate_limiter, "asyncio", SimpleNamespace(Lock=asyncio.Lock, sleep=sleep))
+
+
+def test_burst_up_to_capacity_then_paced_at_rate(monkeypatch):
+    clock = FakeClock(monkeypatch)
+    bucket = AsyncTokenBucket(rate=2, capacity=3)
+
+    async def acquire_times(n):
+        times = []
+        for _ in range(n):
+            await bucket.acquire()
+            times.append(clock.now)
+        return times
+
+    assert asyncio.run(acquire_times(6)) == pytest.approx([0, 0, 0, 0.5, 1.0, 1.5])
+
+
+def test_tokens_refill_while_idle_but_not_past_capacity(monkeypatch):
+    clock = FakeClock(monkeypatch)
+    bucket = AsyncTokenBucket(rate=1, capacity=2)
+
+    async def run():
+        await bucket.acquire()
+        await bucket.acquire()
+        clock.now += 10
+        for _ in range(3):
+            await bucket.acquire()
+        return clock.now
+
+    # Two tokens refilled during the idle 10s, the third waits a full second
+    assert asyncio.run(run()) == pytest.approx(11)
+
+
+def test_concurrent_waiters_are_served_in_arrival_order(monkeypatch):
+    FakeClock(monkeypatch)
+    bucket = AsyncTokenBucket(rate=5)
+    served = []
+
+    async def worker(i):
+        await bucket.acquire()
+        served.append(i)
+
+    async def run():
+        await asyncio.gather(*(worker(i) for i in range(5)))
+
+    asyncio.run(run())
+    assert served == [0, 1, 2, 3, 4]
+
+
+def test_rate_must_be_positive():
+    with pytest.raises(ValueError):
+        AsyncTokenBucket(rate=0)
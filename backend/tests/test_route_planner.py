@@ -0,0 +1,76 @@
+from services.distance_matrix import DistanceMatrix
+from services.route_planner import cluster_places_into_days, order_day_places
+
+
+def make_place(name, lat=None, lng=None):
+    place = {"name": name}
+    if lat is not None:
+        place["coordinates"] = {"lat": lat, "lng": lng}
+    return place
+
+
+def line_of_places(count, start_lat=41.90, step=0.01):
+    return [make_place(f"p{i}", start_lat + i * step, 12.50) for i in range(count)]
+
+
+def names(places):
+    return [place["name"] for place in places]
+
+
+def plan(places, num_days, places_per_day):
+    return cluster_places_into_days(places, num_days, places_per_day, DistanceMatrix(places))
+
+
+def test_days_never_exceed_places_per_day():
+    # A relaxed 1-day trip is padded to 6 candidates but only has room for 2 stops
+    assert [len(day) for day in plan(line_of_places(6), 1, 2)] == [2]
+    assert [len(day) for day in plan(line_of_places(12), 2, 2)] == [2, 2]
+
+
+def test_extra_candidates_are_dropped_lowest_ranked_first():
+    places = line_of_places(6)
+    kept = [place for day in plan(places, 1, 2) for place in day]
+    assert names(kept) == ["p0", "p1"]
+
+
+def test_places_are_balanced_and_kept_when_they_fit():
+    places = line_of_places(12)
+    days = plan(places, 3, 5)
+    assert sorted(len(day) for day in days) == [4, 4, 4]
+    assert sorted(names(place for day in days for place in day)) == sorted(names(places))
+
+
+def test_days_are_geographically_compact():
+    # Two clusters about 50 km apart, one day each
+    north = [make_place(f"n{i}", 45.00 + i * 0.001, 9.00) for i in range(3)]
+    south = [make_place(f"s{i}", 44.55 + i * 0.001, 9.00) for i in range(3)]
+    places = [north[0], south[0], north[1], south[1], north[2], south[2]]
+    days = plan(places, 2, 3)
+    assert {frozenset(names(day)) for day in days} == {frozenset(names(north)), frozenset(names(south))}
+    # The day holding the best-ranked place comes first
+    assert "n0" in names(days[0])
+
+
+def test_places_without_coordinates_fill_the_smallest_day():
+    places = line_of_places(3) + [make_place("unknown")]
+    days = plan(places, 2, 2)
+    assert sorted(len(day) for day in days) == [2, 2]
+    assert "unknown" in names(days[0] + days[1])
+
+
+def test_returns_empty_days_when_there_is_nothing_to_plan():
+    assert plan([], 3, 2) == [[], [], []]
+    assert cluster_places_into_days(line_of_places(2), 0, 2, DistanceMatrix(line_of_places(2))) == []
+
+
+def test_order_day_places_walks_a_short_path():
+    places = [make_place(name, 41.90, 12.50 + offset) for name, offset in
+              [("a", 0.00), ("d", 0.03), ("b", 0.01), ("c", 0.02)]]
+    assert names(order_day_places(places, DistanceMatrix(places))) == ["a", "b", "c", "d"]
+
+
+def test_order_day_places_keeps_fixed_prefix_and_unlocated_places():
+    places = [make_place("must", 41.90, 12.53), make_place("far", 41.90, 12.50),
+              make_place("unknown"), make_place("near", 41.90, 12.52)]
+    ordered = order_day_places(places, DistanceMatrix(places), fixed_prefix=1)
+    assert names(ordered) == ["must", "near", "far", "unknown"]
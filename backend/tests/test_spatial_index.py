@@ -0,0 +1,38 @@
+from services.spatial_index import CitySpatialIndex, SpatialIndex
+
+
+def grid_places():
+    # 5 x 5 places around central Rome, 1.1 km apart north-south and 0.8 km east-west
+    return [{"place_id": f"{i}-{j}", "name": f"Place {i} {j}",
+             "coordinates": {"lat": 41.90 + i * 0.01, "lng": 12.50 + j * 0.01}}
+            for i in range(5) for j in range(5)]
+
+
+def test_query_radius_returns_places_inside_the_circle_nearest_first():
+    index = SpatialIndex(grid_places())
+    found = index.query_radius_indices(41.92, 12.52, 0.5)
+    assert [index.items[i]["place_id"] for i, _ in found] == ["2-2"]
+    found = index.query_radius_indices(41.92, 12.52, 1.2)
+    assert index.items[found[0][0]]["place_id"] == "2-2"
+    assert sorted(index.items[i]["place_id"] for i, _ in found[1:]) == ["1-2", "2-1", "2-3", "3-2"]
+    assert [distance for _, distance in found] == sorted(distance for _, distance in found)
+
+
+def test_k_nearest_matches_a_full_scan():
+    places = grid_places()
+    index = SpatialIndex(places, cell_km=0.5)
+    nearest = index.k_nearest(41.905, 12.505, 4)
+    assert sorted(place["place_id"] for place in nearest) == ["0-0", "0-1", "1-0", "1-1"]
+    assert len(index.k_nearest(41.905, 12.505, 100)) == len(places)
+
+
+def test_places_without_coordinates_are_skipped():
+    index = SpatialIndex(grid_places() + [{"place_id": "nowhere"}])
+    assert len(index) == 25
+
+
+def test_city_index_looks_up_coordinates_by_id_or_name():
+    index = CitySpatialIndex("Rome", grid_places())
+    assert index.coordinates_for(place_id="1-2") == (41.91, 12.52)
+    assert index.coordinates_for(name="  place 1 2 ") == (41.91, 12.52)
+    assert index.coordinates_for(place_id="missing") is None
@@ -0,0 +1,70 @@
+import asyncio
+
+from bson import ObjectId
+from pymongo.errors import BulkWriteError, AutoReconnect
+
+import config.database as database_config
+from services.view_counter import ViewCounterBuffer
+
+
+class FakeRoutes:
+    """Applies $inc updates to a dict; routes listed in errors fail with that write error code"""
+
+    def __init__(self, errors=None, exception=None):
+        self.views = {}
+        self.errors = errors or {}
+        self.exception = exception
+
+    async def bulk_write(self, operations, ordered=True):
+        if self.exception is not None:
+            raise self.exception
+        write_errors = []
+        for index, operation in enumerate(operations):
+            route_id = operation._filter["_id"]
+            if route_id in self.errors:
+                write_errors.append({"index": index, "code": self.errors[route_id], "errmsg": "failed"})
+                continue
+            self.views[route_id] = self.views.get(route_id, 0) + operation._doc["$inc"]["stats.views_count"]
+        if write_errors:
+            raise BulkWriteError({"writeErrors": write_errors})
+
+
+def test_flush_writes_all_pending_views(monkeypatch):
+    routes = FakeRoutes()
+    monkeypatch.setattr(database_config, "route_collection", routes)
+    counter = ViewCounterBuffer()
+    first, second = ObjectId(), ObjectId()
+    for route_id in (first, first, second):
+        counter._pending[route_id] += 1
+
+    assert asyncio.run(counter.flush()) == 2
+    assert routes.views == {first: 2, second: 1}
+    assert counter.pending(first) == 0
+
+
+def test_failed_route_does_not_recount_the_others(monkeypatch):
+    good, null_stats, conflict = ObjectId(), ObjectId(), ObjectId()
+    # 28 (PathNotViable, e.g. stats: null) never succeeds; 112 (WriteConflict) is retried
+    routes = FakeRoutes(errors={null_stats: 28, conflict: 112})
+    monkeypatch.setattr(database_config, "route_collection", routes)
+    counter = ViewCounterBuffer()
+    counter._pending.update({good: 3, null_stats: 2, conflict: 4})
+
+    assert asyncio.run(counter.flush()) == 1
+    assert counter.pending(good) == 0
+    assert counter.pending(null_stats) == 0
+    assert counter.pending(conflict) == 4
+
+    routes.errors = {}
+    asyncio.run(counter.flush())
+    assert routes.views == {good: 3, conflict: 4}
+
+
+def test_connection_failure_keeps_every_count(monkeypatch):
+    route_id = ObjectId()
+    monkeypatch.setattr(database_config, "route_collection", FakeRoutes(exception=AutoReconnect("down")))
+    counter = ViewCounterBuffer()
+    counter._pending[route_id] += 5
+
+    assert asyncio.run(counter.flush()) == 0
+    assert counter.pending(route_id) == 5